@@ -34,15 +34,18 @@ __license__ = "LGPLv3+"
 EXPORTER_CLIENTS = {}
 
 
-def start_exporter(address, port, timeout=3, retries=1):
-    """Start the exporter"""
+def start_exporter(address, port, timeout=3, retries=1, pipelined=False):
+    """Start the exporter. The client is shared by all the users of the
+    same address, port and request mode, so that the users asking for
+    pipelined requests do not change the mode of the others."""
     global EXPORTER_CLIENTS
-    if (address, port) not in EXPORTER_CLIENTS:
-        client = Exporter(address, port, timeout)
-        EXPORTER_CLIENTS[(address, port)] = client
+    key = (address, port, bool(pipelined))
+    if key not in EXPORTER_CLIENTS:
+        client = Exporter(address, port, timeout, pipelined=pipelined)
+        EXPORTER_CLIENTS[key] = client
         client.start()
         return client
-    return EXPORTER_CLIENTS[(address, port)]
+    return EXPORTER_CLIENTS[key]
 
 
 class Exporter(ExporterClient.ExporterClient, object):
@@ -69,8 +72,10 @@ class Exporter(ExporterClient.ExporterClient, object):
     STATE_FAULT = "Fault"
     STATE_UNKNOWN = "Unknown"
 
-    def __init__(self, address, port, timeout=3, retries=1):
-        super(Exporter, self).__init__(address, port, PROTOCOL.STREAM, timeout, retries)
+    def __init__(self, address, port, timeout=3, retries=1, pipelined=False):
+        super(Exporter, self).__init__(
+            address, port, PROTOCOL.STREAM, timeout, retries, pipelined
+        )
 
         self.started = False
         self.callbacks = {}
@@ -98,6 +103,11 @@ class Exporter(ExporterClient.ExporterClient, object):
         ret = ExporterClient.ExporterClient.read_property(self, *args, **kwargs)
         return self._to_python_value(ret)
 
+    def read_properties(self, *args, **kwargs):
+        """Read several properties"""
+        ret = ExporterClient.ExporterClient.read_properties(self, *args, **kwargs)
+        return [self._to_python_value(value) for value in ret]
+
     def reconnect(self):
         """Reconnect"""
         return
@@ -178,9 +188,10 @@ class ExporterCommand(CommandObject):
     def __init__(
         self, name, command, username=None, address=None, port=None, timeout=3, **kwargs
     ):
+        pipelined = kwargs.pop("pipelined", False)
         CommandObject.__init__(self, name, username, **kwargs)
         self.command = command
-        self.__exporter = start_exporter(address, port, timeout)
+        self.__exporter = start_exporter(address, port, timeout, pipelined=pipelined)
         msg = "Attaching Exporter command: {} {}".format(address, name)
         logging.getLogger("HWR").debug(msg)
 
@@ -227,9 +238,10 @@ class ExporterChannel(ChannelObject):
         timeout=3,
         **kwargs
     ):
+        pipelined = kwargs.pop("pipelined", False)
         ChannelObject.__init__(self, name, username, **kwargs)
 
-        self.__exporter = start_exporter(address, port, timeout)
+        self.__exporter = start_exporter(address, port, timeout, pipelined=pipelined)
         self.attribute_name = attribute_name
         self.value = None
 
@@ -19,6 +19,7 @@
 #  along with MXCuBE. If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import weakref
 import gevent
 import gevent.event
 
@@ -60,6 +61,17 @@ class TangoCommand(CommandObject):
         self.device_name = tangoname
         self.device = None
 
+    def start_polling(self):
+        """Poll the attribute on its own, without the bulk reader"""
+        self.raw_device = DeviceProxy(self.device_name)
+
+        Poller.poll(
+            self.poll,
+            polling_period=self.polling,
+            value_changed_callback=self.update,
+            error_callback=self.poll_failed,
+        )
+
     def init_device(self):
         try:
             self.device = DeviceProxy(self.device_name)
@@ -140,6 +152,139 @@ class E:
         self.event = event
 
 
+class _BulkReadEntry:
+    __slots__ = ("attribute_name", "channel_ref", "value")
+
+    def __init__(self, channel):
+        self.attribute_name = channel.attribute_name
+        self.channel_ref = weakref.ref(channel)
+        self.value = Poller.NotInitializedValue
+
+
+class TangoBulkReader:
+    """Poll the attributes of all the TangoChannels sharing the same device,
+    polling period and timeout with a single read_attributes call, and
+    dispatch the changed values to the channels.
+    """
+
+    _readers = {}
+
+    def __init__(self, device_name, polling, read_as_str=False, timeout=10000):
+        self.device_name = device_name
+        self.polling = polling
+        self.read_as_str = read_as_str
+        self.timeout = timeout
+        self.raw_device = DeviceProxy(device_name)
+        self.raw_device.set_timeout_millis(timeout)
+        self.entries = ()
+        self.poller = None
+
+    @classmethod
+    def register(cls, channel):
+        """Add channel to the reader of its device, polling period and timeout"""
+        key = (
+            channel.device_name.lower(),
+            channel.polling,
+            channel.read_as_str,
+            channel.timeout,
+        )
+        reader = cls._readers.get(key)
+        if reader is None:
+            reader = cls(
+                channel.device_name,
+                channel.polling,
+                channel.read_as_str,
+                channel.timeout,
+            )
+            cls._readers[key] = reader
+        reader.add_channel(channel)
+        return reader
+
+    def get_key(self):
+        return self.device_name.lower(), self.polling, self.read_as_str, self.timeout
+
+    def add_channel(self, channel):
+        # entries tuple is replaced, not modified, as it is read by the poller
+        self.entries += (_BulkReadEntry(channel),)
+
+        if self.poller is None:
+            self.poller = Poller.poll(
+                self.poll,
+                polling_period=self.polling,
+                value_changed_callback=self.update,
+                error_callback=self.poll_failed,
+                compare=self._no_changes,
+            )
+
+    def remove_entries(self, entries):
+        self.entries = tuple(entry for entry in self.entries if entry not in entries)
+
+        if not self.entries:
+            self.stop()
+
+    def stop(self):
+        if self._readers.get(self.get_key()) is self:
+            del self._readers[self.get_key()]
+        if self.poller is not None and not self.poller.is_stopped():
+            self.poller.stop()
+
+    @staticmethod
+    def _no_changes(old_changes, changes):
+        return not changes
+
+    def poll(self):
+        """Read all attributes, return the (entry, value, error) which changed"""
+        entries = self.entries
+        names = [entry.attribute_name for entry in entries]
+
+        if self.read_as_str:
+            attributes = self.raw_device.read_attributes(
+                names, PyTango.DeviceAttribute.ExtractAs.String
+            )
+        else:
+            attributes = self.raw_device.read_attributes(names)
+
+        changes = []
+        for entry, attribute in zip(entries, attributes):
+            if entry.channel_ref() is None:
+                # channel was deleted, update() removes the entry
+                changes.append((entry, None, None))
+            elif attribute.has_failed:
+                changes.append((entry, None, attribute.get_err_stack()))
+            elif not Poller.values_equal(entry.value, attribute.value):
+                entry.value = attribute.value
+                changes.append((entry, attribute.value, None))
+
+        return changes
+
+    def update(self, changes):
+        removed = []
+
+        for entry, value, error in changes:
+            channel = entry.channel_ref()
+            if channel is None:
+                removed.append(entry)
+            elif error is not None:
+                # as for single attribute polling, stop polling on error
+                removed.append(entry)
+                channel.poll_failed(PyTango.DevFailed(*error), self.poller.get_id())
+            else:
+                channel.update(value)
+
+        if removed:
+            self.remove_entries(removed)
+
+    def poll_failed(self, e, poller_id):
+        # read_attributes fails as a whole, e.g. for an unknown attribute:
+        # each channel is polled on its own, so that only the failing ones stop
+        self.stop()
+
+        for entry in self.entries:
+            channel = entry.channel_ref()
+            if channel is not None:
+                channel.start_polling()
+
+
 class TangoChannel(ChannelObject):
     _tangoEventsQueue = queue.Queue()
     _eventReceivers = {}
@@ -170,6 +315,8 @@ class TangoChannel(ChannelObject):
         self.polling_events = False
         self.timeout = int(timeout)
         self.read_as_str = kwargs.get("read_as_str", False)
+        # group polled attributes of the same device in one read_attributes call
+        self.bulk_read = kwargs.get("bulk_read", True)
         self._device_initialized = gevent.event.Event()
         #logging.getLogger("HWR").debug(
         #    "creating Tango attribute %s/%s, polling=%s, timeout=%d",
@@ -202,14 +349,11 @@ class TangoChannel(ChannelObject):
         # self.init_poller.stop()
 
         if isinstance(self.polling, int):
-            self.raw_device = DeviceProxy(self.device_name)
-
-            Poller.poll(
-                self.poll,
-                polling_period=self.polling,
-                value_changed_callback=self.update,
-                error_callback=self.poll_failed,
-            )
+            # attributes missing from the device would fail the bulk read
+            if self.bulk_read and self.device is not None:
+                TangoBulkReader.register(self)
+            else:
+                self.start_polling()
         else:
             if self.polling == "events":
                 # try to register event
@@ -229,6 +373,17 @@ class TangoChannel(ChannelObject):
                     logging.getLogger("HWR").exception("could not subscribe event")
         self._device_initialized.set()
 
+    def start_polling(self):
+        """Poll the attribute on its own, without the bulk reader"""
+        self.raw_device = DeviceProxy(self.device_name)
+
+        Poller.poll(
+            self.poll,
+            polling_period=self.polling,
+            value_changed_callback=self.update,
+            error_callback=self.poll_failed,
+        )
+
     def init_device(self):
         try:
             self.device = DeviceProxy(self.device_name)
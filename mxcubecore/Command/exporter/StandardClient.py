@@ -21,7 +21,9 @@
 """ ProtocolError and StandardClient implementation"""
 import sys
 import socket
+from collections import deque
 import gevent
+import gevent.event
 import gevent.lock
 
 __copyright__ = """ Copyright © 2019 by the MXCuBE collaboration """
@@ -65,6 +67,10 @@ else:
     encode = str
 
 MAX_SIZE_STREAM_MSG = 500000
+RECV_BUFFER_SIZE = 65536
+
+STX_BYTE = b"\x02"
+ETX_BYTE = b"\x03"
 
 
 class PROTOCOL:
@@ -74,10 +80,89 @@ class PROTOCOL:
     STREAM = 2
 
 
+class StreamParser:
+    """Incremental parser of the STX <message> ETX framed stream.
+
+    Received chunks are searched for the frame delimiters with find(), and
+    only the content of incomplete messages is copied to an internal buffer.
+    """
+
+    def __init__(self, max_size=MAX_SIZE_STREAM_MSG):
+        self.max_size = max_size
+        self.buffer = bytearray()
+        self.receiving = False
+
+    def reset(self):
+        """Drop any partially received message"""
+        del self.buffer[:]
+        self.receiving = False
+
+    def feed(self, data, size=None):
+        """Parse a chunk of received data.
+        Args:
+            data(bytes, bytearray): received data
+            size(int): number of valid bytes in data, all if None
+        Yields:
+            (str): the complete messages
+        Raises:
+            ProtocolError
+        """
+        size = len(data) if size is None else size
+        view = memoryview(data)
+        pos = 0
+
+        while pos < size:
+            if not self.receiving:
+                start = data.find(STX_BYTE, pos, size)
+                if start < 0:
+                    break
+                self.receiving = True
+                pos = start + 1
+                continue
+
+            end = data.find(ETX_BYTE, pos, size)
+            start = data.find(STX_BYTE, pos, end if end >= 0 else size)
+            if start >= 0:
+                # new message starts before the current one ended: drop it
+                del self.buffer[:]
+                pos = start + 1
+            elif end >= 0:
+                if self.buffer:
+                    self.buffer += view[pos:end]
+                    msg = self.buffer
+                else:
+                    msg = view[pos:end]
+                try:
+                    # Unicode decoding exception catching,
+                    # consider errors='ignore'
+                    msg_utf8 = str(msg, "utf-8")
+                except UnicodeDecodeError:
+                    self.reset()
+                    raise ProtocolError("UnicodeDecodeError: %s" % (sys.exc_info(),))
+                self.reset()
+                pos = end + 1
+                yield msg_utf8
+            else:
+                self.buffer += view[pos:size]
+                pos = size
+
+        view.release()
+
+        if len(self.buffer) > self.max_size:
+            self.reset()
+
+
 class StandardClient:
-    """Standard JLib client"""
+    """Standard JLib client.
 
-    def __init__(self, server_ip, server_port, protocol, timeout, retries):
+    In pipelined mode (stream protocol only), commands are sent without
+    waiting for the reply of the previous ones. The server replies in order,
+    so the replies are matched to the pending requests first-in first-out.
+    """
+
+    def __init__(
+        self, server_ip, server_port, protocol, timeout, retries, pipelined=False
+    ):
         self.server_ip = server_ip
         self.server_port = server_port
         self.timeout = timeout
@@ -93,6 +178,10 @@ class StandardClient:
         self.__sock = None
         self.__constant_local_port = True
         self._is_connected = False
+        self.recv_buffer_size = RECV_BUFFER_SIZE
+        self.pipelined = pipelined and protocol == PROTOCOL.STREAM
+        self._pending_replies = deque()
+        self._send_lock = gevent.lock.Semaphore()
 
     def __create_socket(self):
         """Create socket"""
@@ -111,6 +200,10 @@ class StandardClient:
         self._is_connected = False
         self.__sock = None
         self.received_msg = None
+        while self._pending_replies:
+            self._pending_replies.popleft().set_exception(
+                SocketError("Socket error: disconnected")
+            )
 
     def connect(self):
         """Socket connect"""
@@ -239,6 +332,10 @@ class StandardClient:
         Args:
             msg(str): Message
         """
+        if self._pending_replies:
+            # pipelined request, replies come in the order of the requests
+            self._pending_replies.popleft().set(msg)
+            return
         self.received_msg = msg
         self.msg_received_event.set()
 
@@ -248,41 +345,17 @@ class StandardClient:
             self.on_connected()
         except Exception:
             pass
-        buffer = empty_buffer()
-        mReceivedSTX = False
+        parser = StreamParser()
+        recv_buffer = bytearray(self.recv_buffer_size)
         while True:
-            ret = self.__sock.recv(4096)
-            if not ret:
+            size = self.__sock.recv_into(recv_buffer)
+            if not size:
                 # connection reset by peer
                 self.error = "Disconnected"
                 self.__close_socket()
                 break
-            for b in ret:
-                if b == STX:
-                    buffer = empty_buffer()
-                    mReceivedSTX = True
-                elif b == ETX:
-                    if mReceivedSTX:
-                        try:
-                            # Unicode decoding exception catching,
-                            # consider errors='ignore'
-                            buffer_utf8 = buffer.decode()
-                        except UnicodeDecodeError as e:
-                            # Syntax not allowed in Python 2
-                            # raise ProtocolError from e
-                            raise ProtocolError(
-                                "UnicodeDecodeError: %s" % (sys.exc_info(),)
-                            )
-                        self.on_message_received(buffer_utf8)
-                        mReceivedSTX = False
-                        buffer = empty_buffer()
-                else:
-                    if mReceivedSTX:
-                        buffer += _bytes([b])
-
-            if len(buffer) > MAX_SIZE_STREAM_MSG:
-                mReceivedSTX = False
-                buffer = empty_buffer()
+            for msg in parser.feed(recv_buffer, size):
+                self.on_message_received(msg)
         try:
             self.on_disconnected()
         except Exception:
@@ -322,6 +395,41 @@ class StandardClient:
                 self.msg_received_event.wait()
             return self.received_msg
 
+    def __send_pipelined(self, cmds):
+        """Send commands without waiting for the replies.
+        Args:
+            cmds(list): commands
+        Returns:
+            (list): AsyncResult for the reply of each command
+        """
+        if not self.is_connected():
+            self.connect()
+        replies = []
+        with self._send_lock:
+            for cmd in cmds:
+                reply = gevent.event.AsyncResult()
+                self._pending_replies.append(reply)
+                replies.append(reply)
+                self.__send_stream(cmd)
+        return replies
+
+    def __wait_replies(self, replies, timeout):
+        """Wait for the replies of pipelined commands.
+        Args:
+            replies(list): AsyncResult of each command
+            timeout(float): Timeout for all the replies [s]
+        Returns:
+            (list): the replies
+        Raises:
+            TimeoutError, SocketError
+        """
+        if timeout is not None and timeout < 0:
+            timeout = self.timeout
+        # a reply arriving after the timeout is still consumed by its
+        # AsyncResult, so that the following replies stay in order
+        with gevent.Timeout(timeout, TimeoutError):
+            return [reply.get() for reply in replies]
+
     def send_receive(self, cmd, timeout=-1):
         """Send/receive command, locking the socket.
         Args:
@@ -329,6 +437,9 @@ class StandardClient:
         Returns:
             (str): reply form the socket
         """
+        if self.pipelined:
+            return self.__wait_replies(self.__send_pipelined([cmd]), timeout)[0]
+
         self._lock.acquire()
         try:
             if (timeout is None) or (timeout >= 0):
@@ -343,6 +454,19 @@ class StandardClient:
             finally:
                 self._lock.release()
 
+    def send_receive_many(self, cmds, timeout=-1):
+        """Send/receive several commands. In pipelined mode all the commands
+        are sent before waiting for the replies.
+        Args:
+            cmds(list): commands
+            timeout(float): Timeout for all the replies [s]
+        Returns:
+            (list): replies from the socket
+        """
+        if self.pipelined:
+            return self.__wait_replies(self.__send_pipelined(cmds), timeout)
+        return [self.send_receive(cmd, timeout) for cmd in cmds]
+
     def send(self, cmd):
         """Send command.
         Args:
@@ -356,6 +480,11 @@ class StandardClient:
             raise ProtocolError(
                 "Protocol error: send command not support in datagram clients"
             )
+        if self.pipelined:
+            # the reply is not used, but takes its place in the order of the
+            # replies, so that it is not given to the next request
+            self.__send_pipelined([cmd])
+            return None
         return self.__send_stream(cmd)
 
     def on_connected(self):
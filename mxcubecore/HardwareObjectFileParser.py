@@ -27,6 +27,8 @@ import xml.sax
 from xml.sax.handler import ContentHandler
 
 from mxcubecore import BaseHardwareObjects
+from mxcubecore.utils import config_cache
+from mxcubecore.utils import startup_profile
 
 
 CURRENT_XML = None
@@ -62,23 +64,53 @@ def parse(filename, name):
     return cur_handler.get_hardware_object()
 
 
-def parse_string(xml_hardware_object, name):
-    """[summary]
+def parse_string(xml_hardware_object, name, file_path=None):
+    """Create a Hardware Object from its XML string representation
 
     Args:
-        xml_hardware_object ([type]): [description]
-        name ([type]): [description]
+        xml_hardware_object (str): The XML string
+        name (str): Name of the Hardware Object
+        file_path (str): XML file path, to use the configuration cache
 
     Returns:
-        [type]: [description]
+        The Hardware Object, or a string for a reference to another file
     """
     global CURRENT_XML
     CURRENT_XML = xml_hardware_object
     cur_handler = HardwareObjectHandler(name)
-    xml.sax.parseString(str.encode(xml_hardware_object), cur_handler)
+    if file_path is None:
+        xml.sax.parseString(str.encode(xml_hardware_object), cur_handler)
+    else:
+        events = config_cache.load(file_path, xml_hardware_object, record_sax_events)
+        replay_sax_events(events, cur_handler)
     return cur_handler.get_hardware_object()
 
 
+def record_sax_events(xml_string):
+    """Parse an XML string into a list of SAX events, that can be cached
+
+    Args:
+        xml_string (str): The XML string
+
+    Returns:
+        list: (method name, arguments) of the ContentHandler calls
+    """
+    recorder = SaxEventsRecorder()
+    xml.sax.parseString(str.encode(xml_string), recorder)
+    return recorder.events
+
+
+def replay_sax_events(events, handler):
+    """Replay SAX events recorded by record_sax_events
+
+    Args:
+        events (list): The SAX events
+        handler (ContentHandler): The handler receiving the events
+    """
+    for method_name, args in events:
+        getattr(handler, method_name)(*args)
+
+
 def load_module(hardware_object_name):
     """[summary]
 
@@ -143,6 +175,24 @@ def instanciate_class(module_name, class_name, object_name):
                 return new_instance
 
 
+class SaxEventsRecorder(ContentHandler):
+    def __init__(self):
+        ContentHandler.__init__(self)
+        self.events = []
+
+    def startElement(self, name, attrs):
+        self.events.append(("startElement", (name, dict(attrs.items()))))
+
+    def characters(self, content):
+        # merge consecutive calls, as done by HardwareObjectHandler buffer
+        if self.events and self.events[-1][0] == "characters":
+            content = self.events.pop()[1][0] + content
+        self.events.append(("characters", (content,)))
+
+    def endElement(self, name):
+        self.events.append(("endElement", (name,)))
+
+
 class HardwareObjectHandler(ContentHandler):
     def __init__(self, name):
         """[summary]
@@ -175,6 +225,13 @@ class HardwareObjectHandler(ContentHandler):
         elif len(self.objects) == 1:
             return self.objects[0]
 
+    def _instanciate(self, module_name, class_name, object_name):
+        """Instanciate a class, profiling the module import separately"""
+        with startup_profile.span(self.name, "import"):
+            load_module(module_name)
+        with startup_profile.span(self.name, "instantiate"):
+            return instanciate_class(module_name, class_name, object_name)
+
     def startElement(self, name, attrs):
         """[summary]
 
@@ -273,7 +330,7 @@ class HardwareObjectHandler(ContentHandler):
                 module_name = str(attrs["class"])
                 class_name = module_name.split(".")[-1]
 
-                new_object = instanciate_class(module_name, class_name, object_name)
+                new_object = self._instanciate(module_name, class_name, object_name)
 
                 if new_object is None:
                     self.class_error = True
@@ -303,7 +360,7 @@ class HardwareObjectHandler(ContentHandler):
                     module_name = str(attrs["class"])
                     class_name = module_name.split(".")[-1]
 
-                    new_object = instanciate_class(module_name, class_name, object_name)
+                    new_object = self._instanciate(module_name, class_name, object_name)
 
                     if new_object is None:
                         self.class_error = True
@@ -27,7 +27,10 @@ All HardwareObjects
 from __future__ import division, absolute_import
 from __future__ import print_function, unicode_literals
 
-from typing import Union
+import bisect
+import fnmatch
+import re
+from typing import Dict, Union
 
 __copyright__ = """ Copyright © 2019 by the MXCuBE collaboration """
 __license__ = "LGPLv3+"
@@ -129,6 +132,13 @@ class Beamline(ConfiguredObject):
         # Beamline object
         self._hardware_object_id_dict = {}
 
+        # Reverse of _hardware_object_id_dict, the "dotted path/attribute"
+        # as key and the hardwareobject as value
+        self._id_hardware_object_dict = {}
+
+        # Sorted list of the "dotted paths/attributes", for prefix queries
+        self._hardware_object_ids = []
+
     def init(self):
         """Object initialisation - executed *after* loading contents"""
         # Validate acquisition parameters
@@ -155,7 +165,37 @@ class Beamline(ConfiguredObject):
         Method called after the initialization of HardwareRepository is done
         (when all HardwreObjects have been created and initialized)
         """
+        self._update_id_index()
+
+    def _update_id_index(self):
+        """
+        (Re)builds the index between HardwareObjects and their
+        "dotted path/attribute" in both directions
+        """
         self._hardware_object_id_dict = self._get_id_dict()
+        self._id_hardware_object_dict = dict(
+            (_id, ho) for ho, _id in self._hardware_object_id_dict.items()
+        )
+        self._hardware_object_ids = sorted(self._id_hardware_object_dict)
+
+    def replace_object(self, role: str, new_object: object) -> None:
+        """Replace already defined Object with a new one - for runtime use
+
+        The index of "dotted path/attribute" is updated, once built.
+
+        Args:
+            role (str): Role name of contained Object
+            new_object (object): New contained Object
+
+        Raises:
+            ValueError: If contained object role is unknown.
+        """
+        super(Beamline, self).replace_object(role, new_object)
+
+        # The index is built at the end of the HardwareRepository loading,
+        # objects replaced during the loading are not indexed one by one
+        if self._hardware_object_id_dict:
+            self._update_id_index()
 
     def get_id(self, ho: HardwareObject) -> str:
         """
@@ -179,13 +219,36 @@ class Beamline(ConfiguredObject):
         Returns:
             HardwareObject with the given id
         """
-        found_ho = None
+        return self._id_hardware_object_dict.get(_id)
 
-        for current_ho, current_id in self._hardware_object_id_dict.items():
-            if current_id == _id:
-                found_ho = current_ho
+    def find_hardware_objects(self, pattern: str) -> Dict[str, HardwareObject]:
+        """
+        Returns the HardwareObjects with an id matching a shell style
+        wildcard pattern, for instance "diffractometer.*" or "*.sampx".
 
-        return found_ho
+        Args:
+            pattern: Pattern matched against the "dotted path/attribute",
+                     see fnmatch. A pattern without wildcard is an exact match.
+        Returns:
+            The matching ids, in sorted order, and their HardwareObject
+        """
+        # Only the ids starting with the literal prefix of the pattern
+        # can match it, they are found by bisection in the sorted ids
+        prefix = re.split(r"[*?\[]", pattern, maxsplit=1)[0]
+        if prefix == pattern:
+            ho = self._id_hardware_object_dict.get(pattern)
+            return {} if ho is None else {pattern: ho}
+
+        ids = self._hardware_object_ids
+        start = bisect.bisect_left(ids, prefix)
+        end = bisect.bisect_left(ids, prefix + "\U0010ffff", lo=start)
+        regex = re.compile(fnmatch.translate(pattern))
+
+        return dict(
+            (_id, self._id_hardware_object_dict[_id])
+            for _id in ids[start:end]
+            if regex.match(_id)
+        )
 
     def _get_id_dict(self) -> dict:
         """
@@ -33,6 +33,7 @@ import json
 
 from mxcubecore.utils.qt_import import QImage, QPixmap, QPoint
 from mxcubecore.utils.conversion import string_types
+from mxcubecore.utils.mjpeg_stream import MjpegStreamReader
 
 from mxcubecore.HardwareObjects.abstract.AbstractVideoDevice import AbstractVideoDevice
 
@@ -43,6 +44,10 @@ class MjpgStreamVideo(AbstractVideoDevice, Device):
     """
     Hardware object to capture images using mjpg-streamer
     and it's input_avt.so plugin for AVT Prosilica cameras.
+
+    The images are read from the MJPEG stream of mjpg-streamer, over a
+    single connection, unless the use_stream property is False, then
+    each image is requested as a snapshot.
     """
 
     # command / control types supported by mjpg-streamer
@@ -264,6 +269,8 @@ class MjpgStreamVideo(AbstractVideoDevice, Device):
         self.plugin = 0
         self.update_controls = None
         self.input_avt = None
+        self.stream_reader = None
+        self._stream_frame_number = 0
 
         self.changing_pars = False
 
@@ -311,6 +318,11 @@ class MjpgStreamVideo(AbstractVideoDevice, Device):
         self.update_controls = self.has_update_controls()
         self.input_avt = self.is_input_avt()
 
+        if self.get_property("use_stream", True):
+            self.stream_reader = MjpegStreamReader(
+                self.host, self.port, self.path + "?action=stream"
+            )
+
         self.image = self.get_new_image()
 
         if self.input_avt:
@@ -792,6 +804,7 @@ class MjpgStreamVideo(AbstractVideoDevice, Device):
 
         if zoom == 0:
             self.using_overview = True
+            self._update_stream_address()
             width = self.sensor_dimensions[0] - 200
             height = self.sensor_dimensions[1] - 200
 
@@ -801,6 +814,7 @@ class MjpgStreamVideo(AbstractVideoDevice, Device):
             pos_y = int(232)
         else:
             self.using_overview = False
+            self._update_stream_address()
 
             print("setting zoom to %s" % zoom)
 
@@ -921,11 +935,29 @@ class MjpgStreamVideo(AbstractVideoDevice, Device):
             fliph, flipv = self.standard_fliph, self.standard_flipv
             offx, offy = self.standard_offsetx, self.standard_offsety
 
-        image = self.http_get("?action=snapshot")
+        if self.stream_reader is not None:
+            image = None
+            self.stream_reader.start()
+            frame = self.stream_reader.wait_frame(self._stream_frame_number, 3)
+            if frame is not None:
+                image, self._stream_frame_number = frame
+        else:
+            image = self.http_get("?action=snapshot")
+
         if image is not None:
             return QImage.fromData(image).mirrored(fliph, flipv)
         return None
 
+    def _update_stream_address(self):
+        """
+        Descript. : reads the stream of the camera in use
+        """
+        if self.stream_reader is not None:
+            if self.using_overview:
+                self.stream_reader.set_address(self.overview_host, self.overview_port)
+            else:
+                self.stream_reader.set_address(self.host, self.port)
+
     def refresh_video(self):
         """
         Descript. : reads new image into member variable, scales it and emits
@@ -36,9 +36,11 @@ class P11ISPyBClient(ISPyBClient):
         self.prepare_collect_for_lims(mx_collection)
         return ISPyBClient._store_data_collection(self, mx_collection, bl_config)
 
-    def store_image(self, image_dict):
+    def _store_image(self, image_dict):
+        # Prepare a copy, the image may be stored again after a failure
+        image_dict = dict(image_dict)
         self.prepare_image_for_lims(image_dict)
-        return ISPyBClient.store_image(self, image_dict)
+        return ISPyBClient._store_image(self, image_dict)
 
     def prepare_collect_for_lims(self, mx_collect_dict):
         # Attention! directory passed by reference. modified in place
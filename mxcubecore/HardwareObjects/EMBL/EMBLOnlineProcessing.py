@@ -102,6 +102,7 @@ class EMBLOnlineProcessing(AbstractOnlineProcessing):
         AbstractOnlineProcessing.__init__(self, name)
 
         self.display_task = None
+        self.live_map_update = False
         self.nxds_input_template = None
 
         self.crystfel_script = None
@@ -120,6 +121,14 @@ class EMBLOnlineProcessing(AbstractOnlineProcessing):
 
         self.result_types = []
 
+        # Result store: cells of the frames, frames with results and
+        # frames changed since the last update, average intensities
+        self.frame_cells = None
+        self.results_filled = None
+        self.results_changed = None
+        self.average_i_buffer = None
+        self.average_i_count = 0
+
     def init(self):
         self.chan_dozor_average_i = self.get_channel_object("chanDozorAverageI")
         if self.chan_dozor_average_i is not None:
@@ -153,6 +162,8 @@ class EMBLOnlineProcessing(AbstractOnlineProcessing):
             self.chan_dozor_is.connect_signal("update", self.dozor_is_changed)
 
         self.crystfel_script = self.get_property("crystfel_script")
+        # Heat map updates during the processing, disabled by default
+        self.live_map_update = self.get_property("live_map_update", False)
 
         if self.get_property("nxds_input_template_file") is not None:
             with open(
@@ -199,6 +210,89 @@ class EMBLOnlineProcessing(AbstractOnlineProcessing):
 
         input_file.exportToFile(processing_input_filename)
 
+    def prepare_processing(self):
+        AbstractOnlineProcessing.prepare_processing(self)
+        self.prepare_result_store()
+
+    def prepare_result_store(self):
+        """Prepares the result store of the prepared processing: the grid
+        cells of the frames, and the arrays of the results that are not
+        sized from the number of images
+        """
+        images_num = self.params_dict["images_num"]
+        if self.params_dict["lines_num"] > 1:
+            cols = np.empty(images_num, dtype=np.intp)
+            rows = np.empty(images_num, dtype=np.intp)
+            for frame_num in range(images_num):
+                cols[frame_num], rows[frame_num] = self.grid.get_col_row_from_image(
+                    frame_num
+                )
+            self.frame_cells = (cols, rows)
+        else:
+            self.frame_cells = None
+
+        self.results_filled = dict(
+            (key, np.zeros(images_num, dtype=bool))
+            for key, value in self.results_raw.items()
+            if value.size == images_num
+        )
+        self.results_changed = np.zeros(images_num, dtype=bool)
+
+        # Average intensities are appended at each event, to a buffer
+        # extended by doubling its size when full
+        self.average_i_buffer = np.zeros(max(images_num, 1))
+        self.average_i_count = 0
+        if "average_intensity" in self.results_raw:
+            self.results_raw["average_intensity"] = self.average_i_buffer[:0]
+            self.results_aligned["average_intensity"] = self.average_i_buffer[:0]
+
+    def store_results(self, frame_nums, results):
+        """Stores and aligns the results of frames
+
+        :param frame_nums: frame numbers
+        :type frame_nums: numpy array of int
+        :param results: results of the frames by result key
+        :type results: dict of numpy arrays
+        """
+        frame_nums = np.asarray(frame_nums, dtype=np.intp)
+        if self.frame_cells is not None:
+            cells = (
+                self.frame_cells[0][frame_nums],
+                self.frame_cells[1][frame_nums],
+            )
+        else:
+            cells = frame_nums
+
+        for key, values in results.items():
+            self.results_raw[key][frame_nums] = values
+            self.results_aligned[key][cells] = values
+            self.results_filled[key][frame_nums] = True
+        self.results_changed[frame_nums] = True
+
+    def get_results_changes(self):
+        """Returns the results changed since the previous call
+
+        :returns: frame numbers ("frames"), grid cells ("cols" and "rows",
+                  for meshes) and results by key ("results") of the
+                  changed frames, None if there is no change
+        :rtype: dict
+        """
+        frame_nums = np.flatnonzero(self.results_changed)
+        if frame_nums.size == 0:
+            return None
+        self.results_changed[frame_nums] = False
+
+        changes = {
+            "frames": frame_nums,
+            "results": dict(
+                (key, self.results_raw[key][frame_nums]) for key in self.results_filled
+            ),
+        }
+        if self.frame_cells is not None:
+            changes["cols"] = self.frame_cells[0][frame_nums]
+            changes["rows"] = self.frame_cells[1][frame_nums]
+        return changes
+
     def run_processing(self, data_collection):
         """
         :param data_collection: data collection object
@@ -212,7 +306,8 @@ class EMBLOnlineProcessing(AbstractOnlineProcessing):
             self.start_crystfel_autoproc(all_file_filename)
 
         self.started = True
-        self.display_task = gevent.spawn(self.update_map)
+        if self.live_map_update:
+            self.display_task = gevent.spawn(self.update_map)
 
         if self.chan_dozor_pass is None:
             # Start dozor via EDNA
@@ -448,32 +543,23 @@ class EMBLOnlineProcessing(AbstractOnlineProcessing):
             else:
                 logging.getLogger("HWR").info("Dozor scores %s of %s %s"%(len(batch), self.params_dict["images_num"],self.batch_count))
 
-            for image in batch:
-                frame_num = int(image[0])
-                self.results_raw["spots_num"][frame_num] = image[1]
-                if image[3] != 0:
-                    self.results_raw["spots_resolution"][frame_num] = 1 / image[3]
-                self.results_raw["score"][frame_num] = image[2]
-
-                for score_key in self.results_raw.keys():
-                    self.align_result(score_key, frame_num)
-
-    def align_result(self, score_key, frame_num):
-        if self.params_dict["lines_num"] > 1:
-            col, row = self.grid.get_col_row_from_image(frame_num)
-            self.results_aligned[score_key][col][row] = self.results_raw[score_key][frame_num]
-        else:
-            self.results_aligned[score_key][frame_num] = self.results_raw[score_key][frame_num]
+            # Columns: frame number, spots number, score, 1 / resolution
+            batch = np.array(batch, dtype=float).reshape(len(batch), -1)
+            frame_nums = batch[:, 0].astype(np.intp)
+            self.store_results(
+                frame_nums, {"spots_num": batch[:, 1], "score": batch[:, 2]}
+            )
+            with_resolution = batch[:, 3] != 0
+            self.store_results(
+                frame_nums[with_resolution],
+                {"spots_resolution": 1 / batch[with_resolution, 3]},
+            )
 
     def dozor_is_changed(self, is_values):
         if self.started:
-            for is_value in is_values:
-                if isinstance(is_value,(list,tuple)):
-                    self.results_raw["is"][is_value[0]] = is_value[1]
-                    self.align_result("is", is_value[0])
-                else:
-                    self.results_raw["is"][is_values[0]] = is_values[1]
-                    self.align_result("is", is_values[0])
+            # (frame number, intensity) pairs, or a single pair
+            values = np.array(is_values, dtype=float).reshape(-1, 2)
+            self.store_results(values[:, 0].astype(np.intp), {"is": values[:, 1]})
 
             if isinstance(is_values,tuple):
                 self.is_count = self.is_count + 1
@@ -499,24 +585,37 @@ class EMBLOnlineProcessing(AbstractOnlineProcessing):
 
     def dozor_average_i_changed(self, average_i_value):
         if self.started:
-            self.results_raw["average_intensity"] = np.append(
-                self.results_raw["average_intensity"], average_i_value
-            )
-            self.results_aligned["average_intensity"] = np.append(
-                self.results_aligned["average_intensity"], average_i_value
-            )
+            values = np.ravel(average_i_value)
+            count = self.average_i_count + values.size
+            if count > self.average_i_buffer.size:
+                buffer = np.zeros(max(count, 2 * self.average_i_buffer.size))
+                buffer[: self.average_i_count] = self.average_i_buffer[
+                    : self.average_i_count
+                ]
+                self.average_i_buffer = buffer
+            self.average_i_buffer[self.average_i_count : count] = values
+            self.average_i_count = count
+
+            self.results_raw["average_intensity"] = self.average_i_buffer[:count]
+            self.results_aligned["average_intensity"] = self.results_raw[
+                "average_intensity"
+            ]
 
     def update_map(self):
-        return
         """
-        Emits heat map update signal
+        Emits heat map update signals when results have changed, with
+        processingResultsChanged the changed frames only.
+        Started only if the live_map_update property is set
         :return:
         """
         gevent.sleep(1)
         while self.started:
-            self.emit("processingResultsUpdate", False)
-            if self.params_dict["lines_num"] > 1:
-                self.grid.set_score(self.results_raw["score"])
+            changes = self.get_results_changes()
+            if changes is not None:
+                if self.params_dict["lines_num"] > 1:
+                    self.grid.set_score(self.results_raw["score"])
+                self.emit("processingResultsChanged", changes)
+                self.emit("processingResultsUpdate", False)
             gevent.sleep(0.5)
 
     def store_processing_results(self, status):
@@ -526,7 +625,9 @@ class EMBLOnlineProcessing(AbstractOnlineProcessing):
         :return:
         """
         GenericOnlineProcessing.store_processing_results(self, status)
-        self.display_task.kill()
+        if self.display_task is not None:
+            self.display_task.kill()
+            self.display_task = None
         gevent.spawn(self.create_hit_list_files)
 
     def store_result_xml(self):
@@ -33,6 +33,8 @@ differ from the default ones.
   <state_suffix>State</state_suffix>
   Use the global application state instead of the motor state.
   <use_global_state>False</use_global_state>
+  Send the requests without waiting for the replies of the previous ones.
+  <pipelined>False</pipelined>
 """
 
 import sys
@@ -59,6 +61,7 @@ class ExporterMotor(AbstractMotor):
         self._exporter_address = None
         self.motor_position_chan = None
         self.motor_state_chan = None
+        self.motor_state_name = None
         self.use_state = None
 
     def init(self):
@@ -68,16 +71,18 @@ class ExporterMotor(AbstractMotor):
         self._motor_pos_suffix = self.get_property("position_suffix", "Position")
         self._motor_state_suffix = self.get_property("state_suffix", "State")
         self.use_state = self.get_property("use_global_state", False)
+        _pipelined = self.get_property("pipelined", False)
 
         self._exporter_address = self.get_property("exporter_address")
         _host, _port = self._exporter_address.split(":")
-        self._exporter = Exporter(_host, int(_port))
+        self._exporter = Exporter(_host, int(_port), pipelined=_pipelined)
 
         self.motor_position_chan = self.add_channel(
             {
                 "type": "exporter",
                 "exporter_address": self._exporter_address,
                 "name": "position",
+                "pipelined": _pipelined,
             },
             self.actuator_name + self._motor_pos_suffix,
         )
@@ -86,16 +91,17 @@ class ExporterMotor(AbstractMotor):
             self.motor_position_chan.connect_signal("update", self.update_value)
 
         if self.use_state:
-            _name = "State"
+            self.motor_state_name = "State"
         else:
-            _name = self.actuator_name + self._motor_state_suffix
+            self.motor_state_name = self.actuator_name + self._motor_state_suffix
         self.motor_state_chan = self.add_channel(
             {
                 "type": "exporter",
                 "exporter_address": self._exporter_address,
                 "name": "motor_state",
+                "pipelined": _pipelined,
             },
-            _name,
+            self.motor_state_name,
         )
 
         if self.motor_state_chan:
@@ -141,17 +147,18 @@ class ExporterMotor(AbstractMotor):
         return self._exporter.read_property("State")
 
     def _ready(self):
-        """Get the "Ready" state - software and hardware.
+        """Get the "Ready" state - software and hardware. The states are
+        read together, in one round trip in pipelined mode.
         Returns:
             (bool): True if both "Ready", False otherwise.
         """
-        if (
-            self._get_swstate() == "Ready"
-            and self._get_hwstate() == "Ready"
-            and self.motor_state_chan.get_value() == "Ready"
-        ):
-            return True
-        return False
+        _swstate, _hwstate, _motor_state = self._exporter.read_properties(
+            ["State", "HardwareState", self.motor_state_name]
+        )
+        # as in _get_hwstate, HardwareState is "Ready" if it cannot be read
+        if _hwstate is None:
+            _hwstate = "Ready"
+        return _swstate == _hwstate == _motor_state == "Ready"
 
     def _wait_ready(self, timeout=3):
         """Wait for the state to be "Ready".
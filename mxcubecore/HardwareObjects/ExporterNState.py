@@ -27,6 +27,7 @@ Example xml file:
   <state_channel_name>State</state_channel_name>
   <values>{"IN": False, "OUT": True}</values>
   <value_state>True</value_state>
+  <pipelined>False</pipelined>
 </device>
 """
 from enum import Enum
@@ -59,15 +60,17 @@ class ExporterNState(AbstractNState):
         self.use_value_as_state = self.get_property("value_state")
         state_channel = self.get_property("state_channel_name", "State")
 
+        _pipelined = self.get_property("pipelined", False)
         _exporter_address = self.get_property("exporter_address")
         _host, _port = _exporter_address.split(":")
-        self._exporter = Exporter(_host, int(_port))
+        self._exporter = Exporter(_host, int(_port), pipelined=_pipelined)
 
         self.value_channel = self.add_channel(
             {
                 "type": "exporter",
                 "exporter_address": _exporter_address,
                 "name": value_channel.lower(),
+                "pipelined": _pipelined,
             },
             value_channel,
         )
@@ -78,6 +81,7 @@ class ExporterNState(AbstractNState):
                 "type": "exporter",
                 "exporter_address": _exporter_address,
                 "name": "state",
+                "pipelined": _pipelined,
             },
             state_channel,
         )
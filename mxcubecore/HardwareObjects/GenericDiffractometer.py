@@ -271,6 +271,12 @@ class GenericDiffractometer(HardwareObject):
         )
         # not updating state inmediately after cmd started
 
+        # motor roles that must be in position before a motor moves,
+        # by motor role, to avoid collisions
+        self.motion_dependencies = {}
+        # duration of the last motion of each motor, by motor role
+        self.motion_times = {}
+
         # Internal values -----------------------------------------------------
         self.ready_event = None
         self.head_type = GenericDiffractometer.HEAD_TYPE_MINIKAPPA
@@ -464,6 +470,16 @@ class GenericDiffractometer(HardwareObject):
                 self.centring_sampy = sample_centring.CentringMotor(
                     self.motor_hwobj_dict["sampy"]
                 )
+                loop_detection_roi = self.get_property("loop_detection_roi")
+                if isinstance(loop_detection_roi, str):
+                    loop_detection_roi = eval(loop_detection_roi)
+                sample_centring.LOOP_DETECTION_ROI = loop_detection_roi
+                sample_centring.LOOP_DETECTION_BINNING = self.get_property(
+                    "loop_detection_binning", 1
+                )
+                sample_centring.OVERLAP_LOOP_DETECTION = self.get_property(
+                    "overlap_loop_detection", False
+                )
         except Exception:
             pass  # used the default value
 
@@ -472,6 +488,11 @@ class GenericDiffractometer(HardwareObject):
         except Exception:
             pass
 
+        motion_dependencies = self.get_property("motion_dependencies", {})
+        if isinstance(motion_dependencies, str):
+            motion_dependencies = eval(motion_dependencies)
+        self.motion_dependencies = motion_dependencies
+
         # Other parameters ---------------------------------------------------
         try:
             self.zoom_centre = eval(self.get_property("zoom_centre"))
@@ -1070,6 +1091,66 @@ class GenericDiffractometer(HardwareObject):
         else:
             raise NotImplementedError
 
+    def motor_positions_to_screen_batch(self, centred_positions_list):
+        """
+        Descript. : projects several centred positions on the screen. The
+                    motor positions and the zoom calibration are read once
+                    for all the positions.
+        :param centred_positions_list: centred positions as dict
+        :type centred_positions_list: list
+        :returns: screen coordinates (x, y) of each position
+        :rtype: list of tuple
+        """
+        if not centred_positions_list:
+            return []
+        if (
+            not self.use_sample_centring
+            or type(self).motor_positions_to_screen
+            is not GenericDiffractometer.motor_positions_to_screen
+        ):
+            # Subclasses projecting positions their own way
+            return [
+                self.motor_positions_to_screen(centred_positions_dict)
+                for centred_positions_dict in centred_positions_list
+            ]
+
+        self.update_zoom_calibration()
+        if None in (self.pixels_per_mm_x, self.pixels_per_mm_y):
+            return [(0, 0)] * len(centred_positions_list)
+
+        motors = (
+            ("sampx", self.centring_sampx),
+            ("sampy", self.centring_sampy),
+            ("phiy", self.centring_phiy),
+            ("phiz", self.centring_phiz),
+        )
+        # One row per motor, one column per position
+        offsets = numpy.array(
+            [
+                [
+                    centred_positions_dict[motor_name]
+                    for centred_positions_dict in centred_positions_list
+                ]
+                for motor_name, _ in motors
+            ],
+            dtype=float,
+        )
+        offsets -= numpy.array([[motor.get_value()] for _, motor in motors])
+        offsets *= numpy.array([[motor.direction] for _, motor in motors])
+        sampx, sampy, phiy, phiz = offsets
+
+        phi_angle = math.radians(
+            self.centring_phi.direction * self.centring_phi.get_value()
+        )
+        # Second coordinate of (sampx, sampy) times the inverse rotation
+        dy = (
+            sampx * math.sin(phi_angle) + sampy * math.cos(phi_angle)
+        ) * self.pixels_per_mm_x
+
+        x = phiy * self.pixels_per_mm_x + self.beam_position[0]
+        y = dy + phiz * self.pixels_per_mm_y + self.beam_position[1]
+        return list(zip(x.tolist(), y.tolist()))
+
     def move_to_centred_position(self, centred_position):
         """ """
         self.move_motors(centred_position)
@@ -1086,44 +1167,108 @@ class GenericDiffractometer(HardwareObject):
 
     def move_motors(self, motor_positions, timeout=15):
         """
-        Moves diffractometer motors to the requested positions
+        Moves diffractometer motors to the requested positions. Motors
+        move concurrently, except motors with motion dependencies that
+        start when the motors they depend on are in position.
 
         :param motors_dict: dictionary with motor names or hwobj
                             and target values.
         :type motors_dict: dict
+        :param timeout: timeout of the whole motion in seconds
+        :type timeout: float
+        :returns: motion duration of each motor in seconds
+        :rtype: dict
         """
         if not isinstance(motor_positions, dict):
             motor_positions = motor_positions.as_dict()
 
         self.wait_device_ready(timeout)
 
-        for motor in motor_positions.keys():
-            position = motor_positions[motor]
-            self.log.debug(u"moving motor {motor} to position {position}")
-            """
-            if isinstance(motor, (str, unicode)):
-                logging.getLogger("HWR").debug(" Moving %s to %s" % (motor, position))
-            else:
-                logging.getLogger("HWR").debug(
-                    " Moving %s to %s" % (str(motor.name()), position)
-                )
-            """
+        motors = {}
+        for motor, position in motor_positions.items():
             if isinstance(motor, (str, unicode)):
                 motor_role = motor
                 motor = self.motor_hwobj_dict.get(motor_role)
-                # del motor_positions[motor_role]
                 if None in (motor, position):
                     continue
-                # motor_positions[motor] = position
-            motor.set_value(position)
-        self.wait_device_ready(timeout)
+            else:
+                motor_role = motor.name()
+            motors[motor_role] = (motor, position)
+
+        start_time = time.time()
+        self.motion_times = {}
+        with gevent.Timeout(timeout, Exception("Timeout waiting for motors")):
+            for motor_roles in self.get_motion_stages(motors):
+                tasks = [
+                    gevent.spawn(self._move_motor, motor_role, *motors[motor_role])
+                    for motor_role in motor_roles
+                ]
+                try:
+                    gevent.joinall(tasks, raise_error=True)
+                finally:
+                    gevent.killall(tasks)
+                for motor_role, task in zip(motor_roles, tasks):
+                    self.motion_times[motor_role] = task.value
+
+            self.wait_device_ready(timeout)
+
+        if self.motion_times:
+            slowest = max(self.motion_times, key=self.motion_times.get)
+            self.log.debug(
+                "Motors moved in %.3f s, slowest motor %s (%.3f s)",
+                time.time() - start_time,
+                slowest,
+                self.motion_times[slowest],
+            )
+        return self.motion_times
+
+    def get_motion_stages(self, motor_roles):
+        """
+        Orders motor moves according to the motion dependencies. Only the
+        dependencies between the given motors are taken into account.
+
+        :param motor_roles: roles of the motors to move
+        :type motor_roles: iterable
+        :returns: roles of the motors moving together, by stage
+        :rtype: list of lists
+        """
+        remaining = dict(
+            (
+                motor_role,
+                set(self.motion_dependencies.get(motor_role, ())).intersection(
+                    motor_roles
+                ),
+            )
+            for motor_role in motor_roles
+        )
+        stages = []
+        while remaining:
+            stage = [role for role, deps in remaining.items() if not deps]
+            if not stage:
+                raise ValueError(
+                    "Circular motion dependencies between %s" % sorted(remaining)
+                )
+            for motor_role in stage:
+                del remaining[motor_role]
+            for deps in remaining.values():
+                deps.difference_update(stage)
+            stages.append(stage)
+        return stages
+
+    def _move_motor(self, motor_role, motor, position):
+        start_time = time.time()
+        motor.set_value(position)
+        if not hasattr(motor, "wait_ready"):
+            return time.time() - start_time
 
         if self.delay_state_polling is not None and self.delay_state_polling > 0:
             # delay polling for state in the
             # case of controller not reporting MOVING inmediately after cmd
-            gevent.sleep(self.delay_state_polling)
-
-        self.wait_device_ready(timeout)
+            with gevent.Timeout(self.delay_state_polling, False):
+                while motor.is_ready():
+                    gevent.sleep(0.01)
+        motor.wait_ready()
+        return time.time() - start_time
 
     def move_motors_done(self, move_motors_procedure):
         """
@@ -22,6 +22,13 @@ from suds import WebFault
 from suds.client import Client
 from mxcubecore.BaseHardwareObjects import HardwareObject
 from mxcubecore.utils.conversion import string_types
+from mxcubecore.utils.ttl_cache import TTLCache
+from mxcubecore.utils.soap_client_pool import (
+    ClientPool,
+    SessionTransport,
+    create_session,
+    get_wsdl_cache,
+)
 from mxcubecore import HardwareRepository as HWR
 
 """
@@ -69,6 +76,79 @@ SampleReference = namedtuple(
 )
 
 
+class SampleReferenceIndex:
+    """
+    Sample references indexed by location and by code, for the
+    reconciliation of the LIMS samples with the sample changer ones.
+    A search returns the first matching sample, in the order of the
+    references, as a linear search would.
+    """
+
+    def __init__(self, sample_refs):
+        # The references not removed yet, by position in sample_refs
+        self._sample_refs = dict(enumerate(sample_refs))
+        self._by_location = {}
+        self._by_code = {}
+        for position, sample_ref in self._sample_refs.items():
+            location = (sample_ref.container_reference, sample_ref.sample_reference)
+            self._by_location.setdefault(location, []).append(position)
+            self._by_code.setdefault(sample_ref.code, []).append(position)
+
+    def __iter__(self):
+        return iter(list(self._sample_refs.values()))
+
+    def __len__(self):
+        return len(self._sample_refs)
+
+    def _first(self, positions, code=None):
+        for position in positions:
+            sample_ref = self._sample_refs.get(position)
+            if sample_ref is not None and (code is None or sample_ref.code == code):
+                return position
+        return None
+
+    def _find(self, code=None, location=None):
+        if code and location:
+            positions = self._by_location.get(tuple(location), ())
+            return self._first(positions, code)
+        elif code:
+            return self._first(self._by_code.get(code, ()))
+        elif location:
+            return self._first(self._by_location.get(tuple(location), ()))
+        return None
+
+    def find(self, code=None, location=None):
+        """
+        Returns the first sample with the matching "search criteria" <code>
+        and/or <location>.
+
+        :param code: The vial datamatrix code (or bar code)
+        :param type: str
+
+        :param location: A tuple (<basket>, <vial>) to search for.
+        :type location: tuple
+        """
+        position = self._find(code, location)
+        return None if position is None else self._sample_refs[position]
+
+    def remove(self, sample_ref):
+        """
+        Removes the first sample equal to <sample_ref>, as list.remove
+
+        :raises: ValueError if there is no such sample
+        """
+        position = None
+        if sample_ref is not None:
+            location = (sample_ref.container_reference, sample_ref.sample_reference)
+            for candidate in self._by_location.get(location, ()):
+                if self._sample_refs.get(candidate) == sample_ref:
+                    position = candidate
+                    break
+        if position is None:
+            raise ValueError("SampleReferenceIndex.remove(x): x not in index")
+        del self._sample_refs[position]
+
+
 def trace(fun):
     def _trace(*args):
         log_msg = "lims client " + fun.__name__ + " called with: "
@@ -168,6 +248,8 @@ class ISPyBClient(HardwareObject):
         self._autoproc_ws = None
         self._translations = {}
         self._disabled = False
+        # Cache of proposals, sessions and samples read from ISPyB
+        self._cache = TTLCache()
 
         self.authServerType = None
         self.loginTranslate = None
@@ -207,6 +289,8 @@ class ISPyBClient(HardwareObject):
         if not self.ws_password:
             self.ws_password = _WS_PASSWORD
 
+        self._cache.ttl = float(self.get_property("cache_ttl", 60))
+
         self.proxy_address = self.get_property("proxy_address")
         if self.proxy_address:
             self.proxy = {"http": self.proxy_address, "https": self.proxy_address}
@@ -235,72 +319,60 @@ class ISPyBClient(HardwareObject):
                 _WS_COLLECTION_URL = _WSDL_ROOT + "ToolsForCollectionWebService?wsdl"
                 _WS_AUTOPROC_URL = _WSDL_ROOT + "ToolsForAutoprocessingWebService?wsdl"
 
-                if self.ws_root.strip().startswith("https://"):
-                    from suds.transport.https import HttpAuthenticated
-                else:
-                    from suds.transport.http import HttpAuthenticated
-
-                t1 = HttpAuthenticated(
-                    username=self.ws_username,
-                    password=self.ws_password,
-                    proxy=self.proxy,
-                )
-
-                t2 = HttpAuthenticated(
-                    username=self.ws_username,
-                    password=self.ws_password,
-                    proxy=self.proxy,
-                )
-
-                t3 = HttpAuthenticated(
-                    username=self.ws_username,
-                    password=self.ws_password,
-                    proxy=self.proxy,
+                # The four web services share the cache of parsed WSDL and
+                # the keep-alive session, each one with its own transport.
+                # Each one is a bounded pool of clients, so that calls from
+                # different greenlets do not wait for each other
+                pool_size = int(self.get_property("ws_pool_size", 4))
+                cache = get_wsdl_cache(
+                    self.get_property("wsdl_cache_directory"),
+                    int(self.get_property("wsdl_cache_days", 1)),
                 )
-
-                t4 = HttpAuthenticated(
+                session = create_session(4 * pool_size)
+                credentials = dict(
                     username=self.ws_username,
                     password=self.ws_password,
                     proxy=self.proxy,
                 )
 
                 try:
-                    self._shipping = Client(
+                    self._shipping = ClientPool(
                         _WS_SHIPPING_URL,
+                        size=pool_size,
                         timeout=3,
-                        transport=t1,
-                        cache=None,
+                        transport=SessionTransport(session, **credentials),
+                        cache=cache,
                         proxy=self.proxy,
                     )
-                    self._collection = Client(
+                    self._collection = ClientPool(
                         _WS_COLLECTION_URL,
+                        size=pool_size,
                         timeout=3,
-                        transport=t2,
-                        cache=None,
+                        transport=SessionTransport(session, **credentials),
+                        cache=cache,
                         proxy=self.proxy,
                     )
-                    self._tools_ws = Client(
+                    self._tools_ws = ClientPool(
                         _WS_BL_SAMPLE_URL,
+                        size=pool_size,
                         timeout=3,
-                        transport=t3,
-                        cache=None,
+                        transport=SessionTransport(session, **credentials),
+                        cache=cache,
                         proxy=self.proxy,
                     )
-                    self._autoproc_ws = Client(
+                    self._autoproc_ws = ClientPool(
                         _WS_AUTOPROC_URL,
+                        size=pool_size,
                         timeout=3,
-                        transport=t4,
-                        cache=None,
+                        transport=SessionTransport(session, **credentials),
+                        cache=cache,
                         proxy=self.proxy,
                     )
 
-                    # ensure that suds do not create those files in tmp
-                    self._shipping.set_options(cache=None, location=_WS_SHIPPING_URL)
-                    self._collection.set_options(
-                        cache=None, location=_WS_COLLECTION_URL
-                    )
-                    self._tools_ws.set_options(cache=None, location=_WS_BL_SAMPLE_URL)
-                    self._autoproc_ws.set_options(cache=None, location=_WS_AUTOPROC_URL)
+                    self._shipping.set_options(location=_WS_SHIPPING_URL)
+                    self._collection.set_options(location=_WS_COLLECTION_URL)
+                    self._tools_ws.set_options(location=_WS_BL_SAMPLE_URL)
+                    self._autoproc_ws.set_options(location=_WS_AUTOPROC_URL)
                 except URLError:
                     logging.getLogger("ispyb_client").exception(_CONNECTION_ERROR_MSG)
                     return
@@ -403,6 +475,13 @@ class ISPyBClient(HardwareObject):
         :returns: The dict (Proposal, Person, Laboratory, Sessions, Status).
         :rtype: dict
         """
+        return self._cache.read_through(
+            ("proposal", proposal_code, proposal_number),
+            lambda: self._get_proposal(proposal_code, proposal_number),
+            lambda result: result["status"]["code"] == "ok",
+        )
+
+    def _get_proposal(self, proposal_code, proposal_number):
         logging.getLogger("HWR").debug(
             "ISPyB. Obtaining proposal for code=%s / prop_number=%s"
             % (proposal_code, proposal_number)
@@ -654,6 +733,7 @@ class ISPyBClient(HardwareObject):
         proposal_number = ""
 
         self.login_ok = False
+        self._cache.invalidate()
 
         # For porposal login, split the loginID to code and numbers
         if self.loginType == "proposal":
@@ -1028,6 +1108,10 @@ class ISPyBClient(HardwareObject):
                 status = {}
             except URLError:
                 logging.getLogger("ispyb_client").exception(_CONNECTION_ERROR_MSG)
+            finally:
+                # after the write, values read meanwhile are outdated
+                self._cache.invalidate("bl_sample")
+                self._cache.invalidate("samples")
 
             return status
         else:
@@ -1045,6 +1129,43 @@ class ISPyBClient(HardwareObject):
 
         :returns: None
         """
+        try:
+            return self._store_image(image_dict)
+        except WebFault:
+            logging.getLogger("ispyb_client").exception(
+                "ISPyBClient: exception in store_image"
+            )
+        except URLError:
+            logging.getLogger("ispyb_client").exception(_CONNECTION_ERROR_MSG)
+
+    def store_images(self, image_dicts):
+        """
+        Stores the images <image_dicts>, in order. Contrary to store_image,
+        WebFault and URLError are raised, so that the caller can retry.
+
+        :param image_dicts: Dictionaries with image parameters, each one is
+                            removed from the list once stored.
+        :type image_dicts: list
+
+        :returns: The ids of the stored images
+        :rtype: list
+        """
+        image_ids = []
+        while image_dicts:
+            image_ids.append(self._store_image(image_dicts[0]))
+            del image_dicts[0]
+        return image_ids
+
+    def _store_image(self, image_dict):
+        """
+        Stores the image (image parameters) <image_dict>
+
+        :param image_dict: A dictonary with image pramaters.
+        :type image_dict: dict
+
+        :returns: The image id
+        :raises: WebFault, URLError
+        """
         if self._disabled:
             return
 
@@ -1053,18 +1174,11 @@ class ISPyBClient(HardwareObject):
                 "Storing image in lims. data to store: %s" % str(image_dict)
             )
             if "dataCollectionId" in image_dict:
-                try:
-                    image_id = self._collection.service.storeOrUpdateImage(image_dict)
-                    logging.getLogger("HWR").debug(
-                        "  - storing image in lims ok. id : %s" % image_id
-                    )
-                    return image_id
-                except WebFault:
-                    logging.getLogger("ispyb_client").exception(
-                        "ISPyBClient: exception in store_image"
-                    )
-                except URLError:
-                    logging.getLogger("ispyb_client").exception(_CONNECTION_ERROR_MSG)
+                image_id = self._collection.service.storeOrUpdateImage(image_dict)
+                logging.getLogger("HWR").debug(
+                    "  - storing image in lims ok. id : %s" % image_id
+                )
+                return image_id
             else:
                 logging.getLogger("ispyb_client").error(
                     "Error in store_image: "
@@ -1075,42 +1189,17 @@ class ISPyBClient(HardwareObject):
                 "Error in store_image: could not connect to server"
             )
 
-    def __find_sample(self, sample_ref_list, code=None, location=None):
+    def _find_sample_info(self, proposal_id):
         """
-        Returns the sample with the matching "search criteria" <code> and/or
-        <location> with-in the list sample_ref_list.
-
-        The sample_ref object is defined in the head of the file.
-
-        :param sample_ref_list: The list of sample_refs to search.
-        :type sample_ref: list
-
-        :param code: The vial datamatrix code (or bar code)
-        :param type: str
-
-        :param location: A tuple (<basket>, <vial>) to search for.
-        :type location: tuple
+        Returns the samples of the proposal <proposal_id> for the beamline,
+        as found by findSampleInfoLightForProposal (cached).
         """
-        for sample_ref in sample_ref_list:
-
-            if code and location:
-                if (
-                    sample_ref.code == code
-                    and sample_ref.container_reference == location[0]
-                    and sample_ref.sample_reference == location[1]
-                ):
-                    return sample_ref
-            elif code:
-                if sample_ref.code == code:
-                    return sample_ref
-            elif location:
-                if (
-                    sample_ref.container_reference == location[0]
-                    and sample_ref.sample_reference == location[1]
-                ):
-                    return sample_ref
-
-        return None
+        return self._cache.read_through(
+            ("samples", proposal_id),
+            lambda: self._tools_ws.service.findSampleInfoLightForProposal(
+                proposal_id, self.beamline_name
+            ),
+        )
 
     @trace
     def get_samples(self, proposal_id, session_id):
@@ -1118,11 +1207,7 @@ class ISPyBClient(HardwareObject):
 
         if self._tools_ws:
             try:
-                response_samples = (
-                    self._tools_ws.service.findSampleInfoLightForProposal(
-                        proposal_id, self.beamline_name
-                    )
-                )
+                response_samples = self._find_sample_info(proposal_id)
 
                 response_samples = [
                     utf_encode(asdict(sample)) for sample in response_samples
@@ -1164,20 +1249,15 @@ class ISPyBClient(HardwareObject):
         :rtype: list
         """
         if self._tools_ws:
-            sample_references = []
             session = self.get_session(session_id)
             response_samples = []
 
-            for sample_ref in sample_refs:
-                sample_reference = SampleReference(*sample_ref)
-                sample_references.append(sample_reference)
+            sample_references = SampleReferenceIndex(
+                SampleReference(*sample_ref) for sample_ref in sample_refs
+            )
 
             try:
-                response_samples = (
-                    self._tools_ws.service.findSampleInfoLightForProposal(
-                        proposal_id, self.beamline_name
-                    )
-                )
+                response_samples = self._find_sample_info(proposal_id)
 
             except WebFault as e:
                 logging.getLogger("ispyb_client").exception(str(e))
@@ -1204,15 +1284,13 @@ class ISPyBClient(HardwareObject):
                     # Sample location and code was found in ISPyB and they match
                     # with the sample changer.
                     elif sample.code and sample.sampleLocation:
-                        sc_sample = self.__find_sample(
-                            sample_references, code=sample.code, location=loc
+                        sc_sample = sample_references.find(
+                            code=sample.code, location=loc
                         )
 
                         # The sample codes dose not match
                         if not sc_sample:
-                            sc_sample = self.__find_sample(
-                                sample_references, location=loc
-                            )
+                            sc_sample = sample_references.find(location=loc)
 
                             if sc_sample.code != "":
                                 sample.code = sc_sample.code
@@ -1222,7 +1300,7 @@ class ISPyBClient(HardwareObject):
                     # Only location was found, update with the code
                     # from sample changer if it exists.
                     elif sample.sampleLocation:
-                        sc_sample = self.__find_sample(sample_references, location=loc)
+                        sc_sample = sample_references.find(location=loc)
                         if sc_sample:
                             sample.sampleCode = sc_sample.code
                             sample_references.remove(sc_sample)
@@ -1243,7 +1321,7 @@ class ISPyBClient(HardwareObject):
                             int(sample.sampleLocation),
                         )
 
-                        sc_sample = self.__find_sample(sample_references, location=loc)
+                        sc_sample = sample_references.find(location=loc)
                         if sc_sample:
                             sample.code = sc_sample.code
                             sample_references.remove(sc_sample)
@@ -1296,7 +1374,13 @@ class ISPyBClient(HardwareObject):
         :rtype: BLSampleWSValue
 
         """
+        return self._cache.read_through(
+            ("bl_sample", bl_sample_id),
+            lambda: self._get_bl_sample(bl_sample_id),
+            bool,
+        )
 
+    def _get_bl_sample(self, bl_sample_id):
         if self._tools_ws:
 
             try:
@@ -1325,7 +1409,6 @@ class ISPyBClient(HardwareObject):
         :rtype: int
         """
         if self._collection:
-
             try:
                 # The old API used date formated strings and the new
                 # one uses DateTime objects.
@@ -1364,6 +1447,11 @@ class ISPyBClient(HardwareObject):
                 logging.getLogger("ispyb_client").exception(str(e))
             except URLError:
                 logging.getLogger("ispyb_client").exception(_CONNECTION_ERROR_MSG)
+            finally:
+                # after the write, values read meanwhile are outdated. The
+                # proposals include their sessions
+                self._cache.invalidate("session")
+                self._cache.invalidate("proposal")
 
             logging.getLogger("ispyb_client").info(
                 "[ISPYB] Session goona be created: session_dict %s" % session_dict
@@ -1536,6 +1624,11 @@ class ISPyBClient(HardwareObject):
         :returns: Dictionary with session data.
         :rtype: dict
         """
+        return self._cache.read_through(
+            ("session", session_id), lambda: self._get_session(session_id), bool
+        )
+
+    def _get_session(self, session_id):
         if self._collection:
             session = {}
             try:
@@ -1842,11 +1935,13 @@ class ISPyBClient(HardwareObject):
         grid_info_id = None
 
         if self._collection:
-            workflow_vo = ISPyBValueFactory().workflow_from_workflow_info(info_dict)
+            workflow_vo = ISPyBValueFactory().workflow_from_workflow_info(
+                info_dict, self._collection
+            )
             workflow_id = self._collection.service.storeOrUpdateWorkflow(workflow_vo)
 
             workflow_mesh_vo = ISPyBValueFactory().workflow_mesh_from_workflow_info(
-                info_dict
+                info_dict, self._collection
             )
             workflow_mesh_vo.workflowId = workflow_id
 
@@ -1854,7 +1949,9 @@ class ISPyBClient(HardwareObject):
                 workflow_mesh_vo
             )
 
-            grid_info_vo = ISPyBValueFactory().grid_info_from_workflow_info(info_dict)
+            grid_info_vo = ISPyBValueFactory().grid_info_from_workflow_info(
+                info_dict, self._collection
+            )
             grid_info_vo.workflowMeshId = workflow_mesh_id
 
             grid_info_id = self._collection.service.storeOrUpdateGridInfo(grid_info_vo)
@@ -2431,19 +2528,16 @@ class ISPyBValueFactory:
 
         return data_collection
 
-    def workflow_from_workflow_info(self, workflow_info_dict):
+    def workflow_from_workflow_info(
+        self, workflow_info_dict, collection_ws_client=None
+    ):
         """
         Ceates workflow3VO from worflow_info_dict.
         :rtype: workflow3VO
         """
-        ws_client = None
-        workflow_vo = None
-
-        try:
-            ws_client = Client(_WS_COLLECTION_URL, cache=None)
-            workflow_vo = ws_client.factory.create("workflow3VO")
-        except Exception:
-            raise
+        if collection_ws_client is None:
+            collection_ws_client = Client(_WS_COLLECTION_URL, cache=None)
+        workflow_vo = collection_ws_client.factory.create("workflow3VO")
 
         try:
             if workflow_info_dict.get("workflow_id"):
@@ -2462,19 +2556,16 @@ class ISPyBValueFactory:
 
         return workflow_vo
 
-    def workflow_mesh_from_workflow_info(self, workflow_info_dict):
+    def workflow_mesh_from_workflow_info(
+        self, workflow_info_dict, collection_ws_client=None
+    ):
         """
         Ceates workflowMesh3VO from worflow_info_dict.
         :rtype: workflowMesh3VO
         """
-        ws_client = None
-        workflow_mesh_vo = None
-
-        try:
-            ws_client = Client(_WS_COLLECTION_URL, cache=None)
-            workflow_mesh_vo = ws_client.factory.create("workflowMeshWS3VO")
-        except Exception:
-            raise
+        if collection_ws_client is None:
+            collection_ws_client = Client(_WS_COLLECTION_URL, cache=None)
+        workflow_mesh_vo = collection_ws_client.factory.create("workflowMeshWS3VO")
 
         try:
             if workflow_info_dict.get("workflow_mesh_id"):
@@ -2496,19 +2587,16 @@ class ISPyBValueFactory:
 
         return workflow_mesh_vo
 
-    def workflow_step_from_workflow_info(self, workflow_info_dict):
+    def workflow_step_from_workflow_info(
+        self, workflow_info_dict, collection_ws_client=None
+    ):
         """
         Ceates workflow3VO from worflow_info_dict.
         :rtype: workflow3VO
         """
-        ws_client = None
-        workflow_vo = None
-
-        try:
-            ws_client = Client(_WS_COLLECTION_URL, cache=None)
-            workflow_step_vo = ws_client.factory.create("workflowStep3VO")
-        except Exception:
-            raise
+        if collection_ws_client is None:
+            collection_ws_client = Client(_WS_COLLECTION_URL, cache=None)
+        workflow_step_vo = collection_ws_client.factory.create("workflowStep3VO")
 
         try:
             workflow_step_vo.workflowId = workflow_info_dict.get("workflow_id")
@@ -2534,19 +2622,16 @@ class ISPyBValueFactory:
 
         return workflow_step_vo
 
-    def grid_info_from_workflow_info(self, workflow_info_dict):
+    def grid_info_from_workflow_info(
+        self, workflow_info_dict, collection_ws_client=None
+    ):
         """
         Ceates grid3VO from worflow_info_dict.
         :rtype: grid3VO
         """
-        ws_client = None
-        grid_info_vo = None
-
-        try:
-            ws_client = Client(_WS_COLLECTION_URL, cache=None)
-            grid_info_vo = ws_client.factory.create("gridInfoWS3VO")
-        except Exception:
-            raise
+        if collection_ws_client is None:
+            collection_ws_client = Client(_WS_COLLECTION_URL, cache=None)
+        grid_info_vo = collection_ws_client.factory.create("gridInfoWS3VO")
 
         try:
             if workflow_info_dict.get("grid_info_id"):
@@ -172,6 +172,16 @@ class MiniDiff(Equipment):
         sample_centring.NUM_CENTRING_ROUNDS = self.get_property(
             "num_centering_rounds", 1
         )
+        loop_detection_roi = self.get_property("loop_detection_roi")
+        if isinstance(loop_detection_roi, str):
+            loop_detection_roi = eval(loop_detection_roi)
+        sample_centring.LOOP_DETECTION_ROI = loop_detection_roi
+        sample_centring.LOOP_DETECTION_BINNING = self.get_property(
+            "loop_detection_binning", 1
+        )
+        sample_centring.OVERLAP_LOOP_DETECTION = self.get_property(
+            "overlap_loop_detection", False
+        )
 
         self.cancel_centring_methods = {}
 
@@ -47,6 +47,8 @@ import math
 import logging
 from datetime import datetime
 
+import numpy as np
+
 from mxcubecore.utils import qt_import
 
 from mxcubecore.model import queue_model_objects
@@ -681,6 +683,26 @@ class GraphicsItemLine(GraphicsItem):
         )
 
 
+def get_heat_map_colors(score):
+    """
+    Returns the heat map colors of scores, from black (0) to yellow (max
+    score) through red, as hue 0 - 60, value 0 - 255. Transparent if no
+    score is positive
+    :param score: np array
+    :return: np array of 32 bit ARGB colors
+    """
+    score = np.asarray(score, dtype=float)
+    max_score = score.max() if score.size else 0
+    if not max_score > 0:
+        return np.zeros(score.shape, dtype=np.uint32)
+    score = np.clip(score / max_score, 0, 1)
+    # With a saturation of 255 and a hue below 60, red is the value and
+    # green the value scaled by hue / 60, that is by the score
+    red = (255 * score).astype(np.uint32)
+    green = (255 * score * score).astype(np.uint32)
+    return np.uint32(0xFF000000) | (red << 16) | (green << 8)
+
+
 class GraphicsItemGrid(GraphicsItem):
 
     TOP_LEFT = 0
@@ -750,6 +772,8 @@ class GraphicsItemGrid(GraphicsItem):
         self.__grid_range_pix = {"fast": 0, "slow": 0}
         self.__reversing_rotation = True
         self.__score = None
+        self.__score_image = None
+        self.__cells = None
         self.__automatic = False
         self.__fill_alpha = 120
         self.__display_overlay = True
@@ -1210,11 +1234,71 @@ class GraphicsItemGrid(GraphicsItem):
 
     def set_score(self, score):
         """
-        Sets score
-        :param score: np two dimensional array
+        Sets score, the heat map is rebuilt at the next paint
+        :param score: np array, score of each image
         :return:
         """
         self.__score = score
+        self.__score_image = None
+
+    def get_cells(self):
+        """
+        Returns col and row of each image. Computed once per grid geometry
+        :return: np array, np array
+        """
+        geometry = (
+            self.__num_cols,
+            self.__num_rows,
+            self.__num_lines,
+            self.__num_images_per_line,
+            self.__first_image_num,
+            self.__reversing_rotation,
+            tuple(self.grid_direction["fast"]),
+            tuple(self.grid_direction["slow"]),
+        )
+        if self.__cells is None or self.__cells[0] != geometry:
+            images_num = self.__num_cols * self.__num_rows
+            cols = np.empty(images_num, dtype=np.intp)
+            rows = np.empty(images_num, dtype=np.intp)
+            for image_index in range(images_num):
+                col, row = self.get_col_row_from_image_serial(
+                    image_index + self.__first_image_num
+                )
+                cols[image_index] = col
+                rows[image_index] = row
+            self.__cells = (geometry, cols, rows)
+            self.__score_image = None
+        return self.__cells[1], self.__cells[2]
+
+    def get_score_image(self):
+        """
+        Returns the score heat map, one pixel per cell. Built from the
+        score when it is set or when the grid geometry changes
+        :return: QImage, None if there is no score
+        """
+        if self.__score is None:
+            return None
+        cols, rows = self.get_cells()
+        if self.__score_image is None:
+            score = np.ravel(self.__score)[: cols.size]
+            cols = cols[: score.size]
+            rows = rows[: score.size]
+            valid = (
+                (cols >= 0)
+                & (cols < self.__num_cols)
+                & (rows >= 0)
+                & (rows < self.__num_rows)
+            )
+            pixels = np.zeros((self.__num_rows, self.__num_cols), dtype=np.uint32)
+            pixels[rows[valid], cols[valid]] = get_heat_map_colors(score)[valid]
+            self.__score_image = qt_import.QImage(
+                pixels.tobytes(),
+                self.__num_cols,
+                self.__num_rows,
+                4 * self.__num_cols,
+                qt_import.QImage.Format_ARGB32,
+            ).copy()
+        return self.__score_image
 
     def get_snapshot(self):
         """
@@ -1289,11 +1373,21 @@ class GraphicsItemGrid(GraphicsItem):
             # In projection mode, just the frame is displayed
             painter.drawPolygon(self.__frame_polygon, qt_import.Qt.OddEvenFill)
         else:
-            # Draws beam shape and displays number of image if
-            # less than 1000 cells and size is greater than 20px
+            # If score exists the heat map is drawn over the grid
+            score_image = None
+            if self.__display_overlay:
+                score_image = self.get_score_image()
+
             if min(self.__spacing_pix) < 20:
                 painter.drawPolygon(self.__frame_polygon, qt_import.Qt.OddEvenFill)
+                self.draw_score_image(painter, score_image)
             else:
+                # Draws beam shape and displays number of image if
+                # cell size is greater than 20px
+                self.draw_score_image(painter, score_image)
+                if score_image is not None or not self.__display_overlay:
+                    painter.setBrush(qt_import.Qt.transparent)
+
                 for image_index in range(self.__num_cols * self.__num_rows):
                     # Estimate area where frame number or score will be displayed
                     (line, image, pos_x, pos_y, col, row) = self.__coordinate_map[
@@ -1305,29 +1399,6 @@ class GraphicsItemGrid(GraphicsItem):
                         self.__spacing_pix[0],
                         self.__spacing_pix[1],
                     )
-
-                    # If score exists overlay color may change
-                    cell_score = None
-                    if self.__display_overlay:
-                        cell_score = 1.0
-                        if self.__score is not None:
-                            cell_score = self.__score[image_index]
-
-                            if self.__score.max() > 0:
-                                cell_score = float(cell_score) / self.__score.max()
-                                brush_color.setHsv(
-                                    0 + 60 * cell_score,
-                                    255,
-                                    255 * cell_score,
-                                    self.__fill_alpha,
-                                )
-                                self.custom_brush.setColor(brush_color)
-                                painter.setBrush(self.custom_brush)
-                            else:
-                                painter.setBrush(qt_import.Qt.transparent)
-                    else:
-                        painter.setBrush(qt_import.Qt.transparent)
-
                     painter.drawText(
                         paint_rect,
                         qt_import.Qt.AlignCenter,
@@ -1375,6 +1446,29 @@ class GraphicsItemGrid(GraphicsItem):
             "%d frames per line" % self.__num_images_per_line,
         )
 
+    def draw_score_image(self, painter, score_image):
+        """
+        Draws the score heat map over the grid frame
+        :param painter: QPainter
+        :param score_image: QImage, nothing is drawn if None
+        :return:
+        """
+        if score_image is None:
+            return
+        top_left = self.__frame_polygon.point(GraphicsItemGrid.TOP_LEFT)
+        painter.save()
+        painter.setOpacity(self.__fill_alpha / 255.0)
+        painter.drawImage(
+            qt_import.QRectF(
+                top_left.x(),
+                top_left.y(),
+                self.__grid_size_pix[0],
+                self.__grid_size_pix[1],
+            ),
+            score_image,
+        )
+        painter.restore()
+
     def move_by_pix(self, move_direction):
         """Moves grid by one pixel"""
         move_delta_x = 0
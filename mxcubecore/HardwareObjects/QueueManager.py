@@ -6,8 +6,15 @@ XML configuration for more details.
 The Queue manager acts as both the controller of execution and as the root/
 container of the queue, note the inheritance from QueueEntryContainer. See the
 documentation for the queue_entry module for more information.
+
+With the sample_prefetch property set, the sample changer picks the next
+sample while the current one is collected. The sample exchange is then a
+chained unload/load. The dead time between the last collection of a sample
+and the first collection of the next one is emitted with the
+sample_exchange_dead_time signal.
 """
 import logging
+import time
 import traceback
 import gevent
 import traceback
@@ -32,8 +39,16 @@ class QueueManager(HardwareObject, QueueEntryContainer):
         self._running = False
         self._disable_collect = False
         self._is_stopped = False
+        self._sample_prefetch = False
+        self._prefetch_task = None
+        self._prefetched_entry = None
+        self._sample_end_time = None
+        # Dead time in s before each sample of the queue run, after the first
+        self.sample_exchange_times = []
 
     def init(self):
+        self._sample_prefetch = self.get_property("sample_prefetch", False)
+
         site_entry_path = self.get_property("site_entry_path")
         if site_entry_path:
             queue_entry.import_queue_entries(site_entry_path.split(","))
@@ -44,6 +59,7 @@ class QueueManager(HardwareObject, QueueEntryContainer):
         d = dict(self.__dict__)
         d["_root_task"] = None
         d["_paused_event"] = None
+        d["_prefetch_task"] = None
         return d
 
     def __setstate__(self, d):
@@ -93,6 +109,8 @@ class QueueManager(HardwareObject, QueueEntryContainer):
 
             if not entry:
                 self._current_queue_entries = []
+                self._sample_end_time = None
+                self.sample_exchange_times = []
                 self._set_in_queue_flag()
                 self._root_task = gevent.spawn(self.__execute_task)
             else:
@@ -178,6 +196,7 @@ class QueueManager(HardwareObject, QueueEntryContainer):
 
                     raise ex
         finally:
+            self._end_sample_prefetch()
             self._running = False
             self.emit("queue_execution_finished", (None,))
 
@@ -185,6 +204,7 @@ class QueueManager(HardwareObject, QueueEntryContainer):
         if not entry.is_enabled() or self._is_stopped:
             return
 
+        is_sample = isinstance(entry, base_queue_entry.SampleQueueEntry)
         status = "Successful"
         self.emit("queue_entry_execute_started", (entry,))
         self.set_current_entry(entry)
@@ -203,11 +223,19 @@ class QueueManager(HardwareObject, QueueEntryContainer):
             # Procedure to be done before main implementation
             # of task.
             entry.status = QUEUE_ENTRY_STATUS.RUNNING
+            if is_sample:
+                self._wait_sample_prefetch()
+                if entry is self._prefetched_entry:
+                    self._prefetched_entry = None
             entry.pre_execute()
             entry.execute()
+            if is_sample:
+                self._sample_mounted(entry)
 
             for child in entry._queue_entry_list:
                 self.__execute_entry(child)
+            if is_sample:
+                self._sample_end_time = time.perf_counter()
             # This part should not be here
             # But somehow exception from collect_failed is not catched here
             if entry.is_failed():
@@ -282,6 +310,9 @@ class QueueManager(HardwareObject, QueueEntryContainer):
         if self._root_task:
             self._root_task.kill(block=False)
 
+        if self._prefetch_task:
+            self._prefetch_task.kill(block=False)
+
         self._queue_end()
 
     def _queue_end(self):
@@ -292,6 +323,107 @@ class QueueManager(HardwareObject, QueueEntryContainer):
         self.emit("statusMessage", ("status", "", "Queue stopped"))
         self.emit("queue_stopped", (None,))
 
+    def set_sample_prefetch(self, state):
+        """
+        Enables the pick of the next sample while the current sample
+        is collected.
+
+        :param state: Enabled if True, disabled if False
+        :type state: bool
+
+        :returns: None
+        :rtype: NoneType
+        """
+        self._sample_prefetch = state
+
+    def is_sample_prefetch_enabled(self):
+        """
+        :returns: True if the next sample is picked while the current
+                  sample is collected
+        :rtype: bool
+        """
+        return self._sample_prefetch
+
+    def is_sample_prefetch_allowed(self, entry):
+        """
+        Safety hook checked before picking the sample of <entry> while
+        the current sample is collected, to extend with site specific
+        conditions.
+
+        :param entry: The sample entry to pick
+        :type entry: SampleQueueEntry
+
+        :returns: True if the sample can be picked
+        :rtype: bool
+        """
+        return entry.is_enabled() and not (self._is_stopped or self.is_paused())
+
+    def get_next_sample_entry(self, entry):
+        """
+        :param entry: The sample entry being executed
+        :type entry: SampleQueueEntry
+
+        :returns: The next enabled sample entry of the queue or None
+        :rtype: SampleQueueEntry
+        """
+        entries = self._iter_entries(self)
+        for next_entry in entries:
+            if next_entry is entry:
+                break
+
+        for next_entry in entries:
+            if (
+                isinstance(next_entry, base_queue_entry.SampleQueueEntry)
+                and next_entry.is_enabled()
+            ):
+                return next_entry
+
+    def _iter_entries(self, container):
+        for child_entry in container._queue_entry_list:
+            yield child_entry
+            yield from self._iter_entries(child_entry)
+
+    def _sample_mounted(self, entry):
+        if self._sample_end_time is not None:
+            dead_time = time.perf_counter() - self._sample_end_time
+            self._sample_end_time = None
+            self.sample_exchange_times.append(dead_time)
+            logging.getLogger("queue_exec").info(
+                "Sample exchange dead time: %.1f s" % dead_time
+            )
+            self.emit("sample_exchange_dead_time", (entry, dead_time))
+
+        # Only the execution of the whole queue goes on with the next sample
+        if not self._sample_prefetch or gevent.getcurrent() is not self._root_task:
+            return
+
+        next_entry = self.get_next_sample_entry(entry)
+        if next_entry is not None and self.is_sample_prefetch_allowed(next_entry):
+            self._prefetch_task = gevent.spawn(self._prefetch_sample, next_entry)
+
+    def _prefetch_sample(self, entry):
+        try:
+            if entry.prefetch():
+                self._prefetched_entry = entry
+        except Exception as ex:
+            logging.getLogger("queue_exec").warning(
+                "Could not prefetch sample %s: %s" % (entry, ex)
+            )
+
+    def _wait_sample_prefetch(self):
+        if self._prefetch_task is not None:
+            self._prefetch_task.join()
+            self._prefetch_task = None
+
+    def _end_sample_prefetch(self):
+        self._wait_sample_prefetch()
+        if self._prefetched_entry is not None:
+            logging.getLogger("user_level_log").warning(
+                "Sample %s was picked but not loaded, please check the sample changer"
+                % str(self._prefetched_entry.get_data_model().location)
+            )
+            self._prefetched_entry = None
+
     def set_pause(self, state):
         """
         Sets the queue in paused state <state>. Emits the signal queue_paused
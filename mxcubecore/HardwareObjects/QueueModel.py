@@ -111,6 +111,7 @@ class QueueModel(HardwareObject):
         :returns: None
         :rtype: NoneType
         """
+        # The node index belongs to the root node, and is cleared with it
         self._models[name] = queue_model_objects.RootNode()
 
         if not name:
@@ -145,6 +146,33 @@ class QueueModel(HardwareObject):
             self.emit("child_added", (parent_node, child_node))
             self._re_emit(child_node)
 
+    def _index_nodes(self, node):
+        """
+        Adds <node> and its descendants to the node index of the selected
+        model. Nodes already indexed under the same id are kept, as when
+        searching the tree in depth first order.
+        """
+        index = self._selected_model._node_index
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            if node._node_id is not None:
+                index.setdefault(node._node_id, node)
+            nodes.extend(node._children)
+
+    def _unindex_nodes(self, node):
+        """
+        Removes <node> and its descendants from the node index of the
+        selected model.
+        """
+        index = self._selected_model._node_index
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            if index.get(node._node_id) is node:
+                del index[node._node_id]
+            nodes.extend(node._children)
+
     def add_child(self, parent, child):
         """
         Adds the child node <child>. Raises the exception TypeError
@@ -161,9 +189,11 @@ class QueueModel(HardwareObject):
         if True:
             # if isinstance(child, queue_model_objects.TaskNode):
             self._selected_model._total_node_count += 1
+            self._unindex_nodes(child)
             child._parent = parent
             child._node_id = self._selected_model._total_node_count
             parent._children.append(child)
+            self._index_nodes(child)
             child._set_name(child._name)
             self.emit("child_added", (parent, child))
         else:
@@ -200,7 +230,15 @@ class QueueModel(HardwareObject):
         :rtype: TaskNode
         """
         if parent is None:
-            parent = self._selected_model
+            node = self._selected_model._node_index.get(_id)
+
+            # The node must still be part of the selected model
+            root = node
+            while root is not None and root._parent is not None:
+                root = root._parent
+            if root is self._selected_model:
+                return node
+            return None
 
         for node in parent._children:
             if node._node_id == _id:
@@ -223,6 +261,7 @@ class QueueModel(HardwareObject):
         """
         if child in parent._children:
             parent._children.remove(child)
+            self._unindex_nodes(child)
             self.emit("child_removed", (parent, child))
 
     def _detach_child(self, parent, child):
@@ -235,7 +274,7 @@ class QueueModel(HardwareObject):
         :returns: None
         :rtype: None
         """
-        child = parent._children.pop(child)
+        parent._children.remove(child)
         return child
 
     def set_parent(self, parent, child):
@@ -249,10 +288,9 @@ class QueueModel(HardwareObject):
         :type child: TaskNode Object
         """
         if child._parent:
-            self._detach_child(parent, child)
-            child.set_parent(parent)
-        else:
-            child._parent = parent
+            self._detach_child(child._parent, child)
+        child._parent = parent
+        self._index_nodes(child)
 
     def view_created(self, view_item, task_model):
         """
@@ -21,8 +21,11 @@ __copyright__ = """2019 by the MXCuBE collaboration """
 __license__ = "LGPLv3+"
 
 import copy
+import logging
 from functools import reduce
 
+import gevent
+
 from mxcubecore.model import queue_model_objects
 
 from mxcubecore.HardwareObjects.abstract.AbstractSampleView import (
@@ -36,6 +39,8 @@ class SampleView(AbstractSampleView):
     def __init__(self, name):
         AbstractSampleView.__init__(self, name)
         self._shapes = {}
+        self._shape_update_task = None
+        self.shape_update_interval = 0.04
 
     def init(self):
         super(SampleView, self).init()
@@ -44,16 +49,57 @@ class SampleView(AbstractSampleView):
         self._last_oav_image = None
 
         self.hide_grid_threshold = self.get_property("hide_grid_threshold", 5)
+        # Minimum time between two updates of the shape positions, in s
+        self.shape_update_interval = self.get_property(
+            "shape_update_interval", self.shape_update_interval
+        )
         for motor_name, motor_ho in HWR.beamline.diffractometer.get_motors().items():
             if motor_ho:
                 motor_ho.connect("stateChanged", self._update_shape_positions)
 
     def _update_shape_positions(self, *args, **kwargs):
-        shapes_updated = False
+        # Bursts of motor events result in one update per interval
+        if self._shape_update_task is None or self._shape_update_task.ready():
+            self._shape_update_task = gevent.spawn_later(
+                self.shape_update_interval, self._do_update_shape_positions
+            )
+
+    def _do_update_shape_positions(self):
+        try:
+            self.update_shape_positions()
+        except Exception:
+            logging.getLogger("HWR").exception("Could not update shape positions")
+
+    def update_shape_positions(self):
+        """
+        Updates the screen coordinates of all the shapes, projecting their
+        centred positions at once.
+        """
+        diffractometer = HWR.beamline.diffractometer
+        shapes = list(self.get_shapes())
+
+        if any(isinstance(shape, Grid) for shape in shapes):
+            phi_pos = diffractometer.omega.get_value() % 360
+            shapes = [
+                shape
+                for shape in shapes
+                if not isinstance(shape, Grid) or shape.update_state(phi_pos)
+            ]
+
+        cpos_list = [cp.as_dict() for shape in shapes for cp in shape.cp_list]
+        if hasattr(diffractometer, "motor_positions_to_screen_batch"):
+            spos_list = diffractometer.motor_positions_to_screen_batch(cpos_list)
+        else:
+            # Diffractometers not derived from GenericDiffractometer
+            spos_list = [
+                diffractometer.motor_positions_to_screen(cpos) for cpos in cpos_list
+            ]
 
-        for shape in self.get_shapes():
-            previous_screen_coord = shape.screen_coord
-            shape.update_position(HWR.beamline.diffractometer.motor_positions_to_screen)
+        index = 0
+        for shape in shapes:
+            count = len(shape.cp_list)
+            shape.set_screen_positions(spos_list[index : index + count])
+            index += count
 
         self.emit("shapesChanged")
 
@@ -406,7 +452,12 @@ class Shape(object):
         return self.selected
 
     def update_position(self, transform):
-        spos_list = [transform(cp.as_dict()) for cp in self.cp_list]
+        self.set_screen_positions([transform(cp.as_dict()) for cp in self.cp_list])
+
+    def set_screen_positions(self, spos_list):
+        """
+        Sets the screen coordinates from the (x, y) of each centred position
+        """
         spos_list = tuple([pos for l in spos_list for pos in l])
         self.screen_coord = spos_list
 
@@ -535,13 +586,25 @@ class Grid(Shape):
 
     def update_position(self, transform):
         phi_pos = HWR.beamline.diffractometer.omega.get_value() % 360
+
+        if self.update_state(phi_pos):
+            super(Grid, self).update_position(transform)
+
+    def update_state(self, phi_pos):
+        """
+        Hides the grid when phi is too far from its centred position
+
+        Returns:
+            (bool) True if the grid is visible
+        """
         _d = abs((self.get_centred_position().phi % 360) - phi_pos)
 
         if min(_d, 360 - _d) > self.shapes_hw_object.hide_grid_threshold:
             self.state = "HIDDEN"
-        else:
-            super(Grid, self).update_position(transform)
-            self.state = "SAVED"
+            return False
+
+        self.state = "SAVED"
+        return True
 
     def get_centred_position(self):
         return self.cp_list[0]
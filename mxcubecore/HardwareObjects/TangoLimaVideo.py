@@ -11,44 +11,40 @@ Example configuration:
 </device>
 
 If video mode is not specified, BAYER_RG16 is used by default.
+
+The images are decoded to RGB24 (Y8, Y16, RGB24, RGB32, BGR24, BGR32 and
+Bayer RG/BG 8 and 16 bit modes), unless the video mode is NO_CONVERSION.
+Optional properties of the decoding:
+  <scale>0.5</scale>
+  <rotation>90</rotation> (counterclockwise, multiple of 90 degrees)
+  <mirror>(False, False)</mirror> (horizontal, vertical)
+  <bit_depth>12</bit_depth> (significant bits of the 16 bit modes)
+  <endian>little</endian> (of the image header, big by default)
 """
 import logging
 import time
-import struct
-import numpy
 import gevent
 import PyTango
 from PIL import Image
-import io
 import gipc
 
 from PyTango.gevent import DeviceProxy
 
 from mxcubecore import BaseHardwareObjects
+from mxcubecore.utils.lima_video import LimaVideoDecoder
 
 
-def poll_image(lima_tango_device, video_mode, FORMATS):
+def poll_image(lima_tango_device, video_mode, decoder):
     img_data = lima_tango_device.video_last_image
 
-    hfmt = ">IHHqiiHHHH"
-    hsize = struct.calcsize(hfmt)
-    _, _, img_mode, frame_number, width, height, _, _, _, _ = struct.unpack(
-        hfmt, img_data[1][:hsize]
-    )
-
-    raw_data = img_data[1][hsize:]
-    _from, _to = FORMATS.get(video_mode, (None, None))
-
-    if _from and _to:
-        img = Image.frombuffer(_from, (height, width), raw_data, "raw", _from, 0, 1)
-
-        img_bytes = io.BytesIO()
-        img.save(img_bytes, format=_to)
-        img = img.tobytes()
-    else:
-        img = raw_data
+    if video_mode == "NO_CONVERSION":
+        header = decoder.decode_header(img_data[1])
+        return img_data[1][header.header_size :], header.width, header.height
 
-    return img, width, height
+    # Decoded in numpy, without intermediate image
+    rgb_image, _ = decoder.decode(img_data[1])
+    height, width = rgb_image.shape[:2]
+    return rgb_image.tobytes(), width, height
 
 
 class TangoLimaVideo(BaseHardwareObjects.Device):
@@ -61,22 +57,25 @@ class TangoLimaVideo(BaseHardwareObjects.Device):
         self.__polling = None
         self._video_mode = None
         self._last_image = (0, 0, 0)
-
-        # Dictionary containing conversion information for a given
-        # video_mode. The camera video mode is the key and the first
-        # index of the tuple contains the corresponding PIL mapping
-        # and the second the desried output format. The image is
-        # passed on as it is of the video mode is not in the dictionary
-        self._FORMATS = {
-            "RGB8": ("L", "BMP"),
-            "RGB24": ("RGB", "BMP"),
-            "RGB32": ("RGBA", "BMP"),
-            "NO_CONVERSION": (None, None),
-        }
+        self._decoder = LimaVideoDecoder()
 
     def init(self):
         self.device = None
 
+        try:
+            mirror = eval(self.get_property("mirror"))
+        except TypeError:
+            mirror = (False, False)
+
+        endian = self.get_property("endian", "big")
+        self._decoder = LimaVideoDecoder(
+            scale=float(self.get_property("scale", 1.0)),
+            rotation=int(self.get_property("rotation", 0)),
+            mirror=mirror,
+            bit_depth=int(self.get_property("bit_depth", 12)),
+            endian="<" if endian.lower() in ("small", "little") else ">",
+        )
+
         try:
             self._video_mode = self.get_property("video_mode", "RGB24")
             self.device = DeviceProxy(self.tangoname)
@@ -117,7 +116,7 @@ class TangoLimaVideo(BaseHardwareObjects.Device):
 
         while True:
             data, width, height = poll_image(
-                lima_tango_device, self.video_mode, self._FORMATS
+                lima_tango_device, self.video_mode, self._decoder
             )
 
             self._last_image = data, width, height
@@ -132,13 +131,17 @@ class TangoLimaVideo(BaseHardwareObjects.Device):
                 )
 
     def get_width(self):
-        return self.device.image_width
+        return self._decoder.get_output_size(
+            self.device.image_width, self.device.image_height
+        )[0]
 
     def get_height(self):
-        return self.device.image_height
+        return self._decoder.get_output_size(
+            self.device.image_width, self.device.image_height
+        )[1]
 
     def take_snapshot(self, path=None, bw=False):
-        data, width, height = poll_image(self.device, self.video_mode, self._FORMATS)
+        data, width, height = poll_image(self.device, self.video_mode, self._decoder)
 
         img = Image.frombytes("RGB", (width, height), data)
 
@@ -63,12 +63,12 @@ Example Hardware Object XML file :
 </device>
 """
 from __future__ import print_function
-import struct
 import numpy as np
 
 import PyTango
 
 from mxcubecore.HardwareObjects.abstract.AbstractVideoDevice import AbstractVideoDevice
+from mxcubecore.utils.lima_video import LimaVideoDecoder
 
 
 class TangoLimaVideoDevice(AbstractVideoDevice):
@@ -92,11 +92,9 @@ class TangoLimaVideoDevice(AbstractVideoDevice):
         endian = self.get_property("endian")
 
         if endian in ["small", "Small", "Little", "little"]:
-            self.header_fmt = "<IHHqiiHHHH"
+            self.lima_decoder = LimaVideoDecoder(endian="<")
         else:
-            self.header_fmt = ">IHHqiiHHHH"
-
-        self.header_size = struct.calcsize(self.header_fmt)
+            self.lima_decoder = LimaVideoDecoder(endian=">")
 
         self.device = PyTango.DeviceProxy(tangoname)
         self.device.ping()
@@ -132,12 +130,12 @@ class TangoLimaVideoDevice(AbstractVideoDevice):
         img_data = self.device.video_last_image
 
         if img_data[0] == "VIDEO_IMAGE":
-            raw_fmt = img_data[1][: self.header_size]
-            raw_buffer = np.fromstring(img_data[1][self.header_size :], np.uint16)
-            _, ver, img_mode, frame_number, width, height, _, _, _, _ = struct.unpack(
-                self.header_fmt, img_data[1][: self.header_size]
+            header = self.lima_decoder.decode_header(img_data[1])
+            # Mapped without copy
+            raw_buffer = np.frombuffer(
+                img_data[1], np.uint16, offset=header.header_size
             )
-            return raw_buffer, width, height
+            return raw_buffer, header.width, header.height
         else:
             return None, 0, 0
 
@@ -25,7 +25,7 @@ import gevent
 from mxcubecore.HardwareObjects.TangoLimaVideo import TangoLimaVideo, poll_image
 
 
-def _poll_image(sleep_time, video_device, device_uri, video_mode, formats):
+def _poll_image(sleep_time, video_device, device_uri, video_mode, decoder):
     from PyTango import DeviceProxy
 
     connected = False
@@ -47,7 +47,7 @@ def _poll_image(sleep_time, video_device, device_uri, video_mode, formats):
 
     while True:
         try:
-            data = poll_image(lima_tango_device, video_mode, formats)[0]
+            data = poll_image(lima_tango_device, video_mode, decoder)[0]
             video_device.write(data)
         except Exception as ex:
             print(ex)
@@ -133,7 +133,7 @@ class TangoLimaVideoLoopback(TangoLimaVideo):
                     self.video_device,
                     self.get_property("tangoname"),
                     self.video_mode,
-                    self._FORMATS,
+                    self._decoder,
                 ),
             )
         else:
@@ -143,7 +143,7 @@ class TangoLimaVideoLoopback(TangoLimaVideo):
                 self.video_device,
                 self.get_property("tangoname"),
                 self.video_mode,
-                self._FORMATS,
+                self._decoder,
             )
 
     def _open_video_device(self, path="/dev/video0"):
@@ -35,6 +35,7 @@ import gevent.event
 from mxcubecore.TaskUtils import task
 from mxcubecore.BaseHardwareObjects import HardwareObject
 from mxcubecore import HardwareRepository as HWR
+from mxcubecore.utils.step_executor import StepExecutor
 
 
 __credits__ = ["MXCuBE collaboration"]
@@ -84,6 +85,8 @@ class AbstractCollect(HardwareObject, object):
         self.run_offline_processing = None
         self.run_online_processing = None
         self.ready_event = None
+        # Duration of the preparation steps of the current collection
+        self.prepare_steps = None
 
     def init(self):
         self.ready_event = gevent.event.Event()
@@ -154,14 +157,16 @@ class AbstractCollect(HardwareObject, object):
         )
         self.emit("progressInit", ("Collection", 100, False))
         self.collection_id = None
+        self.prepare_steps = StepExecutor()
 
         try:
             # ----------------------------------------------------------------
             # Prepare data collection
 
-            self.open_detector_cover()
-            self.open_safety_shutter()
-            self.open_fast_shutter()
+            self.prepare_steps.add("open_detector_cover", self.open_detector_cover)
+            self.prepare_steps.add("open_safety_shutter", self.open_safety_shutter)
+            self.prepare_steps.add("open_fast_shutter", self.open_fast_shutter)
+            self.prepare_steps.run()
 
             # ----------------------------------------------------------------
             # Store information in LIMS
@@ -176,18 +181,21 @@ class AbstractCollect(HardwareObject, object):
             )
 
             log.info("Collection: Storing data collection in LIMS")
-            self.store_data_collection_in_lims()
+            with self.prepare_steps.timed("store_data_collection_in_lims"):
+                self.store_data_collection_in_lims()
 
             log.info(
                 "Collection: Creating directories for raw images and processing files"
             )
-            self.create_file_directories()
+            with self.prepare_steps.timed("create_file_directories"):
+                self.create_file_directories()
 
             log.info("Collection: Getting sample info from parameters")
             self.get_sample_info()
 
             log.info("Collection: Storing sample info in LIMS")
-            self.store_sample_info_in_lims()
+            with self.prepare_steps.timed("store_sample_info_in_lims"):
+                self.store_sample_info_in_lims()
 
             if all(
                 item is None for item in self.current_dc_parameters["motors"].values()
@@ -206,46 +214,77 @@ class AbstractCollect(HardwareObject, object):
             # Move to the centered position and take crystal snapshots
 
             log.info("Collection: Moving to centred position")
-            self.move_to_centered_position()
-            self.take_crystal_snapshots()
-            self.move_to_centered_position()
+            with self.prepare_steps.timed("move_to_centered_position"):
+                self.move_to_centered_position()
+            with self.prepare_steps.timed("take_crystal_snapshots"):
+                self.take_crystal_snapshots()
+                self.move_to_centered_position()
 
             # ----------------------------------------------------------------
-            # Set data collection parameters
+            # Set data collection parameters, concurrently except the
+            # resolution that depends on the energy
 
             if "transmission" in self.current_dc_parameters:
                 log.info(
                     "Collection: Setting transmission to %.2f",
                     self.current_dc_parameters["transmission"],
                 )
-                self.set_transmission(self.current_dc_parameters["transmission"])
+                self.prepare_steps.add(
+                    "transmission",
+                    self.set_transmission,
+                    self.current_dc_parameters["transmission"],
+                )
 
             if "wavelength" in self.current_dc_parameters:
                 log.info(
                     "Collection: Setting wavelength to %.4f",
                     self.current_dc_parameters["wavelength"],
                 )
-                self.set_wavelength(self.current_dc_parameters["wavelength"])
+                self.prepare_steps.add(
+                    "energy",
+                    self.set_wavelength,
+                    self.current_dc_parameters["wavelength"],
+                )
 
             elif "energy" in self.current_dc_parameters:
                 log.info(
                     "Collection: Setting energy to %.4f",
                     self.current_dc_parameters["energy"],
                 )
-                self.set_energy(self.current_dc_parameters["energy"])
+                self.prepare_steps.add(
+                    "energy", self.set_energy, self.current_dc_parameters["energy"]
+                )
 
             dd = self.current_dc_parameters.get("resolution")
             if dd and dd.get("upper"):
                 resolution = dd["upper"]
                 log.info("Collection: Setting resolution to %.3f", resolution)
-                self.set_resolution(resolution)
+                self.prepare_steps.add(
+                    "resolution",
+                    self.set_resolution,
+                    resolution,
+                    depends_on=("energy",),
+                )
 
             elif "detector_distance" in self.current_dc_parameters:
                 log.info(
                     "Collection: Moving detector to %.2f",
                     self.current_dc_parameters["detector_distance"],
                 )
-                self.move_detector(self.current_dc_parameters["detector_distance"])
+                self.prepare_steps.add(
+                    "detector_distance",
+                    self.move_detector,
+                    self.current_dc_parameters["detector_distance"],
+                )
+            self.prepare_steps.run()
+
+            logging.getLogger("HWR").info(
+                "Collection: Preparation times (s): %s",
+                ", ".join(
+                    "%s %.2f" % item for item in self.prepare_steps.times.items()
+                ),
+            )
+            self.emit("collectPrepareTimes", (dict(self.prepare_steps.times),))
 
             # ----------------------------------------------------------------
             # Site specific implementation of a data collection
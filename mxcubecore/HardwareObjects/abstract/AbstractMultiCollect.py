@@ -11,6 +11,7 @@ import autoprocessing
 import gevent
 import socket
 from mxcubecore.TaskUtils import task, cleanup, error_cleanup
+from mxcubecore.utils.lims_writer import LimsWriter
 
 from mxcubecore import HardwareRepository as HWR
 
@@ -76,6 +77,10 @@ class AbstractMultiCollect(object):
         self.run_autoprocessing = None
         # wait for the 1st image from detector for 30 seconds by default
         self.first_image_timeout = 30
+        # images are stored in LIMS in the background, and the end of the
+        # data collection waits for them for 30 seconds by default
+        self.lims_writer = LimsWriter(self._store_lims_images)
+        self.lims_flush_timeout = 30
 
         self.mesh = None
         self.mesh_num_lines = None
@@ -83,6 +88,20 @@ class AbstractMultiCollect(object):
         self.mesh_range = None
         self.mesh_center = None
 
+    def _store_lims_images(self, lims_images):
+        """Store images in LIMS, called by the LIMS writer
+
+        Args:
+            lims_images (list): Image parameters, each one is removed from
+                the list once stored
+        """
+        if hasattr(HWR.beamline.lims, "store_images"):
+            HWR.beamline.lims.store_images(lims_images)
+        else:
+            while lims_images:
+                HWR.beamline.lims.store_image(lims_images[0])
+                del lims_images[0]
+
     def setControlObjects(self, **control_objects):
         self.bl_control = BeamlineControl(**control_objects)
 
@@ -991,12 +1010,7 @@ class AbstractMultiCollect(object):
                                         "jpegThumbnailFileFullPath"
                                     ] = jpeg_thumbnail_full_path
 
-                                try:
-                                    HWR.beamline.lims.store_image(lims_image)
-                                except Exception:
-                                    logging.getLogger("HWR").exception(
-                                        "Could not store store image in LIMS"
-                                    )
+                                self.lims_writer.put(lims_image)
 
                                 self.generate_image_jpeg(
                                     str(file_path),
@@ -1073,6 +1087,12 @@ class AbstractMultiCollect(object):
             # the last frame is counted
             self.diffractometer().wait_ready(1000)
 
+        if not self.lims_writer.flush(self.lims_flush_timeout):
+            logging.getLogger("HWR").warning(
+                "Images still being stored in LIMS: %s",
+                self.lims_writer.get_statistics(),
+            )
+
         # data collection done
         self.data_collection_end_hook(data_collect_parameters)
 
@@ -77,6 +77,7 @@ class AbstractOnlineProcessing(HardwareObject):
         self.kill_command = None
         self.data_collection = None
         self.grid = None
+        self.grid_lookup = None
         self.params_dict = None
         self.result_types = None
         self.results_raw = None
@@ -111,6 +112,7 @@ class AbstractOnlineProcessing(HardwareObject):
         acquisition = self.data_collection.acquisitions[0]
         acq_params = acquisition.acquisition_parameters
         self.grid = self.data_collection.grid
+        self.grid_lookup = None
 
         grid_params = None
         if self.grid:
@@ -473,15 +475,23 @@ class AbstractOnlineProcessing(HardwareObject):
             else:
                 self.workflow_info = None
 
-            HWR.beamline.collect.update_lims_with_workflow(
-                workflow_id, self.params_dict["snapshot_path"]
-            )
-
-            HWR.beamline.lims.store_workflow_step(self.params_dict)
+            # Independent LIMS calls, made concurrently
+            lims_calls = [
+                gevent.spawn(
+                    HWR.beamline.collect.update_lims_with_workflow,
+                    workflow_id,
+                    self.params_dict["snapshot_path"],
+                ),
+                gevent.spawn(HWR.beamline.lims.store_workflow_step, self.params_dict),
+            ]
             if len(best_positions) > 0:
-                HWR.beamline.collect._store_image_in_lims_by_frame_num(
-                    best_positions[0]["index"]
+                lims_calls.append(
+                    gevent.spawn(
+                        HWR.beamline.collect._store_image_in_lims_by_frame_num,
+                        best_positions[0]["index"],
+                    )
                 )
+            gevent.joinall(lims_calls, raise_error=True)
             log.info("Online processing: Results saved in ISPyB")
 
         HWR.beamline.lims.set_image_quality_indicators_plot(
@@ -719,29 +729,54 @@ class AbstractOnlineProcessing(HardwareObject):
             )
         # ---------------------------------------------------------------------
 
+    def get_grid_lookup(self):
+        """Returns the grid col and row of each image. Computed once per
+        grid, as get_col_row_from_image_serial is slow when called for
+        each image at each results update.
+
+        :returns: cols and rows, indexed by image index
+        :rtype: tuple of two numpy arrays
+        """
+        images_num = self.params_dict["images_num"]
+        first_image_num = self.params_dict["first_image_num"]
+        key = (id(self.grid), first_image_num, images_num)
+        if self.grid_lookup is None or self.grid_lookup[0] != key:
+            cols = np.empty(images_num, dtype=np.intp)
+            rows = np.empty(images_num, dtype=np.intp)
+            for index in range(images_num):
+                cols[index], rows[index] = self.grid.get_col_row_from_image_serial(
+                    index + first_image_num
+                )
+            self.grid_lookup = (key, cols, rows)
+        return self.grid_lookup[1], self.grid_lookup[2]
+
     def align_processing_results(self, start_index, end_index):
         """Realigns all results. Each results (one dimensional numpy array)
         is converted to 2d numpy array according to diffractometer geometry.
         Function also extracts 10 (if they exist) best positions
         """
         # Each result array is realigned
+        if self.grid:
+            cols, rows = self.get_grid_lookup()
+            indexes = np.arange(start_index, end_index + 1)
+            cols = cols[indexes]
+            rows = rows[indexes]
+            # Cells out of the result arrays, by array shape
+            valid_cells = {}
 
         for score_key in self.results_raw:
             if (
                 self.grid
                 and self.results_raw[score_key].size == self.params_dict["images_num"]
             ):
-                for cell_index in range(start_index, end_index + 1):
-                    col, row = self.grid.get_col_row_from_image_serial(
-                        cell_index + self.params_dict["first_image_num"]
-                    )
-                    if (
-                        col < self.results_aligned[score_key].shape[0]
-                        and row < self.results_aligned[score_key].shape[1]
-                    ):
-                        self.results_aligned[score_key][col][row] = self.results_raw[
-                            score_key
-                        ][cell_index]
+                shape = self.results_aligned[score_key].shape
+                if shape not in valid_cells:
+                    valid = (cols < shape[0]) & (rows < shape[1])
+                    valid_cells[shape] = (indexes[valid], cols[valid], rows[valid])
+                valid_indexes, valid_cols, valid_rows = valid_cells[shape]
+                self.results_aligned[score_key][
+                    valid_cols, valid_rows
+                ] = self.results_raw[score_key][valid_indexes]
             else:
                 self.results_aligned[score_key] = self.results_raw[score_key]
                 if self.interpolate_results:
@@ -782,52 +817,65 @@ class AbstractOnlineProcessing(HardwareObject):
                 self.results_aligned["center_mass"] = centred_positions[0]
 
         # Best positions are extracted
+        self.results_aligned["best_positions"] = self.get_best_positions()
+
+    def get_best_positions(self, number=10):
+        """Returns the positions with the best (positive) scores
+
+        :param number: maximum number of positions
+        :type number: int
+        :returns: positions, best first
+        :rtype: list of dict
+        """
         best_positions_list = []
 
-        index_arr = (-self.results_raw["score"]).argsort()[:10]
-        if len(index_arr) > 0:
-            for index in index_arr:
-                if self.results_raw["score"][index] > 0:
-                    best_position = {}
-                    best_position["index"] = index
-                    best_position["index_serial"] = (
-                        self.params_dict["first_image_num"] + index
-                    )
-                    best_position["score"] = self.results_raw["score"][index]
-                    best_position["spots_num"] = self.results_raw["spots_num"][index]
-                    best_position["spots_resolution"] = self.results_raw[
-                        "spots_resolution"
-                    ][index]
-                    best_position["filename"] = os.path.basename(
-                        self.params_dict["template"]
-                        % (
-                            self.params_dict["run_number"],
-                            self.params_dict["first_image_num"] + index,
-                        )
-                    )
+        scores = self.results_raw["score"]
+        if scores.size > number:
+            # Only the best scores are sorted
+            index_arr = np.argpartition(-scores, number - 1)[:number]
+            index_arr = index_arr[np.argsort(-scores[index_arr], kind="stable")]
+        else:
+            index_arr = np.argsort(-scores, kind="stable")
+        index_arr = index_arr[scores[index_arr] > 0]
+        if self.grid and len(index_arr) > 0:
+            cols, rows = self.get_grid_lookup()
+
+        for index in index_arr:
+            best_position = {}
+            best_position["index"] = index
+            best_position["index_serial"] = self.params_dict["first_image_num"] + index
+            best_position["score"] = scores[index]
+            best_position["spots_num"] = self.results_raw["spots_num"][index]
+            best_position["spots_resolution"] = self.results_raw["spots_resolution"][
+                index
+            ]
+            best_position["filename"] = os.path.basename(
+                self.params_dict["template"]
+                % (
+                    self.params_dict["run_number"],
+                    self.params_dict["first_image_num"] + index,
+                )
+            )
 
-                    cpos = None
-                    if self.grid:
-                        col, row = self.grid.get_col_row_from_image_serial(
-                            index + self.params_dict["first_image_num"]
-                        )
-                        col += 0.5
-                        row = self.params_dict["steps_y"] - row - 0.5
-                        cpos = self.grid.get_motor_pos_from_col_row(col, row)
-                    else:
-                        col = index
-                        row = 0
-                        cpos = None
-                        # TODO make this nicer
-                        # num_images = self.data_collection.acquisitions[0].acquisition_parameters.num_images - 1
-                        # (point_one, point_two) = self.data_collection.get_centred_positions()
-                        # cpos = HWR.beamline.diffractometer.get_point_from_line(point_one, point_two, index, num_images)
-                    best_position["col"] = col
-                    best_position["row"] = row
-                    best_position["cpos"] = cpos
-                    best_positions_list.append(best_position)
-
-        self.results_aligned["best_positions"] = best_positions_list
+            cpos = None
+            if self.grid:
+                col = int(cols[index]) + 0.5
+                row = self.params_dict["steps_y"] - int(rows[index]) - 0.5
+                cpos = self.grid.get_motor_pos_from_col_row(col, row)
+            else:
+                col = index
+                row = 0
+                cpos = None
+                # TODO make this nicer
+                # num_images = self.data_collection.acquisitions[0].acquisition_parameters.num_images - 1
+                # (point_one, point_two) = self.data_collection.get_centred_positions()
+                # cpos = HWR.beamline.diffractometer.get_point_from_line(point_one, point_two, index, num_images)
+            best_position["col"] = col
+            best_position["row"] = row
+            best_position["cpos"] = cpos
+            best_positions_list.append(best_position)
+
+        return best_positions_list
 
     def extract_sweeps(self):
         """Extracts sweeps from processing results"""
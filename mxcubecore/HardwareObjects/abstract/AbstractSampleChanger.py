@@ -225,6 +225,7 @@ class SampleChanger(Container, HardwareObject):
         self._timer_update_inverval = 5  # interval in periods of 100 ms
         self._timer_update_counter = 0
         self.use_update_timer = None
+        self._prefetched_sample = None
 
     def init(self):
         """
@@ -601,6 +602,46 @@ class SampleChanger(Container, HardwareObject):
         self.wait_ready(timeout=10)
         return self.load(sample_to_load)
 
+    def is_prefetch_supported(self):
+        """
+        Returns:
+            (bool): True if the sample changer can pick a sample from the
+                    dewar while another sample is mounted.
+        """
+        return False
+
+    def get_prefetched_sample(self):
+        """
+        Returns:
+            (Sample): Sample held by the sample changer, ready to be loaded
+                      by a chained unload/load, or None
+        """
+        return self._prefetched_sample
+
+    def prefetch(self, sample, wait=True):
+        """
+        Pick a sample from the dewar while the loaded sample stays mounted,
+        so that its load is reduced to an exchange with the loaded sample.
+
+        Args:
+            sample (tuple): sample address on the form
+                            (component1, ... ,component_N-1, component_N)
+            wait (boolean): True to wait for the pick to complete False otherwise
+
+        Returns:
+            (Object): Value returned by _execute_task either a Task or result of the
+                      operation
+        """
+        sample = self._resolve_component(sample)
+        if not self.is_prefetch_supported():
+            raise Exception("Sample prefetch is not supported")
+        self.assert_not_charging()
+        if sample is None or sample == self.get_loaded_sample():
+            raise Exception("Cannot prefetch the loaded sample")
+        return self._execute_task(
+            SampleChangerState.Moving, wait, self._prefetch, sample
+        )
+
     def load(self, sample=None, wait=True):
         """
         Load a sample.
@@ -668,6 +709,11 @@ class SampleChanger(Container, HardwareObject):
     def _load(self, sample=None):
         self._do_load(sample)
 
+    def _prefetch(self, sample):
+        self._prefetched_sample = None
+        self._do_prefetch(sample)
+        self._prefetched_sample = sample
+
     def _unload(self, sample_slot=None):
         self._do_unload(sample_slot)
 
@@ -716,6 +762,13 @@ class SampleChanger(Container, HardwareObject):
     def _do_reset(self):
         return
 
+    def _do_prefetch(self, sample):
+        """
+        Pick sample from the dewar and hold it in the gripper, to implement
+        together with is_prefetch_supported
+        """
+        return
+
     # ########################    PROTECTED    #########################
 
     def _execute_task(self, task, wait, method, *args):
@@ -796,6 +849,8 @@ class SampleChanger(Container, HardwareObject):
 
     def _set_loaded_sample(self, sample):
         previous_loaded = None
+        if sample == self._prefetched_sample:
+            self._prefetched_sample = None
 
         for smp in self.get_sample_list():
             if smp.is_loaded():
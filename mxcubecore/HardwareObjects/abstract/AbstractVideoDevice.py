@@ -26,14 +26,24 @@ This module declares class GenericVideo.
 
 This class is not meant to be instanced directly but as
 the base class for classes providing access to Video in MXCuBE
+
+Every grabbed frame is kept in a FrameBuffer. Its RGB, QImage and JPEG
+encodings are computed once, when first requested, and shared by all the
+consumers (Qt view, web streamer, snapshots).
+
+The JPEG images are encoded in a pool of jpeg_threads threads. The frames
+streamed while all the threads are busy are dropped. The JPEG quality and
+scale of the stream are adapted to stream_target_fps or
+stream_target_bandwidth [bytes/s] if configured. The adapted images are
+kept apart from the full quality JPEG encoding of the other consumers.
 """
 
 import abc
+import functools
 import os
 import sys
 import time
 import logging
-from io import BytesIO
 import gevent
 import numpy as np
 import warnings
@@ -44,6 +54,8 @@ except ImportError:
     pass
 
 from mxcubecore.BaseHardwareObjects import HardwareObject
+from mxcubecore.utils.frame_buffer import FrameBuffer
+from mxcubecore.utils.jpeg_encoder import JpegEncoder
 
 
 module_names = ["qt", "PyQt5", "PyQt4"]
@@ -62,6 +74,9 @@ class AbstractVideoDevice(HardwareObject):
     default_poll_interval = 50
     default_cam_type = "basler"
     default_scale_factor = 1.0
+    default_frame_buffer_size = 4
+    default_jpeg_threads = 2
+    default_jpeg_quality = 75
 
     def __init__(self, name):
         super().__init__(name)
@@ -84,6 +99,11 @@ class AbstractVideoDevice(HardwareObject):
 
         self.decoder = None
         self.scale = None
+        self.frame_buffer = FrameBuffer(self.default_frame_buffer_size)
+        self.jpeg_encoder = JpegEncoder(
+            self.default_jpeg_threads, self.default_jpeg_quality
+        )
+        self._last_emitted_sequence = 0
 
     def init(self):
         """Initialise the values from config and set default values,
@@ -127,6 +147,19 @@ class AbstractVideoDevice(HardwareObject):
 
         self.scale = self.get_property("scale", 1.0)
 
+        frame_buffer_size = self.get_property(
+            "frame_buffer_size", self.default_frame_buffer_size
+        )
+        if frame_buffer_size != self.frame_buffer.size:
+            self.frame_buffer = FrameBuffer(frame_buffer_size)
+
+        self.jpeg_encoder = JpegEncoder(
+            threads=self.get_property("jpeg_threads", self.default_jpeg_threads),
+            quality=self.get_property("jpeg_quality", self.default_jpeg_quality),
+            target_fps=self.get_property("stream_target_fps"),
+            target_bandwidth=self.get_property("stream_target_bandwidth"),
+        )
+
         try:
             self.cam_type = self.get_property("type").lower()
         except AttributeError:
@@ -171,28 +204,160 @@ class AbstractVideoDevice(HardwareObject):
 
     # -------- Generic methods --------
 
-    def get_new_image(self):
-        """
-        Descript. :
+    def grab_frame(self):
+        """Read a new image with `self.get_image()` and add it to the
+        frame buffer.
+
+        Returns:
+            (Frame): The new frame, None if no image or a blank image.
         """
         raw_buffer, width, height = self.get_image()
 
         if raw_buffer is not None and raw_buffer.any():
-            if self.decoder:
-                raw_buffer = self.decoder(raw_buffer)
-                qimage = QImage(
-                    raw_buffer, width, height, width * 3, QImage.Format_RGB888
-                )
-            else:
-                qimage = QImage(raw_buffer, width, height, QImage.Format_RGB888)
+            return self.frame_buffer.put(raw_buffer, width, height)
+        return None
+
+    def get_last_frame(self):
+        """Get the last grabbed frame, without reading a new image.
+        Returns:
+            (Frame): The last frame, None if no frame grabbed yet.
+        """
+        return self.frame_buffer.get_last()
+
+    def get_rgb_image(self, frame):
+        """Get the frame decoded to RGB, decoded once per frame.
+        Args:
+            frame (Frame): Frame of the frame buffer.
+        Returns:
+            (numpy.ndarray): Read-only RGB image.
+        """
+        return frame.get_encoding("rgb", self._encode_rgb)
+
+    def get_jpg_frame(self, frame, block=True):
+        """Get the frame encoded to JPEG at full quality and size, encoded
+        once per frame.
+        Args:
+            frame (Frame): Frame of the frame buffer.
+            block (bool): Wait for an encoding thread if all are busy,
+                          otherwise drop the frame.
+        Returns:
+            (bytes): JPEG image, None if dropped.
+        """
+        return frame.get_encoding(
+            "jpeg", functools.partial(self._encode_jpeg, block=block)
+        )
+
+    def get_stream_jpg_frame(self, frame, block=True):
+        """Get the frame encoded to JPEG for the stream, with the quality
+        and scale adapted to stream_target_fps and stream_target_bandwidth.
+        Same as get_jpg_frame while the encoding is not adapted.
+        Args:
+            frame (Frame): Frame of the frame buffer.
+            block (bool): Wait for an encoding thread if all are busy,
+                          otherwise drop the frame.
+        Returns:
+            (tuple): JPEG image (bytes), its width and its height [pixels],
+                     None if dropped.
+        """
+        return frame.get_encoding(
+            "jpeg_stream", functools.partial(self._encode_stream_jpeg, block=block)
+        )
+
+    def get_display_image(self, frame):
+        """Get the frame as displayed, mirrored with cam_mirror and scaled
+        with scale, in the coordinates of the screen (pixels per mm, beam
+        position). Computed once per frame.
+        Args:
+            frame (Frame): Frame of the frame buffer.
+        Returns:
+            (numpy.ndarray): Read-only image (height x width x channels).
+        """
+        return frame.get_encoding("display", self._encode_display)
 
-            if self.cam_mirror is not None:
-                qimage = qimage.mirrored(self.cam_mirror[0], self.cam_mirror[1])
+    def get_qimage_frame(self, frame):
+        """Get the frame as a mirrored and scaled QImage, once per frame.
+        Args:
+            frame (Frame): Frame of the frame buffer.
+        Returns:
+            (QImage): Image, to copy before any modification.
+        """
+        return frame.get_encoding("qimage", self._encode_qimage)
+
+    def _encode_rgb(self, frame):
+        rgb_image = frame.data
+        if self.decoder:
+            rgb_image = np.asarray(self.decoder(frame.data)).view()
+            rgb_image.flags.writeable = False
+        return rgb_image
+
+    def _encode_display(self, frame):
+        image = np.asarray(self.get_rgb_image(frame))
+        image = image.reshape(frame.height, frame.width, -1)
+
+        if self.cam_mirror is not None:
+            if self.cam_mirror[0]:
+                image = image[:, ::-1]
+            if self.cam_mirror[1]:
+                image = image[::-1]
+
+        if self.scale not in (None, 1):
+            # Nearest neighbour, as the frame size times scale
+            width = max(1, int(round(frame.width * self.scale)))
+            height = max(1, int(round(frame.height * self.scale)))
+            rows = np.arange(height) * frame.height // height
+            columns = np.arange(width) * frame.width // width
+            image = np.take(np.take(image, rows, axis=0), columns, axis=1)
+
+        image = np.ascontiguousarray(image)
+        image.flags.writeable = False
+        return image
+
+    def _encode_jpeg(self, frame, block=True):
+        return self.jpeg_encoder.encode(
+            self.get_rgb_image(frame), frame.width, frame.height, block, False
+        )
+
+    def _encode_stream_jpeg(self, frame, block=True):
+        if not self.jpeg_encoder.is_adapted():
+            # Shared with the other consumers of the frame
+            jpg_img = self.get_jpg_frame(frame, block)
+            if jpg_img is None:
+                return None
+            return jpg_img, frame.width, frame.height
 
-            if self.scale != 1:
-                dims = self.get_image_dimensions()  # should be already scaled
-                qimage = qimage.scaled(QSize(dims[0], dims[1]))
+        return self.jpeg_encoder.encode_with_size(
+            self.get_rgb_image(frame), frame.width, frame.height, block
+        )
 
+    def _encode_qimage(self, frame):
+        rgb_image = self.get_rgb_image(frame)
+        qimage = QImage(
+            rgb_image.tobytes(),
+            frame.width,
+            frame.height,
+            frame.width * 3,
+            QImage.Format_RGB888,
+        )
+
+        if self.cam_mirror is not None:
+            qimage = qimage.mirrored(self.cam_mirror[0], self.cam_mirror[1])
+        else:
+            # Detach the image from the bytes of the RGB image
+            qimage = qimage.copy()
+
+        if self.scale != 1:
+            dims = self.get_image_dimensions()  # should be already scaled
+            qimage = qimage.scaled(QSize(dims[0], dims[1]))
+        return qimage
+
+    def get_new_image(self):
+        """
+        Descript. :
+        """
+        frame = self.grab_frame()
+
+        if frame is not None:
+            qimage = self.get_qimage_frame(frame)
             qpixmap = QPixmap(qimage)
             self.emit("imageReceived", qpixmap)
             return qimage.copy()
@@ -200,24 +365,50 @@ class AbstractVideoDevice(HardwareObject):
     def get_jpg_image(self):
         """Reads`raw_data` image `[1D numpy array of np.uint16]` from
         `self.get_image()` and convert it to .jpg image.
-        For now this function allows to deal with any RGB encoded
-        video data. Emit imageReceived signal with the jpeg image.
+        The image is decoded to RGB with the decoder of the camera
+        encoding, if any. Emit imageReceived signal with the jpeg image.
 
         Returns:
             (bytes): Coverted to jpeg image.
         """
-        raw_buffer, width, height = self.get_image()
+        frame = self.grab_frame()
 
-        if raw_buffer is not None and raw_buffer.any():
-            image = Image.frombytes("RGB", (width, height), raw_buffer)
-            buffer = BytesIO()
-            image.save(buffer, "JPEG")
-            jpg_img = buffer.getvalue()
-            if jpg_img is not None:
-                self.emit("imageReceived", jpg_img, width, height)
-            return jpg_img
+        if frame is not None:
+            return self._emit_jpg_frame(frame)
         return None
 
+    def _emit_jpg_frame(self, frame, block=True):
+        encoded = self.get_stream_jpg_frame(frame, block)
+        if encoded is None:
+            return None
+
+        jpg_img, width, height = encoded
+        # Frames encoded concurrently may end in any order
+        if frame.sequence > self._last_emitted_sequence:
+            self._last_emitted_sequence = frame.sequence
+            self.emit("imageReceived", jpg_img, width, height)
+        return jpg_img
+
+    def get_stream_statistics(self):
+        """Get the statistics of the JPEG encoding of the frames.
+        Returns:
+            (dict): Encoding latency [s], frame size [bytes], effective fps,
+                    encoded and dropped frames, current quality and scale.
+        """
+        return self.jpeg_encoder.get_statistics()
+
+    def get_last_jpg_image(self):
+        """Get the last grabbed frame as jpeg, without reading a new image,
+        so that the consumers of the images share the encoding.
+
+        Returns:
+            (bytes): The jpeg image, None if no frame grabbed yet.
+        """
+        frame = self.get_last_frame()
+        if frame is None:
+            return None
+        return self.get_jpg_frame(frame)
+
     def get_cam_type(self):
         """Get the camera type
         Returns:
@@ -283,8 +474,14 @@ class AbstractVideoDevice(HardwareObject):
             qimage = self.get_new_image()
             qimage.save(filename, image_type)
         else:
-            jpgstr = self.get_jpg_image()
-            open(filename, "w").write(jpgstr)
+            # Full quality, independently of the stream
+            frame = self.grab_frame() or self.get_last_frame()
+            if frame is None:
+                raise RuntimeError("%s: no image to save" % self.name())
+            image = Image.frombytes(
+                "RGB", (frame.width, frame.height), self.get_rgb_image(frame)
+            )
+            image.save(filename, image_type)
 
     def take_snapshot(self, bw=None, return_as_array=True):
         """Take the snapshot.
@@ -386,7 +583,10 @@ class AbstractVideoDevice(HardwareObject):
             if USEQT:
                 self.get_new_image()
             else:
-                self.get_jpg_image()
+                # Encoded while grabbing the next frames
+                frame = self.grab_frame()
+                if frame is not None:
+                    gevent.spawn(self._emit_jpg_frame, frame, False)
             time.sleep(sleep_time)
 
     def connect_notify(self, signal):
@@ -74,7 +74,7 @@ class DiffractometerMockup(GenericDiffractometer):
             "kappa": 11,
             "kappa_phi": 22.0,
         }
-        self.move_motors(self._get_random_centring_position())
+        self.move_to_motors_positions(self._get_random_centring_position())
 
         self.current_state_dict = {}
         self.centring_status = {"valid": False}
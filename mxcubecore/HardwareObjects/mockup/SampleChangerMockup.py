@@ -65,14 +65,20 @@ class SampleChangerMockup(AbstractSampleChanger.SampleChanger):
             "Sample changer: %s. Please wait..." % msg
         )
 
-        self.emit("progressInit", (msg, 100))
-        for step in range(2 * 100):
-            self.emit("progressStep", int(step / 2.0))
-            time.sleep(0.01)
-
         mounted_sample = self.get_component_by_address(
             Container.Pin.get_sample_address(basket, sample)
         )
+        # A prefetched sample is already out of the dewar
+        steps = 2
+        if mounted_sample is self._prefetched_sample:
+            self._prefetched_sample = None
+            steps = 1
+
+        self.emit("progressInit", (msg, 100))
+        for step in range(steps * 100):
+            self.emit("progressStep", int(step / steps))
+            time.sleep(0.01)
+
         self._set_state(AbstractSampleChanger.SampleChangerState.Ready)
 
         if mounted_sample is not previous_sample:
@@ -128,6 +134,15 @@ class SampleChangerMockup(AbstractSampleChanger.SampleChanger):
     def _do_load(self, sample=None):
         return
 
+    def is_prefetch_supported(self):
+        return True
+
+    def _do_prefetch(self, sample):
+        logging.getLogger("user_level_log").info(
+            "Sample changer: Picking sample %s" % sample.get_address()
+        )
+        time.sleep(1)
+
     def _do_unload(self, sample_slot=None):
         return
 
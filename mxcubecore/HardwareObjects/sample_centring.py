@@ -6,6 +6,8 @@ import time
 import logging
 import os
 import tempfile
+import gevent
+from PIL import Image
 
 try:
     import lucid3 as lucid
@@ -35,6 +37,13 @@ CURRENT_CENTRING = None
 SAVED_INITIAL_POSITIONS = {}
 READY_FOR_NEXT_POINT = gevent.event.Event()
 NUM_CENTRING_ROUNDS = 1
+# Region (x, y, width, height) of the camera images where the loop is
+# searched [pixels], None for the whole image
+LOOP_DETECTION_ROI = None
+# Binning of the camera images before the loop detection
+LOOP_DETECTION_BINNING = 1
+# Rotate to the next angle during the loop detection in auto_center
+OVERLAP_LOOP_DETECTION = False
 
 
 class CentringMotor:
@@ -402,9 +411,13 @@ def move_motors(motor_positions_dict):
     wait_ready(motor_positions_dict, timeout=60)
 
 
-def user_click(x, y, wait=False):
+def user_click(x, y, wait=False, phi_position=None):
     READY_FOR_NEXT_POINT.clear()
-    USER_CLICKED_EVENT.set((x, y))
+    if phi_position is None:
+        USER_CLICKED_EVENT.set((x, y))
+    else:
+        # Point of an image taken at phi_position, the caller rotates phi
+        USER_CLICKED_EVENT.set((x, y, phi_position))
     if wait:
         READY_FOR_NEXT_POINT.wait()
 
@@ -432,15 +445,19 @@ def center(
         i = 0
         while i < n_points:
             try:
-                x, y = USER_CLICKED_EVENT.get()
+                click = USER_CLICKED_EVENT.get()
             except Exception:
                 raise RuntimeError("Aborted while waiting for point selection")
             USER_CLICKED_EVENT = gevent.event.AsyncResult()
+            x, y = click[:2]
             X.append(x / float(pixelsPerMm_Hor))
             Y.append(y / float(pixelsPerMm_Ver))
-            phi_positions.append(phi.direction * math.radians(phi.get_value()))
-            if i != n_points - 1:
-                phi.set_value_relative(phi.direction * phi_angle, timeout=10)
+            if len(click) > 2:
+                phi_positions.append(phi.direction * math.radians(click[2]))
+            else:
+                phi_positions.append(phi.direction * math.radians(phi.get_value()))
+                if i != n_points - 1:
+                    phi.set_value_relative(phi.direction * phi_angle, timeout=10)
             READY_FOR_NEXT_POINT.set()
             i += 1
     except Exception:
@@ -536,11 +553,80 @@ def start_auto(
     return CURRENT_CENTRING
 
 
-def find_loop(sample_view, pixelsPerMm_Hor, chi_angle, msg_cb, new_point_cb):
+def get_snapshot_array(sample_view):
+    """Get the current image of the sample camera, in memory if the camera
+    allows it, otherwise through a temporary file.
+
+    Args:
+        sample_view (AbstractSampleView): Sample view.
+    Returns:
+        (numpy.ndarray): Gray (height x width) or colour (height x width x
+                         channels) image.
+    """
+    camera = sample_view.camera
+    if camera is not None and hasattr(camera, "get_display_image"):
+        frame = camera.grab_frame()
+        if frame is not None:
+            # Mirrored and scaled as displayed, as the clicked points
+            return camera.get_display_image(frame)
+
+    image = sample_view.get_snapshot(overlay=False, bw=True, return_as_array=True)
+    if isinstance(image, numpy.ndarray):
+        return image
+
     snapshot_filename = os.path.join(
         tempfile.gettempdir(), "mxcube_sample_snapshot.png"
     )
     sample_view.save_snapshot(snapshot_filename, overlay=False, bw=True)
+    with Image.open(snapshot_filename) as snapshot:
+        return numpy.asarray(snapshot.convert("L"))
+
+
+def prepare_loop_image(image, roi=None, binning=1):
+    """Crop, bin and convert to gray an image for the loop detection.
+
+    Args:
+        image (numpy.ndarray): Gray or RGB(A) image.
+        roi (tuple): Region (x, y, width, height) to keep [pixels], None for
+                     the whole image.
+        binning (int): Number of pixels binned in both directions.
+    Returns:
+        (numpy.ndarray): Gray image, repeated in 3 channels (height x width
+                         x 3 uint8), as an image file read by lucid.
+    """
+    if roi is not None:
+        x, y, width, height = roi
+        image = image[max(0, y) : y + height, max(0, x) : x + width]
+
+    if image.ndim == 3:
+        # ITU-R 601-2 luma, as the grayscale conversion of PIL
+        image = image[:, :, 0] * 0.299 + image[:, :, 1] * 0.587 + image[:, :, 2] * 0.114
+
+    if binning > 1:
+        height = image.shape[0] // binning
+        width = image.shape[1] // binning
+        image = image[: height * binning, : width * binning]
+        image = image.reshape(height, binning, width, binning).mean(axis=(1, 3))
+
+    image = numpy.clip(image, 0, 255).astype(numpy.uint8, copy=False)
+    return numpy.repeat(image[:, :, numpy.newaxis], 3, axis=2)
+
+
+def detect_loop(image, chi_angle, msg_cb=None, new_point_cb=None):
+    """Find the loop in an image of the sample camera, in the region of
+    interest LOOP_DETECTION_ROI binned by LOOP_DETECTION_BINNING. The
+    detection runs in a thread, without blocking the other greenlets.
+
+    Args:
+        image (numpy.ndarray): Gray or RGB(A) image.
+        chi_angle (float): Chi angle [deg].
+        msg_cb (callable): Called with a message on the detection.
+        new_point_cb (callable): Called with the found point.
+    Returns:
+        (tuple): Coordinates of the loop in the image [pixels], (-1, -1) if
+                 not found.
+    """
+    loop_image = prepare_loop_image(image, LOOP_DETECTION_ROI, LOOP_DETECTION_BINNING)
 
     # Lucid does not accept 0 degree rotation and
     # has a reference frame that is reversed to the one used
@@ -550,8 +636,10 @@ def find_loop(sample_view, pixelsPerMm_Hor, chi_angle, msg_cb, new_point_cb):
     else:
         chi_angle = -chi_angle
 
-    info, x, y = lucid.find_loop(
-        snapshot_filename, rotation=chi_angle, debug=False, IterationClosing=6
+    info, x, y = gevent.get_hub().threadpool.apply(
+        lucid.find_loop,
+        (loop_image,),
+        {"rotation": chi_angle, "debug": False, "IterationClosing": 6},
     )
 
     try:
@@ -560,6 +648,14 @@ def find_loop(sample_view, pixelsPerMm_Hor, chi_angle, msg_cb, new_point_cb):
     except Exception:
         return -1, -1
 
+    if x >= 0 and y >= 0:
+        # Back to the coordinates of the whole image, at the centre of
+        # the binned pixels
+        binning = LOOP_DETECTION_BINNING
+        x_offset, y_offset = (LOOP_DETECTION_ROI or (0, 0))[:2]
+        x = (x + 0.5) * binning - 0.5 + max(0, x_offset)
+        y = (y + 0.5) * binning - 0.5 + max(0, y_offset)
+
     if callable(msg_cb):
         msg_cb("Loop found: %s (%d, %d)" % (info, x, y))
     if callable(new_point_cb):
@@ -568,6 +664,10 @@ def find_loop(sample_view, pixelsPerMm_Hor, chi_angle, msg_cb, new_point_cb):
     return x, y
 
 
+def find_loop(sample_view, pixelsPerMm_Hor, chi_angle, msg_cb, new_point_cb):
+    return detect_loop(get_snapshot_array(sample_view), chi_angle, msg_cb, new_point_cb)
+
+
 def auto_center(
     sample_view,
     phi,
@@ -618,10 +718,34 @@ def auto_center(
             n_points,
         )
 
+        # Rotation between the points, as in center
+        phi_angle = 180 / (n_points - 1)
+
         for a in range(n_points):
-            x, y = find_loop(
-                sample_view, pixelsPerMm_Hor, chi_angle, msg_cb, new_point_cb
-            )
+            if OVERLAP_LOOP_DETECTION:
+                image = get_snapshot_array(sample_view)
+                phi_position = phi.get_value()
+                rotation = None
+                if a != n_points - 1:
+                    # Rotate to the next angle during the detection
+                    rotation = gevent.spawn(
+                        phi.set_value_relative, phi.direction * phi_angle, timeout=10
+                    )
+                try:
+                    x, y = detect_loop(image, chi_angle, msg_cb, new_point_cb)
+                finally:
+                    if rotation is not None:
+                        rotation.get()
+
+                if x >= 0 and y >= 0:
+                    user_click(x, y, wait=True, phi_position=phi_position)
+                    continue
+                # Loop not found, searched around the angle of the image
+                phi.set_value(phi_position, timeout=10)
+            else:
+                x, y = find_loop(
+                    sample_view, pixelsPerMm_Hor, chi_angle, msg_cb, new_point_cb
+                )
             # logging.info("in autocentre, x=%f, y=%f",x,y)
             if x < 0 or y < 0:
                 for i in range(1, 18):
@@ -38,9 +38,15 @@ import traceback
 from typing import Union, TYPE_CHECKING
 from datetime import datetime
 
+from xml.etree import ElementTree
+
+import gevent
+import gevent.event
 from ruamel.yaml import YAML
 
 from mxcubecore.utils.conversion import string_types, make_table
+from mxcubecore.utils import config_cache
+from mxcubecore.utils import startup_profile
 from mxcubecore.dispatcher import dispatcher
 from mxcubecore import BaseHardwareObjects
 from mxcubecore import HardwareObjectFileParser
@@ -68,7 +74,12 @@ BEAMLINE_CONFIG_FILE = "beamline_config.yml"
 
 
 def load_from_yaml(configuration_file, role, _container=None, _table=None):
-    """
+    """Load a yaml configured object and its contained objects.
+
+    The contained objects (_objects) are loaded in order, unless the
+    configuration sets '_concurrent_loading: true'. They are then loaded
+    concurrently, each one once the objects it references (xml href) and
+    the roles listed for it in '_dependencies' are loaded.
 
     Args:
         configuration_file (str):
@@ -100,8 +111,11 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
 
     if not msg0:
         # Load the configuration file
-        with open(configuration_path, "r") as fp0:
-            configuration = yaml.load(fp0)
+        with startup_profile.span(configuration_file, "parse"):
+            with open(configuration_path, "r") as fp0:
+                configuration = config_cache.load(
+                    configuration_path, fp0.read(), yaml.load
+                )
 
         # Get actual class
         initialise_class = configuration.pop("_initialise_class", None)
@@ -127,7 +141,8 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
         module_name, class_name = class_import.rsplit(".", 1)
         # For "a.b.c" equivalent to absolute import of "from a.b import c"
         try:
-            cls = getattr(importlib.import_module(module_name), class_name)
+            with startup_profile.span(configuration_file, "import"):
+                cls = getattr(importlib.import_module(module_name), class_name)
         except Exception as ex:
             if _container:
                 msg0 = "Error importing class"
@@ -142,7 +157,8 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
     if not msg0:
         try:
             # instantiate object
-            result = cls(name=role, **initialise_class)
+            with startup_profile.span(configuration_file, "instantiate"):
+                result = cls(name=role, **initialise_class)
         except Exception:
             if _container:
                 msg0 = "Error instantiating %s" % cls.__name__
@@ -161,7 +177,8 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
     if not msg0:
         try:
             # Initialise object
-            result._init()
+            with startup_profile.span(configuration_file, "_init"):
+                result._init()
         except Exception:
             if _container:
                 msg0 = "Error in %s._init()" % cls.__name__
@@ -172,6 +189,8 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
     if not msg0:
         # Recursively load contained objects (of any type that the system can support)
         _objects = configuration.pop("_objects", {})
+        concurrent_loading = configuration.pop("_concurrent_loading", False)
+        dependencies = configuration.pop("_dependencies", None) or {}
         if _objects:
             load_time = 1000 * (time.time() - start_time)
             msg1 = "Start loading contents:"
@@ -179,33 +198,13 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
                 (role, class_name, configuration_file, "%.1d" % load_time, msg1)
             )
             msg0 = "Done loading contents"
-        for role1, config_file in _objects.items():
-            fname, fext = os.path.splitext(config_file)
-            if fext == ".yml":
-                load_from_yaml(
-                    config_file, role=role1, _container=result, _table=_table
-                )
-            elif fext == ".xml":
-                msg1 = ""
-                time0 = time.time()
-                try:
-                    hwobj = _instance.get_hardware_object(fname)
-                    if hwobj is None:
-                        msg1 = "No object loaded"
-                        class_name1 = "None"
-                    else:
-                        class_name1 = hwobj.__class__.__name__
-                        if hasattr(result, role1):
-                            result.replace_object(role1, hwobj)
-                        else:
-                            msg1 = "No such role: %s.%s" % (class_name, role1)
-                except Exception as ex:
-                    msg1 = "Loading error (%s)" % str(ex)
-                    class_name = ""
-                load_time = 1000 * (time.time() - time0)
-                _table.append(
-                    (role1, class_name1, config_file, "%.1d" % load_time, msg1)
-                )
+        if concurrent_loading and _objects:
+            _load_contents_concurrently(
+                _objects, dependencies, result, class_name, _table
+            )
+        else:
+            for role1, config_file in _objects.items():
+                _load_content(role1, config_file, result, class_name, _table)
 
         # Set simple, miscellaneous properties.
         # NB the attribute must have been initialied in the class __init__ first.
@@ -228,7 +227,8 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
                 msg0 = "No such role: %s.%s" % (_container.__class__.__name__, role)
         try:
             # Initialise object
-            result.init()
+            with startup_profile.span(configuration_file, "init"):
+                result.init()
         except Exception:
             if _container:
                 msg0 = "Error in %s.init()" % cls.__name__
@@ -245,6 +245,215 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
     return result
 
 
+def _load_content(role, config_file, container, container_class, _table):
+    """Load one contained object of a yaml configured object
+
+    Args:
+        role (str): Role name of the contained object
+        config_file (str): Configuration file of the contained object
+        container (ConfiguredObject): Container object
+        container_class (str): Class name of the container, for messages
+        _table (List): Collecting summary output
+    """
+    fname, fext = os.path.splitext(config_file)
+    if fext == ".yml":
+        load_from_yaml(config_file, role=role, _container=container, _table=_table)
+    elif fext == ".xml":
+        msg1 = ""
+        time0 = time.time()
+        try:
+            hwobj = _instance.get_hardware_object(fname)
+            if hwobj is None:
+                msg1 = "No object loaded"
+                class_name1 = "None"
+            else:
+                class_name1 = hwobj.__class__.__name__
+                if hasattr(container, role):
+                    container.replace_object(role, hwobj)
+                else:
+                    msg1 = "No such role: %s.%s" % (container_class, role)
+        except Exception as ex:
+            msg1 = "Loading error (%s)" % str(ex)
+            class_name1 = ""
+        load_time = 1000 * (time.time() - time0)
+        _table.append((role, class_name1, config_file, "%.1d" % load_time, msg1))
+
+
+def _get_file_references(config_file, _references=None):
+    """Get the names of all the xml files used by a configuration file,
+    following the _objects of yaml files and the href of xml files
+
+    Args:
+        config_file (str): Configuration file name
+        _references (set): Internal, collecting the references
+
+    Returns:
+        set: Names of the xml files (without extension), including config_file
+    """
+    if _references is None:
+        _references = set()
+
+    fname, fext = os.path.splitext(config_file)
+    if fext == ".xml":
+        fname = fname if fname.startswith("/") else "/" + fname
+        if fname in _references:
+            return _references
+        _references.add(fname)
+        path = _instance.find_in_repository(config_file)
+        if path is None:
+            return _references
+        try:
+            for _, element in ElementTree.iterparse(path):
+                href = element.get("href")
+                if href:
+                    _get_file_references(href + ".xml", _references)
+        except ElementTree.ParseError:
+            pass
+    elif fext == ".yml":
+        path = _instance.find_in_repository(config_file)
+        if path is None:
+            return _references
+        with open(path, "r") as fp0:
+            configuration = config_cache.load(path, fp0.read(), yaml.load) or {}
+        for config_file1 in configuration.get("_objects", {}).values():
+            _get_file_references(config_file1, _references)
+
+    return _references
+
+
+def get_load_dependencies(_objects, dependencies=None):
+    """Build the dependency graph of the contained objects of a yaml
+    configured object.
+
+    A role depends on another if it references its xml file (href), and on
+    the roles declared in dependencies. Other dependencies, such as access
+    to HWR.beamline attributes in init(), must be declared.
+
+    Args:
+        _objects (dict): Contained objects configuration files, by role
+        dependencies (dict): Declared dependencies, lists of roles by role
+
+    Returns:
+        dict: Set of roles that each role depends on
+    """
+    dependencies = dependencies or {}
+    file_names = {}
+    for role, config_file in _objects.items():
+        fname = os.path.splitext(config_file)[0]
+        file_names[role] = fname if fname.startswith("/") else "/" + fname
+
+    result = {}
+    for role, config_file in _objects.items():
+        result[role] = set(
+            role1 for role1 in dependencies.get(role, ()) if role1 in _objects
+        )
+        references = _get_file_references(config_file)
+        for role1, fname in file_names.items():
+            if role1 != role and fname in references:
+                result[role].add(role1)
+    return result
+
+
+def _has_cycle(graph):
+    """Check if a dependency graph, as returned by get_load_dependencies,
+    contains a cycle"""
+    remaining = dict((role, set(deps)) for role, deps in graph.items())
+    while remaining:
+        ready = [role for role, deps in remaining.items() if not deps]
+        if not ready:
+            return True
+        for role in ready:
+            del remaining[role]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return False
+
+
+def get_critical_path(graph, timing):
+    """Get the chain of loads that determined the total loading time
+
+    Args:
+        graph (dict): Set of roles that each role depends on
+        timing (dict): (start, end) time of each role loading
+
+    Returns:
+        List[str]: Roles of the critical path, in loading order
+    """
+    path = []
+    role = max(timing, key=lambda role1: timing[role1][1]) if timing else None
+    while role is not None:
+        path.append(role)
+        # the dependency the object waited for last, if any
+        deps = [role1 for role1 in graph.get(role, ()) if role1 in timing]
+        role = max(deps, key=lambda role1: timing[role1][1]) if deps else None
+    return list(reversed(path))
+
+
+def _load_contents_concurrently(
+    _objects, dependencies, container, container_class, _table
+):
+    """Load the contained objects of a yaml configured object concurrently,
+    each in its own greenlet once the objects it depends on are loaded.
+
+    Falls back to sequential loading if the dependencies contain a cycle.
+    Adds a 'critical path' line to the summary output.
+
+    Args:
+        _objects (dict): Contained objects configuration files, by role
+        dependencies (dict): Declared dependencies, lists of roles by role
+        container (ConfiguredObject): Container object
+        container_class (str): Class name of the container, for messages
+        _table (List): Collecting summary output
+    """
+    graph = get_load_dependencies(_objects, dependencies)
+    if _has_cycle(graph):
+        logging.getLogger("HWR").error(
+            "%s: cyclic loading dependencies, loading sequentially", container_class
+        )
+        for role, config_file in _objects.items():
+            _load_content(role, config_file, container, container_class, _table)
+        return
+
+    loaded = dict((role, gevent.event.Event()) for role in _objects)
+    tables = dict((role, []) for role in _objects)
+    timing = {}
+
+    def load(role, config_file):
+        for role1 in graph[role]:
+            loaded[role1].wait()
+        start_time = time.time()
+        try:
+            _load_content(role, config_file, container, container_class, tables[role])
+        finally:
+            timing[role] = (start_time, time.time())
+            loaded[role].set()
+
+    start_time = time.time()
+    gevent.joinall(
+        [
+            gevent.spawn(load, role, config_file)
+            for role, config_file in _objects.items()
+        ]
+    )
+    total_time = 1000 * (time.time() - start_time)
+
+    # Keep summary output in configuration order
+    for role in _objects:
+        _table.extend(tables[role])
+
+    path = get_critical_path(graph, timing)
+    path_time = sum(1000 * (timing[role][1] - timing[role][0]) for role in path)
+    _table.append(
+        (
+            "critical path",
+            container_class,
+            " > ".join(path),
+            "%.1d" % path_time,
+            "Loaded concurrently in %.1d ms" % total_time,
+        )
+    )
+
+
 def add_hardware_objects_dirs(ho_dirs):
     """Adds directories with xml/yaml config files
 
@@ -306,6 +515,10 @@ def init_hardware_repository(configuration_path):
     beamline = load_from_yaml(BEAMLINE_CONFIG_FILE, role="beamline")
     beamline._hwr_init_done()
 
+    profiler = startup_profile.get_profiler()
+    if profiler is not None:
+        profiler.report()
+
 
 def uninit_hardware_repository():
     global _instance, beamline
@@ -349,6 +562,8 @@ class __HardwareRepositoryClient:
         self.hwobj_info_list = []
         self.invalid_hardware_objects = None
         self.hardware_objects = None
+        # Objects being loaded, for concurrent loading
+        self._loading = {}
 
     def connect(self):
         if self.__connected:
@@ -412,6 +627,7 @@ class __HardwareRepositoryClient:
         class_name = ""
         hwobj_instance = None
         xml_data = ""
+        file_path = None
 
         for xml_files_path in self.server_address:
             file_name = (
@@ -429,7 +645,8 @@ class __HardwareRepositoryClient:
 
         if xml_data:
             try:
-                hwobj_instance = self.parse_xml(xml_data, hwobj_name)
+                with startup_profile.span(hwobj_name, "parse"):
+                    hwobj_instance = self.parse_xml(xml_data, hwobj_name, file_path)
                 if isinstance(hwobj_instance, string_types):
                     # We have redirection to another file
                     # Enter in dictionaries also under original names
@@ -456,10 +673,12 @@ class __HardwareRepositoryClient:
                         )
                         del self.hardware_objects[name]
 
-                    hwobj_instance.resolve_references()
+                    with startup_profile.span(hwobj_name, "resolve_references"):
+                        hwobj_instance.resolve_references()
 
                     try:
-                        hwobj_instance._add_channels_and_commands()
+                        with startup_profile.span(hwobj_name, "channels_commands"):
+                            hwobj_instance._add_channels_and_commands()
                     except Exception:
                         logging.getLogger("HWR").exception(
                             "Error while adding commands and/or channels to Hardware Object %s",
@@ -468,8 +687,10 @@ class __HardwareRepositoryClient:
                         comment = "Failed to add all commands and/or channels"
 
                     try:
-                        hwobj_instance._init()
-                        hwobj_instance.init()
+                        with startup_profile.span(hwobj_name, "_init"):
+                            hwobj_instance._init()
+                        with startup_profile.span(hwobj_name, "init"):
+                            hwobj_instance.init()
                         class_name = str(hwobj_instance.__module__)
                     except Exception:
                         logging.getLogger("HWR").exception(
@@ -500,7 +721,7 @@ class __HardwareRepositoryClient:
             (
                 hwobj_name,
                 class_name,
-                "%d ms" % (time_delta.microseconds / 1000),
+                "%d ms" % (time_delta.total_seconds() * 1000),
                 comment,
             )
         )
@@ -531,18 +752,21 @@ class __HardwareRepositoryClient:
 
         dispatcher.send("hardwareObjectDiscarded", ho_name, self)
 
-    def parse_xml(self, xml_string, ho_name):
+    def parse_xml(self, xml_string, ho_name, file_path=None):
         """Load a Hardware Object from its XML string representation
 
         Parameters :
           xml_string -- the XML string
           ho_name -- the name of the Hardware Object to load (i.e. '/motors/m0')
+          file_path -- the XML file path, to use the configuration cache
 
         Return :
           the Hardware Object, or None if it fails
         """
         try:
-            hardware_obj = HardwareObjectFileParser.parse_string(xml_string, ho_name)
+            hardware_obj = HardwareObjectFileParser.parse_string(
+                xml_string, ho_name, file_path
+            )
         except Exception:
             logging.getLogger("HWR").exception(
                 "Cannot parse Hardware Repository file %s", ho_name
@@ -663,8 +887,22 @@ class __HardwareRepositoryClient:
 
                 if object_name in self.hardware_objects:
                     hardware_obj = self.hardware_objects[object_name]
+                elif object_name in self._loading:
+                    # being loaded, wait unless this is a recursive load
+                    loading_greenlet, loaded = self._loading[object_name]
+                    if loading_greenlet is gevent.getcurrent():
+                        hardware_obj = self._load_hardware_object(object_name)
+                    else:
+                        hardware_obj = loaded.get()
                 else:
-                    hardware_obj = self._load_hardware_object(object_name)
+                    hardware_obj = None
+                    loaded = gevent.event.AsyncResult()
+                    self._loading[object_name] = (gevent.getcurrent(), loaded)
+                    try:
+                        hardware_obj = self._load_hardware_object(object_name)
+                    finally:
+                        del self._loading[object_name]
+                        loaded.set(hardware_obj)
                 return hardware_obj
         except TypeError as err:
             logging.getLogger("HWR").exception(
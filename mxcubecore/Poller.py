@@ -1,4 +1,9 @@
+import collections
+import hashlib
+import heapq
+import itertools
 import logging
+import time
 
 from dispatcher import saferef
 import gevent
@@ -14,11 +19,19 @@ try:
 except ImportError:
     import queue
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
 
 log = logging.getLogger("HWR")
 
 POLLERS = {}
 
+# maximum number of native threads executing polled calls
+MAX_WORKERS = 16
+
 gevent_version = list(map(int, gevent.__version__.split(".")))
 
 
@@ -39,6 +52,111 @@ def get_poller(poller_id):
     return POLLERS.get(poller_id)
 
 
+def values_equal(old_value, new_value):
+    """Default comparison of two polled values.
+
+    Arrays are compared with numpy.array_equal, after a cheap check
+    of their shape and dtype.
+    """
+    old_is_array = isinstance(old_value, numpy.ndarray)
+    new_is_array = isinstance(new_value, numpy.ndarray)
+
+    if old_is_array or new_is_array:
+        if not (old_is_array and new_is_array):
+            return False
+        if old_value.shape != new_value.shape or old_value.dtype != new_value.dtype:
+            return False
+        return numpy.array_equal(old_value, new_value)
+
+    try:
+        return bool(new_value == old_value)
+    except ValueError:
+        # e.g. sequences of arrays
+        return False
+
+
+class ToleranceComparator:
+    """Compare float values or arrays within an absolute/relative tolerance"""
+
+    def __init__(self, atol=0.0, rtol=0.0):
+        self.atol = atol
+        self.rtol = rtol
+
+    def __call__(self, old_value, new_value):
+        try:
+            old_array = numpy.asarray(old_value, dtype=float)
+            new_array = numpy.asarray(new_value, dtype=float)
+        except (TypeError, ValueError):
+            return values_equal(old_value, new_value)
+
+        if old_array.shape != new_array.shape:
+            return False
+        return numpy.allclose(
+            old_array, new_array, rtol=self.rtol, atol=self.atol, equal_nan=True
+        )
+
+
+class DigestComparator:
+    """Compare arrays through a digest of their buffer.
+
+    Only the digest of the last value is kept, the arrays themselves are
+    never compared element-wise. Uses xxhash if available, blake2b otherwise.
+    Non array values are compared with values_equal.
+    """
+
+    def __init__(self):
+        self._last_digest = None
+
+    @staticmethod
+    def digest(value):
+        buf = numpy.ascontiguousarray(value).data
+        if xxhash is not None:
+            digest = xxhash.xxh3_64_digest(buf)
+        else:
+            digest = hashlib.blake2b(buf, digest_size=16).digest()
+        return value.shape, value.dtype.str, digest
+
+    def __call__(self, old_value, new_value):
+        if not isinstance(new_value, numpy.ndarray):
+            self._last_digest = None
+            return values_equal(old_value, new_value)
+
+        new_digest = self.digest(new_value)
+        is_equal = (
+            isinstance(old_value, numpy.ndarray) and new_digest == self._last_digest
+        )
+        self._last_digest = new_digest
+        return is_equal
+
+
+COMPARATORS = {
+    "equal": lambda: values_equal,
+    "digest": DigestComparator,
+}
+
+
+def get_comparator(compare):
+    """Return the comparison function for the 'compare' argument of poll.
+
+    Args:
+        compare: True for the default comparison, False for no comparison,
+                 a name from COMPARATORS or a callable(old_value, new_value)
+                 returning True if the values are equal.
+    Returns:
+        (callable): comparison function, or None if values are not compared.
+    """
+    if compare is True:
+        return values_equal
+    if not compare:
+        return None
+    if callable(compare):
+        return compare
+    try:
+        return COMPARATORS[compare]()
+    except KeyError:
+        raise ValueError("Unknown poller comparison %r" % compare)
+
+
 def poll(
     polled_call,
     polled_call_args=(),
@@ -72,6 +190,231 @@ def poll(
     return poller
 
 
+class _WorkerPool:
+    """Bounded pool of native threads executing the polled calls.
+
+    Threads are created on demand, up to max_workers; jobs submitted while
+    all threads are busy wait in a backlog.
+    """
+
+    class _Worker:
+        __slots__ = ("job", "wakeup")
+
+        def __init__(self):
+            self.job = None
+            self.wakeup = _threading.Lock()
+            self.wakeup.acquire()
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.workers_count = 0
+        self._mutex = _threading.Lock()
+        self._idle = []
+        self._backlog = collections.deque()
+
+    def backlog_size(self):
+        return len(self._backlog)
+
+    def submit(self, func, *args):
+        with self._mutex:
+            if self._idle:
+                worker = self._idle.pop()
+                worker.job = (func, args)
+                worker.wakeup.release()
+                return
+            if self.workers_count >= self.max_workers:
+                self._backlog.append((func, args))
+                return
+            self.workers_count += 1
+        _threading.start_new_thread(self._work, ((func, args),))
+
+    def _work(self, job):
+        worker = _WorkerPool._Worker()
+
+        while True:
+            func, args = job
+            try:
+                func(*args)
+            except Exception:
+                log.exception("Poller: unexpected error in polling thread")
+
+            with self._mutex:
+                if self._backlog:
+                    job = self._backlog.popleft()
+                    continue
+                worker.job = None
+                self._idle.append(worker)
+
+            worker.wakeup.acquire()
+            job = worker.job
+
+
+class _PollingGroup:
+    """Pollers sharing the same polling period, polled on the same tick"""
+
+    def __init__(self, period, due):
+        self.period = period
+        self.due = due
+        self.pollers = {}
+
+
+class _PollingScheduler:
+    """Single scheduling thread for all pollers.
+
+    Pollers with identical periods are coalesced into one group, and the
+    groups are kept in a heap keyed on their next due time. When a group is
+    due, each of its pollers is handed over to the worker pool, unless the
+    previous call of the same poller is still running.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._mutex = _threading.Lock()
+        self._wakeup = _threading.Lock()
+        self._wakeup.acquire()
+        self._heap = []
+        self._groups = {}
+        self._counter = itertools.count()
+        self._pool = _WorkerPool(max_workers)
+        self._started = False
+
+        self.polls_count = 0
+        self.overruns_count = 0
+        self.total_jitter = 0
+        self.max_jitter = 0
+
+    def add(self, poller, delay=0):
+        """Schedule the first call of poller after delay (ms)"""
+        due = time.monotonic() + delay / 1000.0
+
+        with self._mutex:
+            heapq.heappush(self._heap, (due, next(self._counter), poller))
+            start = not self._started
+            self._started = True
+
+        if start:
+            _threading.start_new_thread(self._run, ())
+        self._wake()
+
+    def remove(self, poller):
+        with self._mutex:
+            self._remove(poller)
+
+    def set_period(self, poller, period):
+        with self._mutex:
+            if poller.polling_group is not None:
+                self._remove(poller)
+                self._join_group(poller, period, time.monotonic())
+            poller.polling_period = period
+        self._wake()
+
+    def get_statistics(self):
+        """Return a dict with the scheduler counters, jitter in ms"""
+        with self._mutex:
+            return {
+                "pollers": sum(len(grp.pollers) for grp in self._groups.values()),
+                "groups": len(self._groups),
+                "workers": self._pool.workers_count,
+                "backlog": self._pool.backlog_size(),
+                "polls": self.polls_count,
+                "overruns": self.overruns_count,
+                "max_jitter": self.max_jitter * 1000.0,
+                "mean_jitter": (
+                    self.total_jitter * 1000.0 / self.polls_count
+                    if self.polls_count
+                    else 0
+                ),
+            }
+
+    def _wake(self):
+        try:
+            self._wakeup.release()
+        except RuntimeError:
+            # already released, scheduler will wake up anyway
+            pass
+
+    def _remove(self, poller):
+        group = poller.polling_group
+        if group is not None:
+            group.pollers.pop(poller.get_id(), None)
+            poller.polling_group = None
+
+    def _join_group(self, poller, period, now):
+        group = self._groups.get(period)
+        if group is None:
+            group = _PollingGroup(period, now + period / 1000.0)
+            self._groups[period] = group
+            heapq.heappush(self._heap, (group.due, next(self._counter), group))
+        group.pollers[poller.get_id()] = poller
+        poller.polling_group = group
+
+    def _run(self):
+        while True:
+            with self._mutex:
+                now = time.monotonic()
+                due_calls = []
+
+                while self._heap and self._heap[0][0] <= now:
+                    due, _, item = heapq.heappop(self._heap)
+
+                    if isinstance(item, _PollingGroup):
+                        if self._groups.get(item.period) is not item:
+                            continue
+                        if not item.pollers:
+                            del self._groups[item.period]
+                            continue
+                        due_calls.extend((p, due) for p in item.pollers.values())
+                        # keep the ticks aligned, unless we are late by a period
+                        item.due = max(due + item.period / 1000.0, now)
+                        heapq.heappush(
+                            self._heap, (item.due, next(self._counter), item)
+                        )
+                    elif not item.is_stopped():
+                        # first call of a newly started poller
+                        self._join_group(item, item.polling_period, now)
+                        due_calls.append((item, due))
+
+                for poller, due in due_calls:
+                    if poller.busy:
+                        self.overruns_count += 1
+                    else:
+                        poller.busy = True
+                        self._pool.submit(self._execute, poller, due)
+
+                timeout = self._heap[0][0] - now if self._heap else -1
+
+            self._wakeup.acquire(True, timeout)
+
+    def _execute(self, poller, due):
+        jitter = time.monotonic() - due
+
+        try:
+            keep_polling = poller.poll_once()
+        finally:
+            poller.busy = False
+
+        with self._mutex:
+            self.polls_count += 1
+            self.total_jitter += jitter
+            self.max_jitter = max(self.max_jitter, jitter)
+            if not keep_polling:
+                self._remove(poller)
+
+
+_SCHEDULER = None
+
+
+def get_scheduler():
+    global _SCHEDULER
+
+    if _SCHEDULER is None:
+        _SCHEDULER = _PollingScheduler()
+    return _SCHEDULER
+
+
+def get_statistics():
+    return get_scheduler().get_statistics()
+
+
 class _Poller:
     def __init__(
         self,
@@ -89,10 +432,13 @@ class _Poller:
         self.value_changed_callback_ref = saferef.safe_ref(value_changed_callback)
         self.error_callback_ref = saferef.safe_ref(error_callback)
         self.compare = compare
+        self.comparator = get_comparator(compare)
         self.old_res = NotInitializedValue
         self.queue = queue.Queue()
         self.delay = 0
         self.stop_event = Event()
+        self.polling_group = None
+        self.busy = False
 
         #if gevent_version < [1,3,0]:
             #self.async_watcher = gevent.get_hub().loop.async()
@@ -101,10 +447,12 @@ class _Poller:
 
     def start_delayed(self, delay):
         self.delay = delay
-        _threading.start_new_thread(self.run, ())
+        self.async_watcher.start(self.new_event)
+        get_scheduler().add(self, delay)
 
     def stop(self):
         self.stop_event.set()
+        get_scheduler().remove(self)
         del POLLERS[self.get_id()]
 
     def is_stopped(self):
@@ -117,7 +465,8 @@ class _Poller:
         return self.polling_period
 
     def set_polling_period(self, polling_period):
-        self.polling_period = polling_period
+        if polling_period != self.polling_period:
+            get_scheduler().set_period(self, polling_period)
 
     def restart(self, delay=0):
         self.stop()
@@ -153,65 +502,37 @@ class _Poller:
                 if cb is not None:
                     gevent.spawn(cb, res)
 
-    def run(self):
-        sleep = gevent.monkey._get_original("time", ["sleep"])[0]
-
-        self.async_watcher.start(self.new_event)
+    def poll_once(self):
+        """Execute the polled call once, from a worker thread.
 
-        err_callback_args = None
-        error_cb = None
-        first_run = True
+        Returns:
+            (bool): False if polling has to stop.
+        """
+        if self.stop_event.is_set():
+            return False
 
-        while not self.stop_event.is_set():
-            if first_run and self.delay:
-                sleep(self.delay / 1000.0)
-            first_run = False
-
-            if self.stop_event.is_set():
-                break
-
-            polled_call = self.polled_call_ref()
-            if polled_call is None:
-                break
-
-            try:
-                res = polled_call(*self.args)
-            except Exception as e:
-                if self.stop_event.is_set():
-                    break
-                error_cb = self.error_callback_ref()
-                if error_cb is not None:
-                    self.queue.put(PollingException(e, self.get_id()))
-                break
-
-            del polled_call
+        polled_call = self.polled_call_ref()
+        if polled_call is None:
+            return False
 
+        try:
+            res = polled_call(*self.args)
+        except Exception as e:
             if self.stop_event.is_set():
-                break
-
-            if isinstance(res, numpy.ndarray):  # for arrays
-                comparison = res == self.old_res
-                if isinstance(comparison, bool):
-                    is_equal = comparison
-                else:
-                    is_equal = all(comparison)
-            else:
-                is_equal = res == self.old_res
+                return False
+            if self.error_callback_ref() is not None:
+                self.queue.put(PollingException(e, self.get_id()))
+                self.async_watcher.send()
+            return False
 
-            if self.compare and is_equal:
-                # do nothing: previous value is the same as "new" value
-                pass
-            else:
-                new_value = True
-                if self.compare:
-                    new_value = not is_equal
-
-                if new_value:
-                    self.old_res = res
-                    self.queue.put(res)
-                    self.async_watcher.send()
+        del polled_call
 
-            sleep(self.polling_period / 1000.0)
+        if self.stop_event.is_set():
+            return False
 
-        if error_cb is not None:
+        if self.comparator is None or not self.comparator(self.old_res, res):
+            self.old_res = res
+            self.queue.put(res)
             self.async_watcher.send()
+
+        return True
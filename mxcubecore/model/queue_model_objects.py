@@ -264,6 +264,8 @@ class RootNode(TaskNode):
         TaskNode.__init__(self)
         self._name = "root"
         self._total_node_count = 0
+        # Nodes added to the model, by node id
+        self._node_index = {}
 
 
 class TaskGroup(TaskNode):
@@ -708,6 +708,34 @@ class SampleQueueEntry(BaseQueueEntry):
                 log.info(msg)
             self.get_view().setText(1, "")
 
+    def prefetch(self):
+        """
+        Picks the sample with the sample changer, while the previous sample
+        is still mounted, so that mounting it is a chained unload/load.
+
+        :returns: True if the sample was picked, False if it is not to be
+                  mounted with a sample changer supporting it
+        :rtype: bool
+        """
+        mount_device = HWR.beamline.sample_changer
+        location = tuple(self._data_model.location)
+
+        if (
+            self._data_model.free_pin_mode
+            or len(self.get_data_model().get_children()) == 0
+            or len(location) != 2
+            or mount_device is None
+            or HWR.beamline.diffractometer.in_plate_mode()
+            or not mount_device.is_prefetch_supported()
+            or not mount_device.has_loaded_sample()
+            or mount_device.is_mounted_sample(location)
+        ):
+            return False
+
+        logging.getLogger("queue_exec").info("Prefetching sample " + str(location))
+        mount_device.prefetch("%d:%02d" % location, wait=True)
+        return True
+
     def centring_done(self, success, centring_info):
         if not success:
             msg = (
@@ -0,0 +1,171 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""On-disk cache of parsed configuration files
+
+The parsed form of each configuration file (SAX events for xml files,
+loaded data for yaml files) is pickled in the cache directory, in one
+entry per file path. An entry is valid as long as the file modification
+time and content digest are unchanged.
+
+The cache is disabled unless a directory is set, with set_cache_directory
+or the MXCUBECORE_CONFIG_CACHE environment variable.
+
+To fill the cache before starting the application:
+
+    python -m mxcubecore.utils.config_cache CACHE_DIR CONFIGURATION_PATH
+"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+__credits__ = ["MXCuBE collaboration"]
+
+# Increase when the format of the cached data changes
+CACHE_VERSION = 1
+
+_cache_directory = os.environ.get("MXCUBECORE_CONFIG_CACHE") or None
+
+
+def set_cache_directory(cache_directory):
+    """Set the cache directory, None to disable the cache
+
+    Args:
+        cache_directory (str): Cache directory, created if needed
+    """
+    global _cache_directory
+    _cache_directory = cache_directory
+
+
+def get_cache_directory():
+    """Get the cache directory
+
+    Returns:
+        str: Cache directory, None if the cache is disabled
+    """
+    return _cache_directory
+
+
+def _entry_path(file_path):
+    key = hashlib.blake2b(
+        os.path.abspath(file_path).encode(), digest_size=16
+    ).hexdigest()
+    return os.path.join(_cache_directory, key + ".pickle")
+
+
+def load(file_path, content, parse):
+    """Get the parsed content of a configuration file
+
+    Args:
+        file_path (str): Configuration file path
+        content (str): Configuration file content
+        parse (callable): Function parsing content, result must be picklable
+
+    Returns:
+        The result of parse(content), from the cache if it is valid
+    """
+    if _cache_directory is None:
+        return parse(content)
+
+    try:
+        mtime = os.stat(file_path).st_mtime_ns
+    except OSError:
+        return parse(content)
+    digest = hashlib.blake2b(content.encode(), digest_size=16).digest()
+    key = (CACHE_VERSION, os.path.abspath(file_path), mtime, digest)
+
+    entry_path = _entry_path(file_path)
+    try:
+        with open(entry_path, "rb") as fp0:
+            entry_key, data = pickle.load(fp0)
+        if entry_key == key:
+            return data
+    except Exception:
+        # missing or unreadable entry
+        pass
+
+    data = parse(content)
+
+    try:
+        os.makedirs(_cache_directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=_cache_directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fp0:
+            pickle.dump((key, data), fp0, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+    except Exception:
+        logging.getLogger("HWR").debug(
+            "Cannot write configuration cache entry for %s", file_path, exc_info=True
+        )
+    return data
+
+
+def warm(configuration_path):
+    """Parse all the configuration files into the cache
+
+    Args:
+        configuration_path (str): PATHSEP-separated string of directories
+
+    Returns:
+        int: Number of files parsed
+    """
+    # Imported here as these modules use the cache
+    from mxcubecore import HardwareObjectFileParser
+    from mxcubecore.HardwareRepository import yaml
+
+    parsers = {
+        ".xml": HardwareObjectFileParser.record_sax_events,
+        ".yml": yaml.load,
+    }
+    count = 0
+    for directory in configuration_path.split(os.path.pathsep):
+        for root, _, file_names in os.walk(os.path.expanduser(directory)):
+            for file_name in file_names:
+                parse = parsers.get(os.path.splitext(file_name)[1])
+                if parse is None:
+                    continue
+                file_path = os.path.join(root, file_name)
+                try:
+                    with open(file_path, "r") as fp0:
+                        load(file_path, fp0.read(), parse)
+                except Exception as ex:
+                    print("Cannot parse %s: %s" % (file_path, ex))
+                else:
+                    count += 1
+    return count
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Fill the configuration files cache")
+    parser.add_argument("cache_directory", help="Cache directory")
+    parser.add_argument(
+        "configuration_path",
+        help="Configuration directories, separated by '%s'" % os.path.pathsep,
+    )
+    args = parser.parse_args()
+    set_cache_directory(args.cache_directory)
+    print("%d configuration files cached" % warm(args.configuration_path))
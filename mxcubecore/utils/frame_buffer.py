@@ -0,0 +1,189 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Ring buffer of the last frames of a video device
+
+The raw frames are kept without copy and given to the consumers as read-only
+arrays. The encodings of a frame (RGB, JPEG, ...) are computed on the first
+request and then shared by all the consumers of the frame.
+"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import collections
+import time
+
+import gevent.event
+import numpy as np
+
+__credits__ = ["MXCuBE collaboration"]
+
+
+class Frame:
+    """Raw frame, with its sequence number and its encodings"""
+
+    def __init__(self, data, width, height, sequence, timestamp):
+        """
+        Args:
+            data (numpy.ndarray): Raw frame, not to be modified afterwards
+            width (int): Width of the frame [pixels]
+            height (int): Height of the frame [pixels]
+            sequence (int): Sequence number of the frame
+            timestamp (float): Time of the frame, as returned by time.time()
+        """
+        self.data = np.asarray(data).view()
+        self.data.flags.writeable = False
+        self.width = width
+        self.height = height
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self._encodings = {}
+
+    def get_encoding(self, name, encoder):
+        """Get an encoding of the frame, computed once
+
+        Args:
+            name (str): Name of the encoding, e.g. "jpeg"
+            encoder (callable): Called with the frame to compute the
+                encoding if not done yet, may return None if the encoding
+                is not available (not kept then)
+
+        Returns:
+            The encoded frame, None if not available
+        """
+        encoding = self._encodings.get(name)
+        if isinstance(encoding, gevent.event.AsyncResult):
+            # Being computed by another greenlet
+            return encoding.get()
+        if encoding is not None:
+            return encoding
+
+        pending = self._encodings[name] = gevent.event.AsyncResult()
+        try:
+            encoding = encoder(self)
+        except BaseException as ex:
+            del self._encodings[name]
+            pending.set_exception(ex)
+            raise
+
+        if encoding is None:
+            del self._encodings[name]
+        else:
+            self._encodings[name] = encoding
+        pending.set(encoding)
+        return encoding
+
+    def has_encoding(self, name):
+        """
+        Args:
+            name (str): Name of the encoding
+
+        Returns:
+            bool: True if the encoding is already computed
+        """
+        return name in self._encodings and not isinstance(
+            self._encodings[name], gevent.event.AsyncResult
+        )
+
+
+class FrameBuffer:
+    """Last frames of a video device, by increasing sequence number"""
+
+    def __init__(self, size=4):
+        """
+        Args:
+            size (int): Number of frames kept
+        """
+        self.sequence = 0
+        self._frames = collections.deque(maxlen=size)
+        self._new_frame_event = gevent.event.Event()
+
+    @property
+    def size(self):
+        """Number of frames kept"""
+        return self._frames.maxlen
+
+    def put(self, data, width, height, timestamp=None):
+        """Add a frame, dropping the oldest one if the buffer is full
+
+        Args:
+            data (numpy.ndarray): Raw frame, owned by the buffer afterwards
+            width (int): Width of the frame [pixels]
+            height (int): Height of the frame [pixels]
+            timestamp (float): Time of the frame, now if None
+
+        Returns:
+            Frame: The added frame
+        """
+        self.sequence += 1
+        frame = Frame(
+            data,
+            width,
+            height,
+            self.sequence,
+            time.time() if timestamp is None else timestamp,
+        )
+        self._frames.append(frame)
+
+        event, self._new_frame_event = self._new_frame_event, gevent.event.Event()
+        event.set()
+        return frame
+
+    def get_last(self):
+        """
+        Returns:
+            Frame: The last frame, None if the buffer is empty
+        """
+        return self._frames[-1] if self._frames else None
+
+    def get(self, sequence):
+        """
+        Args:
+            sequence (int): Sequence number of the frame
+
+        Returns:
+            Frame: The frame, None if not in the buffer (anymore)
+        """
+        if self._frames:
+            index = sequence - self._frames[0].sequence
+            if 0 <= index < len(self._frames):
+                return self._frames[index]
+        return None
+
+    def wait_frame(self, sequence=0, timeout=None):
+        """Wait for a frame newer than the frame with the sequence number
+
+        Args:
+            sequence (int): Sequence number of the last frame processed
+            timeout (float): Timeout in s, None to wait forever
+
+        Returns:
+            Frame: The last frame, None on timeout
+        """
+        if self.sequence <= sequence:
+            self._new_frame_event.wait(timeout)
+            if self.sequence <= sequence:
+                return None
+        return self.get_last()
+
+    def clear(self):
+        """Remove all the frames, the sequence numbers go on"""
+        self._frames.clear()
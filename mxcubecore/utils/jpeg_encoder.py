@@ -0,0 +1,218 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""JPEG encoding of video frames in a pool of threads
+
+The encoding runs outside of the gevent loop, only the calling greenlet
+waits for it. When all the threads are busy, the frames of a video stream
+are dropped rather than queued. The quality, then the scale, of the images
+are adapted to reach a target frame rate or bandwidth.
+"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import collections
+import time
+from io import BytesIO
+
+import gevent.threadpool
+from PIL import Image
+
+__credits__ = ["MXCuBE collaboration"]
+
+
+class JpegEncoder:
+    """Encode RGB images to JPEG in a bounded pool of threads"""
+
+    quality_step = 5
+    scale_step = 0.8
+
+    def __init__(
+        self,
+        threads=2,
+        quality=75,
+        target_fps=None,
+        target_bandwidth=None,
+        min_quality=30,
+        min_scale=0.25,
+    ):
+        """
+        Args:
+            threads (int): Number of encoding threads
+            quality (int): JPEG quality (1 - 95), also the maximum quality
+                when adapted
+            target_fps (float): Frame rate to reach, None for any
+            target_bandwidth (float): Bandwidth to stay below [bytes/s],
+                None for any
+            min_quality (int): Minimum adapted quality
+            min_scale (float): Minimum adapted scale
+        """
+        self.threads = threads
+        self.max_quality = quality
+        self.quality = quality
+        self.scale = 1.0
+        self.target_fps = target_fps
+        self.target_bandwidth = target_bandwidth
+        self.min_quality = min(min_quality, quality)
+        self.min_scale = min_scale
+
+        self.encoded_frames = 0
+        self.dropped_frames = 0
+        # Mean encoding time [s] and size [bytes] of the last frames
+        self.latency = 0.0
+        self.frame_size = 0.0
+        self._end_times = collections.deque(maxlen=50)
+        self._busy = 0
+        self._pool = gevent.threadpool.ThreadPool(threads)
+
+    def encode(self, rgb_image, width, height, block=True, adapted=True):
+        """Encode an image to JPEG
+
+        Args:
+            rgb_image (bytes): RGB image, 3 bytes per pixel
+            width (int): Width of the image [pixels]
+            height (int): Height of the image [pixels]
+            block (bool): Wait for a thread if all are busy, otherwise
+                drop the image
+            adapted (bool): Encode with the adapted quality and scale,
+                otherwise with the maximum quality at full size
+
+        Returns:
+            bytes: JPEG image, None if dropped
+        """
+        result = self.encode_with_size(rgb_image, width, height, block, adapted)
+        return None if result is None else result[0]
+
+    def encode_with_size(self, rgb_image, width, height, block=True, adapted=True):
+        """Encode an image to JPEG, as encode
+
+        Returns:
+            tuple: JPEG image (bytes), its width and its height [pixels],
+                None if dropped
+        """
+        if self._busy >= self.threads and not block:
+            self.dropped_frames += 1
+            return None
+
+        if adapted:
+            quality, scale = self.quality, self.scale
+        else:
+            quality, scale = self.max_quality, 1.0
+
+        self._busy += 1
+        try:
+            jpeg_image, size, latency = self._pool.spawn(
+                self._encode, rgb_image, width, height, quality, scale
+            ).get()
+        finally:
+            self._busy -= 1
+
+        self._update_statistics(len(jpeg_image), latency)
+        return (jpeg_image,) + size
+
+    def is_adapted(self):
+        """
+        Returns:
+            bool: True if the quality or the scale are reduced
+        """
+        return self.quality < self.max_quality or self.scale < 1
+
+    def get_fps(self):
+        """
+        Returns:
+            float: Effective frame rate of the last encoded frames
+        """
+        if len(self._end_times) < 2:
+            return 0.0
+        duration = self._end_times[-1] - self._end_times[0]
+        if duration <= 0:
+            return 0.0
+        return (len(self._end_times) - 1) / duration
+
+    def get_statistics(self):
+        """
+        Returns:
+            dict: Encoding latency [s], frame size [bytes], effective fps,
+                encoded and dropped frames, current quality and scale
+        """
+        return {
+            "latency": self.latency,
+            "frame_size": self.frame_size,
+            "fps": self.get_fps(),
+            "encoded_frames": self.encoded_frames,
+            "dropped_frames": self.dropped_frames,
+            "quality": self.quality,
+            "scale": self.scale,
+        }
+
+    def _update_statistics(self, frame_size, latency):
+        self.encoded_frames += 1
+        self._end_times.append(time.perf_counter())
+
+        # Exponential moving averages over about ten frames
+        if self.encoded_frames == 1:
+            self.latency = latency
+            self.frame_size = frame_size
+        else:
+            self.latency += 0.1 * (latency - self.latency)
+            self.frame_size += 0.1 * (frame_size - self.frame_size)
+
+        if self.encoded_frames % 10 == 0:
+            self._adapt()
+
+    def _adapt(self):
+        if not (self.target_fps or self.target_bandwidth):
+            return
+
+        degrade = False
+        improve = True
+        if self.target_bandwidth:
+            bandwidth = self.frame_size * self.get_fps()
+            degrade = bandwidth > self.target_bandwidth
+            improve = bandwidth < 0.7 * self.target_bandwidth
+
+        if self.target_fps:
+            # Time available to encode a frame with all the threads
+            budget = self.threads / self.target_fps
+            degrade = degrade or self.latency > budget
+            improve = improve and self.latency < 0.5 * budget
+
+        if degrade:
+            if self.quality > self.min_quality:
+                self.quality = max(self.min_quality, self.quality - self.quality_step)
+            else:
+                self.scale = max(self.min_scale, self.scale * self.scale_step)
+        elif improve:
+            if self.scale < 1:
+                self.scale = min(1.0, self.scale / self.scale_step)
+            else:
+                self.quality = min(self.max_quality, self.quality + self.quality_step)
+
+    @staticmethod
+    def _encode(rgb_image, width, height, quality, scale):
+        start_time = time.perf_counter()
+        image = Image.frombytes("RGB", (width, height), rgb_image)
+        if scale < 1:
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            image = image.resize(size, Image.BILINEAR)
+        buffer = BytesIO()
+        image.save(buffer, "JPEG", quality=quality)
+        return buffer.getvalue(), image.size, time.perf_counter() - start_time
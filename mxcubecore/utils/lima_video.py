@@ -0,0 +1,318 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Decoding of the video images of Lima Tango devices (video_last_image)
+
+The header and the pixels of an image are mapped to numpy arrays without
+copy. The pixels are converted to 8 bit RGB, scaled, rotated and flipped
+with vectorized operations, in a single copy for most of the modes.
+"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import collections
+
+import numpy as np
+
+__credits__ = ["MXCuBE collaboration"]
+
+# Lima video modes, in the order of their value in the image header
+VIDEO_MODES = (
+    "Y8",
+    "Y16",
+    "Y32",
+    "Y64",
+    "RGB555",
+    "RGB565",
+    "RGB24",
+    "RGB32",
+    "BGR24",
+    "BGR32",
+    "BAYER_RG8",
+    "BAYER_RG16",
+    "BAYER_BG8",
+    "BAYER_BG16",
+    "I420",
+    "YUV411",
+    "YUV422",
+    "YUV444",
+)
+
+VideoHeader = collections.namedtuple(
+    "VideoHeader",
+    ["video_mode", "frame_number", "width", "height", "endianness", "header_size"],
+)
+
+
+def _header_dtype(byteorder):
+    return np.dtype(
+        [
+            ("magic", byteorder + "u4"),
+            ("header_version", byteorder + "u2"),
+            ("image_mode", byteorder + "u2"),
+            ("frame_number", byteorder + "i8"),
+            ("width", byteorder + "i4"),
+            ("height", byteorder + "i4"),
+            ("endianness", byteorder + "u2"),
+            ("header_size", byteorder + "u2"),
+            ("padding", byteorder + "u2", 2),
+        ]
+    )
+
+
+class LimaVideoDecoder:
+    """Convert Lima video images to 8 bit RGB arrays"""
+
+    def __init__(
+        self, scale=1.0, rotation=0, mirror=(False, False), bit_depth=12, endian=">"
+    ):
+        """
+        Args:
+            scale (float): Scale of the decoded images
+            rotation (int): Counterclockwise rotation of the decoded
+                images, multiple of 90 [degrees]
+            mirror (tuple): Horizontal and vertical flip of the decoded
+                images, after the rotation
+            bit_depth (int): Significant bits of the pixels of the 16 bit
+                modes, the values above are saturated
+            endian (str): Byte order of the image header, ">" or "<"
+        """
+        if rotation % 90:
+            raise ValueError("Rotation %s not a multiple of 90 degrees" % rotation)
+        self.scale = scale
+        self.rotation = rotation % 360
+        self.mirror = tuple(mirror)
+        self.bit_depth = bit_depth
+        self.header_dtype = _header_dtype(endian)
+
+        self._decoders = {}
+        self._lookup_tables = {}
+        self._indices = {}
+
+    def __getstate__(self):
+        # The decoders are created again in other processes
+        state = self.__dict__.copy()
+        state["_decoders"] = {}
+        return state
+
+    def decode_header(self, data):
+        """
+        Args:
+            data (bytes): Image, as read from video_last_image
+
+        Returns:
+            VideoHeader: Header of the image
+        """
+        header = np.frombuffer(data, self.header_dtype, count=1)[0]
+        image_mode = int(header["image_mode"])
+        if image_mode < len(VIDEO_MODES):
+            video_mode = VIDEO_MODES[image_mode]
+        else:
+            video_mode = str(image_mode)
+        return VideoHeader(
+            video_mode,
+            int(header["frame_number"]),
+            int(header["width"]),
+            int(header["height"]),
+            int(header["endianness"]),
+            max(int(header["header_size"]), self.header_dtype.itemsize),
+        )
+
+    def get_pixels(self, data, header=None):
+        """Map the pixels of an image, without copy
+
+        Args:
+            data (bytes): Image, as read from video_last_image
+            header (VideoHeader): Header of the image, decoded if None
+
+        Returns:
+            numpy.ndarray: Read-only pixels, of the size of the image (2D)
+                for the 8 and 16 bit modes, otherwise the raw bytes (1D)
+        """
+        if header is None:
+            header = self.decode_header(data)
+
+        byteorder = "<" if header.endianness == 0 else ">"
+        if header.video_mode in ("Y16", "BAYER_RG16", "BAYER_BG16"):
+            dtype = np.dtype(byteorder + "u2")
+        else:
+            dtype = np.dtype(np.uint8)
+
+        pixels = np.frombuffer(data, dtype, offset=header.header_size)
+        if header.video_mode in ("Y8", "Y16") or header.video_mode.startswith("BAYER"):
+            pixels = pixels[: header.width * header.height].reshape(
+                header.height, header.width
+            )
+        return pixels
+
+    def decode(self, data):
+        """Decode an image to RGB
+
+        Args:
+            data (bytes): Image, as read from video_last_image
+
+        Returns:
+            tuple: RGB image (numpy.ndarray of height x width x 3 uint8,
+                after scaling and rotation) and header of the image
+
+        Raises:
+            ValueError: Video mode not supported
+        """
+        header = self.decode_header(data)
+        image, pixel_size = self.get_decoder(header.video_mode)(
+            self.get_pixels(data, header), header.width, header.height
+        )
+
+        image = self._resample(image, header.width, header.height, pixel_size)
+        if self.rotation:
+            image = np.rot90(image, self.rotation // 90)
+        if self.mirror[0]:
+            image = image[:, ::-1]
+        if self.mirror[1]:
+            image = image[::-1]
+
+        return self._to_rgb(image), header
+
+    def get_output_size(self, width, height):
+        """
+        Args:
+            width (int): Width of the images of the device [pixels]
+            height (int): Height of the images of the device [pixels]
+
+        Returns:
+            tuple: Width and height of the decoded images [pixels]
+        """
+        width = max(1, int(round(width * self.scale)))
+        height = max(1, int(round(height * self.scale)))
+        if self.rotation in (90, 270):
+            return height, width
+        return width, height
+
+    def get_decoder(self, video_mode):
+        """Get the decoder of a video mode, created once per mode
+
+        Args:
+            video_mode (str): Lima video mode, e.g. "Y8"
+
+        Returns:
+            callable: Called with the pixels, the width and the height of
+                an image, returns the 8 bit image (gray or RGB) and the size
+                of its pixels in pixels of the image (2 for the Bayer modes,
+                decoded at half resolution)
+
+        Raises:
+            ValueError: Video mode not supported
+        """
+        decoder = self._decoders.get(video_mode)
+        if decoder is None:
+            decoder = self._decoders[video_mode] = self._create_decoder(video_mode)
+        return decoder
+
+    def _create_decoder(self, video_mode):
+        if video_mode == "Y8":
+            return lambda pixels, width, height: (pixels, 1)
+
+        if video_mode == "Y16":
+            lookup_table = self._get_lookup_table()
+            return lambda pixels, width, height: (np.take(lookup_table, pixels), 1)
+
+        if video_mode in ("RGB24", "BGR24", "RGB32", "BGR32"):
+            channels = 3 if video_mode.endswith("24") else 4
+            order = (
+                slice(None, 3) if video_mode.startswith("RGB") else slice(2, None, -1)
+            )
+
+            def decode_rgb(pixels, width, height):
+                pixels = pixels[: width * height * channels]
+                return pixels.reshape(height, width, channels)[:, :, order], 1
+
+            return decode_rgb
+
+        if video_mode.startswith("BAYER_"):
+            lookup_table = (
+                self._get_lookup_table() if video_mode.endswith("16") else None
+            )
+            # Offsets of the red and blue pixels in the 2x2 blocks
+            red, blue = (0, 1) if video_mode.startswith("BAYER_RG") else (1, 0)
+
+            def decode_bayer(pixels, width, height):
+                if lookup_table is not None:
+                    pixels = np.take(lookup_table, pixels)
+                pixels = pixels[: height // 2 * 2, : width // 2 * 2]
+                image = np.empty((height // 2, width // 2, 3), np.uint8)
+                image[:, :, 0] = pixels[red::2, red::2]
+                image[:, :, 1] = (
+                    pixels[0::2, 1::2].astype(np.uint16) + pixels[1::2, 0::2]
+                ) >> 1
+                image[:, :, 2] = pixels[blue::2, blue::2]
+                return image, 2
+
+            return decode_bayer
+
+        raise ValueError("Video mode %s not supported" % (video_mode,))
+
+    def _get_lookup_table(self):
+        # 16 bit values to 8 bit, saturated above the bit depth
+        lookup_table = self._lookup_tables.get(self.bit_depth)
+        if lookup_table is None:
+            values = np.arange(1 << 16) >> max(0, self.bit_depth - 8)
+            lookup_table = np.minimum(values, 255).astype(np.uint8)
+            self._lookup_tables[self.bit_depth] = lookup_table
+        return lookup_table
+
+    def _resample(self, image, width, height, pixel_size):
+        # Nearest neighbour resampling to the scaled size of the image, the
+        # indices of the source rows and columns are computed once per size
+        out_width = max(1, int(round(width * self.scale)))
+        out_height = max(1, int(round(height * self.scale)))
+        if image.shape[:2] == (out_height, out_width):
+            return image
+
+        key = (image.shape[0], image.shape[1], out_height, out_width, pixel_size)
+        indices = self._indices.get(key)
+        if indices is None:
+            indices = self._indices[key] = (
+                self._get_indices(out_height, height, pixel_size, image.shape[0]),
+                self._get_indices(out_width, width, pixel_size, image.shape[1]),
+            )
+        rows, columns = indices
+        # Faster than indexing both axes at once
+        return np.take(np.take(image, rows, axis=0), columns, axis=1)
+
+    @staticmethod
+    def _to_rgb(image):
+        if image.ndim == 3 and image.shape[2] == 3 and image.flags.c_contiguous:
+            return image
+
+        # Copied channel by channel, faster than a copy of the strided image.
+        # The gray images are expanded at the end, to process a third of the
+        # pixels before.
+        rgb_image = np.empty(image.shape[:2] + (3,), np.uint8)
+        for channel in range(3):
+            rgb_image[:, :, channel] = (
+                image if image.ndim == 2 else image[:, :, channel]
+            )
+        return rgb_image
+
+    @staticmethod
+    def _get_indices(out_size, size, pixel_size, image_size):
+        positions = np.arange(out_size) * (size / out_size)
+        return np.minimum(positions // pixel_size, image_size - 1).astype(np.intp)
@@ -0,0 +1,216 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Background writer of records to LIMS
+
+Records (e.g. image parameters stored per frame during a data collection)
+are queued by the acquisition and written in batches by a greenlet, so
+that a slow LIMS does not slow down the acquisition. Failed writes are
+retried on connection and web service errors. When the queue is full,
+put blocks for at most put_timeout, then the record is dropped.
+"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import logging
+import time
+from urllib.error import URLError
+
+import gevent
+import gevent.event
+import gevent.queue
+
+try:
+    from suds import WebFault
+except ImportError:
+    WebFault = None
+
+__credits__ = ["MXCuBE collaboration"]
+
+RETRY_EXCEPTIONS = (URLError,) if WebFault is None else (URLError, WebFault)
+
+
+class LimsWriter:
+    """Queue records and write them to LIMS in a background greenlet"""
+
+    def __init__(
+        self,
+        store,
+        max_queue_size=1000,
+        batch_size=50,
+        put_timeout=1.0,
+        retries=3,
+        retry_delay=0.5,
+    ):
+        """
+        Args:
+            store (callable): Called with a list of records to write. When
+                it raises, the records written must have been removed from
+                the list, the others are retried
+            max_queue_size (int): Number of records queued before put blocks
+            batch_size (int): Maximum number of records written at once
+            put_timeout (float): Maximum time put blocks when the queue is
+                full, in s, None to block until there is room
+            retries (int): Number of retries of a failed write
+            retry_delay (float): Delay before the first retry, in s, doubled
+                at each retry
+        """
+        self._store = store
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._queue = gevent.queue.Queue(max_queue_size)
+        self._pending = 0
+        self._idle = gevent.event.Event()
+        self._idle.set()
+        self._writer = None
+
+        self.max_queue_depth = 0
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retried = 0
+        self.write_time = 0.0
+        self.max_write_latency = 0.0
+
+    def put(self, record):
+        """Queue a record
+
+        Args:
+            record: Record passed to store
+
+        Returns:
+            bool: False if the record was dropped as the queue is full
+        """
+        if self._writer is None or self._writer.dead:
+            self._writer = gevent.spawn(self._run)
+
+        self._pending += 1
+        self._idle.clear()
+        try:
+            self._queue.put(record, timeout=self.put_timeout)
+        except gevent.queue.Full:
+            self.dropped += 1
+            self._done(1)
+            logging.getLogger("HWR").warning(
+                "LIMS write queue full, record dropped: %s", record
+            )
+            return False
+
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until all the queued records are written (or have failed)
+
+        Args:
+            timeout (float): Timeout in s, None to wait forever
+
+        Returns:
+            bool: True if all the records are written
+        """
+        return self._idle.wait(timeout)
+
+    def stop(self):
+        """Stop writing, the queued records are discarded"""
+        if self._writer is not None:
+            self._writer.kill()
+            self._writer = None
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._done(self._pending)
+
+    def get_statistics(self):
+        """Get the writer counters
+
+        Returns:
+            dict: Queue depth, written, failed and dropped record counts,
+            number of retries, and mean and max write latency per record in ms
+        """
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "pending": self._pending,
+            "written": self.written,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "retries": self.retried,
+            "mean_write_latency": (
+                1000 * self.write_time / self.written if self.written else 0.0
+            ),
+            "max_write_latency": 1000 * self.max_write_latency,
+        }
+
+    def _done(self, count):
+        self._pending -= count
+        if self._pending <= 0:
+            self._pending = 0
+            self._idle.set()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except gevent.queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        size = len(batch)
+        attempt = 0
+        try:
+            while batch:
+                count = len(batch)
+                start_time = time.perf_counter()
+                try:
+                    self._store(batch)
+                    # All the records are written when store returns
+                    del batch[:]
+                except RETRY_EXCEPTIONS:
+                    if attempt >= self.retries:
+                        raise
+                    attempt += 1
+                    self.retried += 1
+                    logging.getLogger("HWR").debug(
+                        "LIMS write failed, retry %d", attempt, exc_info=True
+                    )
+                finally:
+                    self._count_written(
+                        count - len(batch), time.perf_counter() - start_time
+                    )
+                if batch:
+                    gevent.sleep(self.retry_delay * 2 ** (attempt - 1))
+        except Exception:
+            self.failed += len(batch)
+            logging.getLogger("HWR").exception(
+                "Could not store %d record(s) in LIMS", len(batch)
+            )
+        finally:
+            self._done(size)
+
+    def _count_written(self, count, elapsed):
+        if count:
+            self.written += count
+            self.write_time += elapsed
+            self.max_write_latency = max(self.max_write_latency, elapsed / count)
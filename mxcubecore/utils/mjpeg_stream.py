@@ -0,0 +1,249 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Reader of MJPEG streams (multipart/x-mixed-replace), e.g. of mjpg-streamer
+
+A single HTTP connection is kept open and the JPEG frames are parsed from
+it as they arrive. Only the most recent frame is kept. The connection is
+re-established, with an increasing delay, when it fails.
+"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import logging
+import re
+from http.client import HTTPConnection
+
+import gevent
+import gevent.event
+
+__credits__ = ["MXCuBE collaboration"]
+
+_LENGTH_RE = re.compile(rb"^content-length:\s*(\d+)\s*$", re.IGNORECASE | re.MULTILINE)
+
+
+class MultipartParser:
+    """Incremental parser of the parts of a multipart stream"""
+
+    def __init__(self, boundary):
+        """
+        Args:
+            boundary (bytes): Boundary of the parts, as in the Content-Type
+                header, without the leading "--"
+        """
+        self.delimiter = b"--" + boundary
+        self._buffer = bytearray()
+        # Length of the body of the current part, -1 if unknown, None
+        # while looking for the part headers
+        self._length = None
+
+    def feed(self, data):
+        """Parse received data
+
+        Args:
+            data (bytes): Data received from the stream
+
+        Returns:
+            list: Bodies (bytes) of the parts completed by the data
+        """
+        self._buffer += data
+        parts = []
+        while True:
+            if self._length is None:
+                if not self._parse_headers():
+                    break
+            part = self._parse_body()
+            if part is None:
+                break
+            parts.append(part)
+        return parts
+
+    def _parse_headers(self):
+        start = self._buffer.find(self.delimiter)
+        if start < 0:
+            # Keep the end, that may be the start of a delimiter
+            del self._buffer[: max(0, len(self._buffer) - len(self.delimiter))]
+            return False
+
+        end = self._buffer.find(b"\r\n\r\n", start)
+        if end < 0:
+            del self._buffer[:start]
+            return False
+
+        match = _LENGTH_RE.search(bytes(self._buffer[start:end]))
+        self._length = int(match.group(1)) if match else -1
+        del self._buffer[: end + 4]
+        return True
+
+    def _parse_body(self):
+        if self._length >= 0:
+            if len(self._buffer) < self._length:
+                return None
+            part = bytes(self._buffer[: self._length])
+            del self._buffer[: self._length]
+        else:
+            end = self._buffer.find(self.delimiter)
+            if end < 0:
+                return None
+            part = bytes(self._buffer[:end]).rstrip(b"\r\n")
+            del self._buffer[:end]
+        self._length = None
+        return part
+
+
+class MjpegStreamReader:
+    """Keep the last frame of an MJPEG stream read in a greenlet"""
+
+    def __init__(
+        self,
+        host,
+        port,
+        path="/?action=stream",
+        timeout=3,
+        min_backoff=0.1,
+        max_backoff=5,
+    ):
+        """
+        Args:
+            host (str): Host name of the HTTP server
+            port (int): Port of the HTTP server
+            path (str): Path of the stream
+            timeout (float): Timeout of the connection and of the reads [s]
+            min_backoff (float): First delay before reconnecting [s]
+            max_backoff (float): Maximum delay before reconnecting [s]
+        """
+        self.host = host
+        self.port = port
+        self.path = path
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self.frame = None
+        self.frame_number = 0
+        self.connections = 0
+        self._frame_event = gevent.event.Event()
+        self._task = None
+        self._log = logging.getLogger("HWR")
+
+    def start(self):
+        """Start reading the stream, if not done yet"""
+        if self._task is None:
+            self._task = gevent.spawn(self._read_stream)
+
+    def stop(self):
+        """Stop reading the stream"""
+        if self._task is not None:
+            self._task.kill()
+            self._task = None
+
+    def is_running(self):
+        """
+        Returns:
+            bool: True if the stream is read
+        """
+        return self._task is not None
+
+    def set_address(self, host, port):
+        """Read the stream of another server, from the next frame on
+
+        Args:
+            host (str): Host name of the HTTP server
+            port (int): Port of the HTTP server
+        """
+        if (host, port) != (self.host, self.port):
+            self.host = host
+            self.port = port
+            if self._task is not None:
+                self.stop()
+                self.start()
+
+    def wait_frame(self, frame_number=0, timeout=None):
+        """Wait for a frame newer than the frame with the number
+
+        Args:
+            frame_number (int): Number of the last frame processed
+            timeout (float): Timeout in s, None to wait forever
+
+        Returns:
+            tuple: JPEG frame (bytes) and its number, None on timeout
+        """
+        if self.frame_number <= frame_number:
+            self._frame_event.wait(timeout)
+            if self.frame_number <= frame_number:
+                return None
+        return self.frame, self.frame_number
+
+    def _read_stream(self):
+        backoff = self.min_backoff
+        while True:
+            try:
+                for frame in self._read_frames():
+                    self.frame = frame
+                    self.frame_number += 1
+                    event, self._frame_event = self._frame_event, gevent.event.Event()
+                    event.set()
+                    backoff = self.min_backoff
+                self._log.warning(
+                    "MJPEG stream http://%s:%s%s closed",
+                    self.host,
+                    self.port,
+                    self.path,
+                )
+            except Exception as ex:
+                self._log.warning(
+                    "MJPEG stream http://%s:%s%s failed: %s",
+                    self.host,
+                    self.port,
+                    self.path,
+                    ex,
+                )
+            gevent.sleep(backoff)
+            backoff = min(self.max_backoff, backoff * 2)
+
+    def _read_frames(self):
+        connection = HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request("GET", self.path)
+            response = connection.getresponse()
+            if response.status != 200:
+                raise IOError("Error %s, %s" % (response.status, response.reason))
+
+            content_type = response.getheader("Content-Type", "")
+            match = re.search(r'boundary="?([^";]+)"?', content_type)
+            if match is None:
+                raise IOError("Not a multipart stream: %s" % content_type)
+            boundary = match.group(1).strip()
+            if boundary.startswith("--"):
+                boundary = boundary[2:]
+
+            self.connections += 1
+            parser = MultipartParser(boundary.encode())
+            while True:
+                data = response.read1(65536)
+                if not data:
+                    return
+                parts = parser.feed(data)
+                if parts:
+                    # Only the last complete frame is of interest
+                    yield parts[-1]
+        finally:
+            connection.close()
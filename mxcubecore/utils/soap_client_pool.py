@@ -0,0 +1,211 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Pooled suds SOAP clients
+
+ClientPool is used in place of a suds Client: each web service call checks
+out one of a bounded number of clones of the client, so that calls made
+from different greenlets run concurrently without sharing a client. The
+clones share the parsed WSDL, and a SessionTransport sending all the
+requests in a keep-alive HTTP session.
+
+get_wsdl_cache returns a persistent cache of the parsed WSDL and schemas,
+so that they are not downloaded and parsed again at each start.
+"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import contextlib
+import io
+import os
+from urllib.error import URLError
+
+import gevent.queue
+import requests
+from requests.adapters import HTTPAdapter
+from suds.cache import ObjectCache
+from suds.client import Client, ServiceSelector
+from suds.options import Options
+from suds.transport import Reply, TransportError
+from suds.transport.http import HttpAuthenticated
+
+__credits__ = ["MXCuBE collaboration"]
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join("~", ".cache")), "mxcubecore", "wsdl"
+)
+
+
+def get_wsdl_cache(directory=None, days=1):
+    """Get a persistent cache of parsed WSDL and schemas
+
+    Args:
+        directory (str): Cache directory, default to DEFAULT_CACHE_DIRECTORY
+        days (int): Number of days the cached documents are valid
+
+    Returns:
+        ObjectCache: suds cache, to pass as the cache option of a Client
+    """
+    directory = os.path.expanduser(directory or DEFAULT_CACHE_DIRECTORY)
+    return ObjectCache(location=directory, days=days)
+
+
+def create_session(pool_size=4):
+    """Create a keep-alive HTTP session
+
+    Args:
+        pool_size (int): Number of connections kept open per host
+
+    Returns:
+        requests.Session: The session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class SessionTransport(HttpAuthenticated):
+    """suds transport sending the requests in a keep-alive requests session
+
+    Basic authentication credentials are added to every request. Connection
+    errors are raised as URLError, as with the default suds transports.
+    """
+
+    def __init__(self, session=None, **kwargs):
+        HttpAuthenticated.__init__(self, **kwargs)
+        self.session = session or create_session()
+
+    def open(self, request):
+        self.addcredentials(request)
+        return io.BytesIO(self._request("GET", request).content)
+
+    def send(self, request):
+        self.addcredentials(request)
+        response = self._request("POST", request, request.message)
+        if response.status_code in (202, 204):
+            return None
+        return Reply(200, response.headers, response.content)
+
+    def _request(self, method, request, data=None):
+        try:
+            response = self.session.request(
+                method,
+                request.url,
+                data=data,
+                headers=request.headers,
+                proxies=self.options.proxy or None,
+                timeout=self.options.timeout,
+            )
+        except requests.RequestException as ex:
+            raise URLError(ex)
+        if response.status_code >= 400:
+            raise TransportError(
+                response.reason, response.status_code, io.BytesIO(response.content)
+            )
+        return response
+
+
+class ClientPool:
+    """Bounded pool of clones of a suds client, usable as a Client"""
+
+    def __init__(self, url, size=4, **kwargs):
+        """
+        Args:
+            url (str): WSDL url
+            size (int): Maximum number of concurrent calls
+            kwargs: suds Client options
+        """
+        self.size = size
+        self._client = Client(url, **kwargs)
+        self._options = dict(kwargs)
+        self._clients = []
+        self._idle = gevent.queue.Queue()
+
+    @property
+    def factory(self):
+        """Factory of the web service types"""
+        return self._client.factory
+
+    @property
+    def service(self):
+        """Web service methods, each call is made with a pooled client"""
+        return _PooledService(self)
+
+    def set_options(self, **kwargs):
+        """Set options of the client and of its clones"""
+        self._options.update(kwargs)
+        self._client.set_options(**kwargs)
+        for client in self._clients:
+            client.set_options(**kwargs)
+
+    @contextlib.contextmanager
+    def client(self):
+        """Context manager checking out a client, waits if all are in use"""
+        if self._idle.empty() and len(self._clients) < self.size:
+            client = self._clone()
+            self._clients.append(client)
+        else:
+            client = self._idle.get()
+        try:
+            yield client
+        finally:
+            self._idle.put(client)
+
+    def _clone(self):
+        # As Client.clone, which fails to copy the options in Python 3
+        client = Client.__new__(Client)
+        client.options = Options()
+        # A transport can not be shared by clients, the clones share the
+        # session of a SessionTransport
+        transport = self._client.options.transport
+        if isinstance(transport, SessionTransport):
+            transport = SessionTransport(
+                transport.session,
+                username=transport.options.username,
+                password=transport.options.password,
+            )
+        else:
+            transport = transport.__class__()
+
+        options = dict(self._options)
+        options.update(transport=transport, cache=self._client.options.cache)
+        client.set_options(**options)
+        client.wsdl = self._client.wsdl
+        client.factory = self._client.factory
+        client.service = ServiceSelector(client, client.wsdl.services)
+        client.sd = self._client.sd
+        client.messages = dict(tx=None, rx=None)
+        return client
+
+
+class _PooledService:
+    def __init__(self, pool):
+        self._pool = pool
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            with self._pool.client() as client:
+                return getattr(client.service, name)(*args, **kwargs)
+
+        call.__name__ = name
+        return call
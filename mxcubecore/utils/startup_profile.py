@@ -0,0 +1,200 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Profiling of the hardware objects loading at startup
+
+When enabled, the loading of each hardware object is split in phases
+(parse, import, instantiate, channels_commands, _init, init, ...). The time
+of each phase excludes the loading of the other objects it triggers, so
+that the phase times of an object add up to its own loading time.
+
+Enable with enable(), or by setting the MXCUBECORE_STARTUP_PROFILE
+environment variable to an output file prefix. At the end of
+init_hardware_repository, the slowest objects are logged, and
+<prefix>.json (time per object and phase) and <prefix>.trace.json
+(Chrome trace event format, for chrome://tracing, Perfetto or speedscope
+flame graphs) are written.
+"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import contextlib
+import json
+import logging
+import os
+import time
+
+import gevent
+
+__credits__ = ["MXCuBE collaboration"]
+
+_profiler = None
+_null_span = contextlib.nullcontext()
+
+
+class StartupProfiler:
+    """Collect the time spent in each loading phase of each object"""
+
+    def __init__(self, output_prefix=None, slowest=10):
+        self.output_prefix = output_prefix
+        self.slowest = slowest
+        self.start_time = time.perf_counter()
+        self.objects = {}
+        self.events = []
+        self._stacks = {}
+        self._thread_ids = {}
+
+    @contextlib.contextmanager
+    def span(self, object_name, phase):
+        """Context manager timing one loading phase of an object"""
+        greenlet_id = id(gevent.getcurrent())
+        stack = self._stacks.setdefault(greenlet_id, [])
+        # [start time, time spent in nested spans]
+        frame = [time.perf_counter(), 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            end_time = time.perf_counter()
+            stack.pop()
+            duration = end_time - frame[0]
+            if stack:
+                stack[-1][1] += duration
+
+            phases = self.objects.setdefault(object_name, {})
+            phases[phase] = phases.get(phase, 0.0) + duration - frame[1]
+
+            self.events.append(
+                {
+                    "name": "%s %s" % (object_name, phase),
+                    "cat": phase,
+                    "ph": "X",
+                    "ts": 1e6 * (frame[0] - self.start_time),
+                    "dur": 1e6 * duration,
+                    "pid": os.getpid(),
+                    "tid": self._thread_ids.setdefault(
+                        greenlet_id, len(self._thread_ids)
+                    ),
+                    "args": {"object": object_name},
+                }
+            )
+
+    def get_object_times(self):
+        """Get the loading time of each object, in ms
+
+        Returns:
+            dict: Time of each phase, and "total", by object name
+        """
+        result = {}
+        for object_name, phases in self.objects.items():
+            times = dict((phase, 1000 * value) for phase, value in phases.items())
+            times["total"] = sum(times.values())
+            result[object_name] = times
+        return result
+
+    def get_slowest(self, number=None):
+        """Get the slowest objects
+
+        Args:
+            number (int): Number of objects, default to self.slowest
+
+        Returns:
+            List[Tuple[str, dict]]: (object name, phase times) slowest first
+        """
+        number = self.slowest if number is None else number
+        times = self.get_object_times()
+        return sorted(times.items(), key=lambda item: -item[1]["total"])[:number]
+
+    def export_json(self, file_path):
+        """Write the time per object and phase as JSON"""
+        with open(file_path, "w") as fp0:
+            json.dump(
+                {
+                    "total": 1000 * (time.perf_counter() - self.start_time),
+                    "objects": self.get_object_times(),
+                    "slowest": [name for name, _ in self.get_slowest()],
+                },
+                fp0,
+                indent=2,
+            )
+
+    def export_trace(self, file_path):
+        """Write the phases in Chrome trace event format"""
+        with open(file_path, "w") as fp0:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, fp0)
+
+    def report(self):
+        """Log the slowest objects and write the output files"""
+        lines = ["Slowest hardware objects (ms):"]
+        for object_name, times in self.get_slowest():
+            phases = ", ".join(
+                "%s %.1f" % (phase, value)
+                for phase, value in sorted(times.items(), key=lambda item: -item[1])
+                if phase != "total"
+            )
+            lines.append("  %-30s %8.1f  (%s)" % (object_name, times["total"], phases))
+        logging.getLogger("HWR").info("\n".join(lines))
+
+        if self.output_prefix:
+            self.export_json(self.output_prefix + ".json")
+            self.export_trace(self.output_prefix + ".trace.json")
+
+
+def enable(output_prefix=None, slowest=10):
+    """Start profiling the loading of hardware objects
+
+    Args:
+        output_prefix (str): Prefix of the output files, None for no files
+        slowest (int): Number of slowest objects to report
+
+    Returns:
+        StartupProfiler: The profiler
+    """
+    global _profiler
+    _profiler = StartupProfiler(output_prefix, slowest)
+    return _profiler
+
+
+def disable():
+    """Stop profiling"""
+    global _profiler
+    _profiler = None
+
+
+def get_profiler():
+    """Get the current profiler, None if not enabled"""
+    return _profiler
+
+
+def span(object_name, phase):
+    """Context manager timing a loading phase, does nothing if not enabled
+
+    Args:
+        object_name (str): Name of the object being loaded
+        phase (str): Name of the loading phase
+    """
+    if _profiler is None:
+        return _null_span
+    return _profiler.span(object_name, phase)
+
+
+if os.environ.get("MXCUBECORE_STARTUP_PROFILE"):
+    enable(os.environ["MXCUBECORE_STARTUP_PROFILE"])
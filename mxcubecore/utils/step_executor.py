@@ -0,0 +1,133 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Concurrent execution of timed steps
+
+Steps (e.g. setting the beamline parameters before a data collection) are
+added to a StepExecutor, then run concurrently, each step in a greenlet.
+A step depending on other steps starts when they are done. The duration
+of every step is recorded in the times of the executor.
+"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import contextlib
+import time
+
+import gevent
+
+__credits__ = ["MXCuBE collaboration"]
+
+
+class StepExecutor:
+    """Run steps concurrently and record their duration"""
+
+    def __init__(self):
+        # Duration of the steps in s, by step name, in order of completion
+        self.times = {}
+        self._steps = {}
+
+    def add(self, name, function, *args, depends_on=()):
+        """Add a step to the next run
+
+        Args:
+            name (str): Step name
+            function (callable): Called with args to execute the step
+            args: Arguments of function
+            depends_on (tuple): Names of the steps to execute before, the
+                names of steps not added to the same run are ignored
+        """
+        self._steps[name] = (function, args, tuple(depends_on))
+
+    def run(self, timeout=None):
+        """Execute the added steps, the steps are removed
+
+        Args:
+            timeout (float): Timeout in s, None to wait forever
+
+        Returns:
+            dict: Duration of the steps of the run in s, by step name
+
+        Raises:
+            ValueError: Circular dependencies
+            gevent.Timeout: Steps not done within the timeout
+            Exception: The first exception raised by a step, the other
+                steps are killed
+        """
+        steps, self._steps = self._steps, {}
+        self._check_dependencies(steps)
+
+        tasks = {}
+        for name, (function, args, depends_on) in steps.items():
+            dependencies = [
+                dependency for dependency in depends_on if dependency in steps
+            ]
+            tasks[name] = gevent.spawn(
+                self._run_step, tasks, dependencies, function, args
+            )
+
+        try:
+            with gevent.Timeout(timeout):
+                gevent.joinall(list(tasks.values()), raise_error=True)
+        finally:
+            gevent.killall(list(tasks.values()))
+
+        times = {}
+        for name, task in sorted(tasks.items(), key=lambda item: item[1].value[1]):
+            times[name] = task.value[0]
+        self.times.update(times)
+        return times
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        """Context manager recording the duration of a step executed in it
+
+        Args:
+            name (str): Step name
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] = time.perf_counter() - start_time
+
+    def _run_step(self, tasks, dependencies, function, args):
+        gevent.joinall([tasks[name] for name in dependencies], raise_error=True)
+        start_time = time.perf_counter()
+        function(*args)
+        end_time = time.perf_counter()
+        return end_time - start_time, end_time
+
+    @staticmethod
+    def _check_dependencies(steps):
+        remaining = dict(
+            (name, set(step[2]).intersection(steps)) for name, step in steps.items()
+        )
+        while remaining:
+            done = [name for name, depends_on in remaining.items() if not depends_on]
+            if not done:
+                raise ValueError(
+                    "Circular dependencies between steps %s" % sorted(remaining)
+                )
+            for name in done:
+                del remaining[name]
+            for depends_on in remaining.values():
+                depends_on.difference_update(done)
@@ -0,0 +1,115 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Read-through cache of values expiring after a time to live"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import copy
+import time
+
+__credits__ = ["MXCuBE collaboration"]
+
+
+class TTLCache:
+    """Values by key, each one valid for ttl seconds after it is set
+
+    Keys are tuples, the first item being the kind of value, so that all
+    the values of a kind can be invalidated at once. Values are copied
+    when set and when returned, callers may modify them. A value fetched
+    while values are invalidated is not cached, it may be outdated.
+    """
+
+    def __init__(self, ttl=60.0):
+        """
+        Args:
+            ttl (float): Time to live of the values in s, 0 disables the cache
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._invalidations = 0
+
+    def get(self, key):
+        """Get a value
+
+        Args:
+            key (tuple): Key of the value
+
+        Returns:
+            A copy of the value, None if missing or expired
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        """Set a value, does nothing if the cache is disabled
+
+        Args:
+            key (tuple): Key of the value
+            value: The value
+        """
+        if self.ttl > 0:
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+
+    def read_through(self, key, fetch, is_valid=None):
+        """Get a value, fetching it if missing or expired
+
+        Args:
+            key (tuple): Key of the value
+            fetch (callable): Called without arguments to get the value
+            is_valid (callable): Tells if a fetched value is cached,
+                default to values that are not None
+
+        Returns:
+            The value, copied if from the cache
+        """
+        value = self.get(key)
+        if value is None:
+            invalidations = self._invalidations
+            value = fetch()
+            if invalidations != self._invalidations:
+                # invalidated during the fetch, e.g. by a write
+                return value
+            if is_valid(value) if is_valid else value is not None:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, *key):
+        """Invalidate the values with a key starting with the given items
+
+        Args:
+            key: First items of the keys, all the values if empty
+        """
+        self._invalidations += 1
+        if not key:
+            self._entries.clear()
+            return
+        size = len(key)
+        for entry_key in [k for k in self._entries if k[:size] == key]:
+            del self._entries[entry_key]
@@ -23,6 +23,8 @@ from __future__ import print_function, unicode_literals
 
 import pytest
 
+from mxcubecore.BaseHardwareObjects import HardwareObject
+
 __copyright__ = """ Copyright © 2016 - 2020 by MXCuBE Collaboration """
 __license__ = "LGPLv3+"
 
@@ -46,3 +48,40 @@ class TestBeamlineHoId:
         ho = test_object.get_hardware_object("diffractometer.sampx")
         ho_id = test_object.get_id(ho)
         assert "diffractometer.sampx" == ho_id
+
+    def test_beamline_id_index(self, test_object):
+        # Each indexed object is found back from its id
+        for ho, ho_id in test_object._hardware_object_id_dict.items():
+            assert test_object.get_hardware_object(ho_id) is ho
+
+        assert test_object.get_hardware_object("no.such.object") is None
+
+    def test_find_hardware_objects(self, test_object):
+        found = test_object.find_hardware_objects("diffractometer.*")
+        assert "diffractometer.sampx" in found
+        assert "diffractometer" not in found
+        assert all(_id.startswith("diffractometer.") for _id in found)
+        assert list(found) == sorted(found)
+
+        found = test_object.find_hardware_objects("*.sampx")
+        assert found["diffractometer.sampx"] is test_object.get_hardware_object(
+            "diffractometer.sampx"
+        )
+
+        assert test_object.find_hardware_objects("diffractometer") == {
+            "diffractometer": test_object.diffractometer
+        }
+        assert test_object.find_hardware_objects("no_such_role*") == {}
+
+    def test_replace_object_updates_index(self, test_object):
+        old_ho = test_object.get_hardware_object("transmission")
+        new_ho = HardwareObject("transmission")
+        try:
+            test_object.replace_object("transmission", new_ho)
+            assert test_object.get_hardware_object("transmission") is new_ho
+            assert test_object.get_id(old_ho) is None
+        finally:
+            test_object.replace_object("transmission", old_ho)
+
+        assert test_object.get_hardware_object("transmission") is old_ho
+        assert test_object.get_id(old_ho) == "transmission"
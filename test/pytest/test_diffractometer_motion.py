@@ -0,0 +1,164 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the GenericDiffractometer concurrent motor moves"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import time
+
+import gevent
+import gevent.event
+import pytest
+
+from mxcubecore.HardwareObjects.GenericDiffractometer import (
+    DiffractometerState,
+    GenericDiffractometer,
+)
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+
+class Motor:
+    """Motor taking duration s to move, starting after start_delay s"""
+
+    def __init__(self, name, duration, start_delay=0, log=None):
+        self._name = name
+        self.duration = duration
+        self.start_delay = start_delay
+        self.value = 0
+        self.log = log if log is not None else []
+        self._ready_event = gevent.event.Event()
+        self._ready_event.set()
+
+    def name(self):
+        return self._name
+
+    def set_value(self, value):
+        self.log.append(("start", self._name))
+        if not self.start_delay:
+            self._ready_event.clear()
+        gevent.spawn(self._move, value)
+
+    def _move(self, value):
+        if self.start_delay:
+            gevent.sleep(self.start_delay)
+            self._ready_event.clear()
+        gevent.sleep(self.duration)
+        self.value = value
+        self.log.append(("end", self._name))
+        self._ready_event.set()
+
+    def is_ready(self):
+        return self._ready_event.is_set()
+
+    def wait_ready(self, timeout=None):
+        self._ready_event.wait(timeout)
+
+
+@pytest.fixture
+def diffractometer():
+    diffractometer = GenericDiffractometer("diffractometer")
+    diffractometer.current_state = DiffractometerState.tostring(
+        DiffractometerState.Ready
+    )
+    log = []
+    diffractometer.motor_hwobj_dict = {
+        "phi": Motor("phi", 0.2, log=log),
+        "phiy": Motor("phiy", 0.1, log=log),
+        "phiz": Motor("phiz", 0.05, log=log),
+        "kappa": Motor("kappa", 0.05, log=log),
+    }
+    diffractometer.motion_log = log
+    return diffractometer
+
+
+def test_move_motors_concurrently(diffractometer):
+    motors = diffractometer.motor_hwobj_dict
+    start_time = time.time()
+    motion_times = diffractometer.move_motors(
+        {"phi": 10, "phiy": 1, "phiz": 2, "kappa": None, "sampx": 3}
+    )
+    elapsed = time.time() - start_time
+
+    # As long as the slowest motor, not the sum of the motion times
+    assert 0.2 <= elapsed < 0.3
+    assert set(motion_times) == {"phi", "phiy", "phiz"}
+    assert max(motion_times, key=motion_times.get) == "phi"
+    assert (motors["phi"].value, motors["phiy"].value, motors["phiz"].value) == (
+        10,
+        1,
+        2,
+    )
+    assert motors["kappa"].value == 0
+
+
+def test_move_motors_by_hardware_object(diffractometer):
+    phiy = diffractometer.motor_hwobj_dict["phiy"]
+    assert set(diffractometer.move_motors({phiy: 4})) == {"phiy"}
+    assert phiy.value == 4
+
+
+def test_move_motors_dependencies(diffractometer):
+    diffractometer.motion_dependencies = {"kappa": ["phiz", "sampx"]}
+    diffractometer.move_motors({"kappa": 1, "phiz": 2, "phiy": 3})
+
+    log = diffractometer.motion_log
+    # kappa starts once phiz is in position, phiy does not wait
+    assert log.index(("end", "phiz")) < log.index(("start", "kappa"))
+    assert log.index(("start", "phiy")) < log.index(("end", "phiz"))
+
+
+def test_get_motion_stages(diffractometer):
+    diffractometer.motion_dependencies = {
+        "kappa": ["phiz"],
+        "kappa_phi": ["kappa", "phiy"],
+    }
+    stages = diffractometer.get_motion_stages(["kappa_phi", "kappa", "phiz", "phi"])
+    assert [sorted(stage) for stage in stages] == [
+        ["phi", "phiz"],
+        ["kappa"],
+        ["kappa_phi"],
+    ]
+    assert diffractometer.get_motion_stages(["kappa_phi", "phi"]) == [
+        ["kappa_phi", "phi"]
+    ]
+
+    diffractometer.motion_dependencies["phiz"] = ["kappa_phi"]
+    with pytest.raises(ValueError):
+        diffractometer.get_motion_stages(["kappa_phi", "kappa", "phiz"])
+
+
+def test_move_motors_delayed_start(diffractometer):
+    # The controller reports the motor moving 50 ms after the command
+    phiy = diffractometer.motor_hwobj_dict["phiy"]
+    phiy.start_delay = 0.05
+    diffractometer.delay_state_polling = 0.5
+
+    start_time = time.time()
+    diffractometer.move_motors({"phiy": 5, "phiz": 1})
+    elapsed = time.time() - start_time
+    assert phiy.value == 5
+    # Not waiting for delay_state_polling once the motors are moving
+    assert 0.15 <= elapsed < 0.3
+
+
+def test_move_motors_timeout(diffractometer):
+    with pytest.raises(Exception, match="Timeout"):
+        diffractometer.move_motors({"phi": 1}, timeout=0.05)
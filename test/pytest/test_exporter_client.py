@@ -0,0 +1,249 @@
+"""Test suite for the exporter stream client."""
+
+import time
+
+import gevent
+import gevent.queue
+import gevent.server
+import pytest
+
+from mxcubecore.Command import Exporter
+from mxcubecore.Command.exporter.ExporterClient import ExporterClient
+from mxcubecore.Command.exporter.StandardClient import (
+    PROTOCOL,
+    ProtocolError,
+    StreamParser,
+    TimeoutError,
+)
+from mxcubecore.HardwareObjects.ExporterMotor import ExporterMotor
+
+STX = b"\x02"
+ETX = b"\x03"
+
+
+def make_event_stream(n_events):
+    """Build a recorded-like MD event stream.
+    Returns:
+        (bytes): the framed events.
+    """
+    events = []
+    for i in range(n_events):
+        name = "State" if i % 10 == 0 else "OmegaPosition"
+        value = "Ready" if name == "State" else "%.4f" % (i * 0.01)
+        events.append(
+            STX + b"EVT:%s\t%s\t%d" % (name.encode(), value.encode(), i) + ETX
+        )
+    return b"".join(events)
+
+
+class EventCounter(ExporterClient):
+    """Exporter client counting the received events"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.events = []
+        self.done = gevent.event.Event()
+        self.expected = 0
+
+    def on_event(self, name, value, timestamp):
+        self.events.append((name, value, timestamp))
+        if len(self.events) >= self.expected:
+            self.done.set()
+
+
+def replay(stream, n_events, chunk_size=1400):
+    """Serve stream from a local server, return the client"""
+
+    def handle(sock, _address):
+        for pos in range(0, len(stream), chunk_size):
+            sock.sendall(stream[pos : pos + chunk_size])
+        gevent.sleep(5)
+
+    server = gevent.server.StreamServer(("127.0.0.1", 0), handle)
+    server.start()
+    client = EventCounter("127.0.0.1", server.server_port, PROTOCOL.STREAM, 3, 1)
+    client.expected = n_events
+    try:
+        client.connect()
+        client.done.wait(timeout=30)
+    finally:
+        client.disconnect()
+        server.stop()
+    return client
+
+
+class PropertyServer:
+    """Local exporter server replying to READ commands after a latency"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.properties = {"OmegaPosition": "12.5", "State": "Ready"}
+        self.server = gevent.server.StreamServer(("127.0.0.1", 0), self.handle)
+        self.server.start()
+
+    def reply(self, sock, msg):
+        if msg.startswith("READ "):
+            value = self.properties.get(msg[5:])
+            ret = "RET:%s" % value if value is not None else "ERR:unknown"
+        elif msg.startswith("ASNC "):
+            ret = "RET:"
+        else:
+            ret = "NULL"
+        sock.sendall(STX + ret.encode() + ETX)
+
+    def handle(self, sock, _address):
+        requests = gevent.queue.Queue()
+        replier = gevent.spawn(self.replies, sock, requests)
+        parser = StreamParser()
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                break
+            for msg in parser.feed(data):
+                requests.put((time.monotonic() + self.latency, msg))
+        replier.kill()
+
+    def replies(self, sock, requests):
+        for due, msg in requests:
+            gevent.sleep(max(0, due - time.monotonic()))
+            self.reply(sock, msg)
+
+    def client(self, pipelined):
+        return ExporterClient(
+            "127.0.0.1", self.server.server_port, PROTOCOL.STREAM, 3, 1, pipelined
+        )
+
+
+@pytest.fixture
+def property_server():
+    server = PropertyServer(latency=0.05)
+    yield server
+    server.server.stop()
+
+
+def test_read_properties(property_server):
+    for pipelined in (False, True):
+        client = property_server.client(pipelined)
+        try:
+            assert client.read_property("State") == "Ready"
+            props = ["OmegaPosition", "Unknown", "State"]
+            assert client.read_properties(props) == ["12.5", None, "Ready"]
+        finally:
+            client.disconnect()
+
+
+def test_pipelined_reads_in_one_round_trip(property_server):
+    client = property_server.client(pipelined=True)
+    try:
+        t0 = time.perf_counter()
+        results = client.read_properties(["OmegaPosition", "State"] * 10)
+        assert time.perf_counter() - t0 < 0.5
+        assert results == ["12.5", "Ready"] * 10
+
+        # concurrent callers get their own replies
+        greenlets = [
+            gevent.spawn(client.read_property, name)
+            for name in ["State", "OmegaPosition"] * 5
+        ]
+        gevent.joinall(greenlets, timeout=1)
+        assert [g.value for g in greenlets] == ["Ready", "12.5"] * 5
+    finally:
+        client.disconnect()
+
+
+def test_pipelined_timeout_keeps_order(property_server):
+    client = property_server.client(pipelined=True)
+    try:
+        with pytest.raises(TimeoutError):
+            client.send_receive("READ State", timeout=0.01)
+        assert client.read_property("OmegaPosition") == "12.5"
+    finally:
+        client.disconnect()
+
+
+def test_pipelined_execute_async(property_server):
+    client = property_server.client(pipelined=True)
+    try:
+        assert client.read_property("State") == "Ready"
+        client.execute_async("startScan", ["1"])
+        # the reply of the asynchronous command is not given to the next read
+        assert client.read_property("OmegaPosition") == "12.5"
+        client.execute_async("startScan", ["2"])
+        props = ["State", "OmegaPosition"]
+        assert client.read_properties(props) == ["Ready", "12.5"]
+    finally:
+        client.disconnect()
+
+
+def test_motor_ready_in_one_round_trip(property_server):
+    property_server.properties["HardwareState"] = "Ready"
+    property_server.properties["AlignmentYState"] = "Ready"
+    motor = ExporterMotor("phiy")
+    motor.motor_state_name = "AlignmentYState"
+    motor._exporter = Exporter.Exporter(
+        "127.0.0.1", property_server.server.server_port, pipelined=True
+    )
+    try:
+        t0 = time.perf_counter()
+        assert motor._ready()
+        # three states read with a single latency of the server
+        assert time.perf_counter() - t0 < 0.12
+
+        property_server.properties["AlignmentYState"] = "Moving"
+        assert not motor._ready()
+        # HardwareState is not reported by all the applications
+        property_server.properties["AlignmentYState"] = "Ready"
+        del property_server.properties["HardwareState"]
+        assert motor._ready()
+    finally:
+        motor._exporter.disconnect()
+
+
+def test_start_exporter_per_mode(monkeypatch):
+    monkeypatch.setattr(Exporter, "EXPORTER_CLIENTS", {})
+    client = Exporter.start_exporter("127.0.0.1", 9001)
+    pipelined_client = Exporter.start_exporter("127.0.0.1", 9001, pipelined=True)
+
+    # the mode of the existing client is not changed
+    assert pipelined_client is not client
+    assert not client.pipelined
+    assert pipelined_client.pipelined
+    assert Exporter.start_exporter("127.0.0.1", 9001) is client
+    assert Exporter.start_exporter("127.0.0.1", 9001, pipelined=True) is (
+        pipelined_client
+    )
+
+
+def test_parser_split_messages():
+    parser = StreamParser()
+    assert list(parser.feed(b"junk\x02RET:1.0\x03\x03\x02RET:")) == ["RET:1.0"]
+    assert list(parser.feed(b"2.0\x03")) == ["RET:2.0"]
+    assert list(parser.feed(bytearray(b"\x02abc\x03\x02ignored"), 5)) == ["abc"]
+
+
+def test_parser_restart_on_stx():
+    parser = StreamParser()
+    assert list(parser.feed(b"\x02lost\x02kept\x03")) == ["kept"]
+    assert list(parser.feed(b"\x02lo")) == []
+    assert list(parser.feed(b"st\x02kept\x03")) == ["kept"]
+
+
+def test_parser_max_size():
+    parser = StreamParser(max_size=10)
+    assert list(parser.feed(b"\x02" + b"x" * 20)) == []
+    assert list(parser.feed(b"tail\x03\x02ok\x03")) == ["ok"]
+
+
+def test_parser_unicode_error():
+    parser = StreamParser()
+    with pytest.raises(ProtocolError):
+        list(parser.feed(b"\x02\xff\xfe\x03"))
+    assert list(parser.feed(b"\x02ok\x03")) == ["ok"]
+
+
+def test_replay_event_stream():
+    n_events = 5000
+    client = replay(make_event_stream(n_events), n_events, chunk_size=997)
+    assert len(client.events) == n_events
+    assert client.events[0] == ("State", "Ready", 0)
+    assert client.events[-1] == ("OmegaPosition", "49.9900", n_events - 1)
@@ -0,0 +1,222 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the video frame buffer and of its use by AbstractVideoDevice"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+from io import BytesIO
+
+import gevent
+import numpy as np
+import pytest
+from PIL import Image
+
+from mxcubecore.HardwareObjects.abstract import AbstractVideoDevice
+from mxcubecore.utils.frame_buffer import FrameBuffer
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+WIDTH = 64
+HEIGHT = 48
+
+
+def create_image(value):
+    return np.full((HEIGHT, WIDTH, 3), value, dtype=np.uint8)
+
+
+class VideoDevice(AbstractVideoDevice.AbstractVideoDevice):
+    """Video device returning images of increasing value"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.value = 0
+        self.encoded = []
+
+    def get_image(self):
+        self.value += 1
+        return create_image(self.value).ravel(), WIDTH, HEIGHT
+
+    def _encode_jpeg(self, frame, block=True):
+        self.encoded.append(frame.sequence)
+        return super()._encode_jpeg(frame, block)
+
+    def get_gain(self):
+        return None
+
+    def set_gain(self, gain_value):
+        pass
+
+    def get_exposure_time(self):
+        return None
+
+    def set_exposure_time(self, exposure_time_value):
+        pass
+
+    def get_video_live(self):
+        return self.value < 10
+
+    def set_video_live(self, flag):
+        pass
+
+
+def test_ring_buffer():
+    frame_buffer = FrameBuffer(3)
+    for value in range(1, 6):
+        frame_buffer.put(create_image(value), WIDTH, HEIGHT)
+
+    assert frame_buffer.get_last().sequence == 5
+    assert frame_buffer.get(2) is None
+    assert frame_buffer.get(6) is None
+    for sequence in (3, 4, 5):
+        assert frame_buffer.get(sequence).data[0, 0, 0] == sequence
+
+    frame_buffer.clear()
+    assert frame_buffer.get_last() is None
+    assert frame_buffer.put(create_image(0), WIDTH, HEIGHT).sequence == 6
+
+
+def test_frame_is_read_only_view():
+    image = create_image(1)
+    frame = FrameBuffer().put(image, WIDTH, HEIGHT)
+
+    assert np.shares_memory(frame.data, image)
+    with pytest.raises(ValueError):
+        frame.data[0, 0, 0] = 0
+
+
+def test_encoding_computed_once():
+    frame = FrameBuffer().put(create_image(1), WIDTH, HEIGHT)
+    calls = []
+
+    def encoder(frame):
+        calls.append(frame.sequence)
+        return frame.data.sum()
+
+    assert not frame.has_encoding("sum")
+    assert frame.get_encoding("sum", encoder) == WIDTH * HEIGHT * 3
+    assert frame.get_encoding("sum", encoder) == WIDTH * HEIGHT * 3
+    assert frame.has_encoding("sum")
+    assert calls == [1]
+
+
+def test_wait_frame():
+    frame_buffer = FrameBuffer()
+    assert frame_buffer.wait_frame(0, timeout=0.01) is None
+
+    gevent.spawn_later(0.02, frame_buffer.put, create_image(1), WIDTH, HEIGHT)
+    frame = frame_buffer.wait_frame(0, timeout=1)
+    assert frame.sequence == 1
+
+    # a frame newer than the sequence is returned at once
+    assert frame_buffer.wait_frame(0, timeout=0) is frame
+    assert frame_buffer.wait_frame(1, timeout=0.01) is None
+
+
+def test_jpeg_encoded_once_per_frame():
+    video = VideoDevice("video")
+    images = []
+    video.connect("imageReceived", lambda image, width, height: images.append(image))
+
+    jpg_image = video.get_jpg_image()
+    assert images == [jpg_image]
+    assert video.get_last_jpg_image() is jpg_image
+    assert video.get_jpg_frame(video.get_last_frame()) is jpg_image
+    assert video.encoded == [1]
+
+    image = Image.open(BytesIO(jpg_image))
+    assert image.size == (WIDTH, HEIGHT)
+    assert abs(int(np.asarray(image)[0, 0, 0]) - 1) <= 2
+
+    video.get_jpg_image()
+    assert video.encoded == [1, 2]
+    assert video.get_last_frame().sequence == 2
+
+
+def test_blank_image_not_buffered():
+    video = VideoDevice("video")
+    video.value = -1
+
+    assert video.grab_frame() is None
+    assert video.get_last_frame() is None
+    assert video.get_last_jpg_image() is None
+
+
+def test_jpeg_encoded_once_concurrently():
+    video = VideoDevice("video")
+    frame = video.grab_frame()
+
+    tasks = [gevent.spawn(video.get_jpg_frame, frame) for _ in range(3)]
+    gevent.joinall(tasks, raise_error=True)
+
+    assert video.encoded == [1]
+    assert len(set(id(task.value) for task in tasks)) == 1
+
+
+def test_image_polling_streams_jpeg():
+    video = VideoDevice("video")
+    images = []
+    video.connect("imageReceived", lambda image, width, height: images.append(image))
+
+    video.do_image_polling(0.01)
+    gevent.sleep(0.1)
+
+    assert 0 < len(images) <= 10
+    statistics = video.get_stream_statistics()
+    assert statistics["encoded_frames"] == len(images)
+    assert statistics["encoded_frames"] + statistics["dropped_frames"] == 10
+
+
+def test_adapted_stream_encoded_apart():
+    video = VideoDevice("video")
+    emitted = []
+    video.connect(
+        "imageReceived",
+        lambda image, width, height: emitted.append((image, width, height)),
+    )
+
+    # Not adapted, the stream shares the full quality encoding
+    stream_image = video.get_jpg_image()
+    assert video.get_last_jpg_image() is stream_image
+    assert emitted[0][1:] == (WIDTH, HEIGHT)
+
+    video.jpeg_encoder.quality = 30
+    video.jpeg_encoder.scale = 0.5
+    stream_image = video.get_jpg_image()
+    assert emitted[1] == (stream_image, WIDTH // 2, HEIGHT // 2)
+    assert Image.open(BytesIO(stream_image)).size == (WIDTH // 2, HEIGHT // 2)
+
+    # The other consumers get the full quality and size
+    jpg_image = video.get_last_jpg_image()
+    assert jpg_image is not stream_image
+    assert Image.open(BytesIO(jpg_image)).size == (WIDTH, HEIGHT)
+
+
+def test_save_snapshot_without_image(tmp_path):
+    video = VideoDevice("video")
+    video.value = -1
+    with pytest.raises(RuntimeError):
+        video.save_snapshot(str(tmp_path / "snapshot.png"))
+
+    video.value = 0
+    video.grab_frame()
+    video.value = -1
+    # Blank image, the last frame is saved
+    video.save_snapshot(str(tmp_path / "snapshot.png"))
+    assert Image.open(str(tmp_path / "snapshot.png")).size == (WIDTH, HEIGHT)
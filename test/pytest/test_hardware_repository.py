@@ -0,0 +1,146 @@
+"""Test suite for the HardwareRepository loading functions"""
+
+import json
+import os
+
+import pytest
+
+from mxcubecore import HardwareRepository as HWR
+from mxcubecore.utils import config_cache
+from mxcubecore.utils import startup_profile
+
+TESTS_DIR = os.path.abspath(os.path.dirname(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(TESTS_DIR, "../.."))
+MOCKUP_DIR = os.path.join(ROOT_DIR, "mxcubecore/configuration/mockup")
+
+
+def init_repository(*config_dirs):
+    HWR._instance = HWR.beamline = None
+    HWR.init_hardware_repository(os.path.pathsep.join(config_dirs))
+    return HWR.beamline
+
+
+@pytest.fixture
+def concurrent_config(tmp_path):
+    """Mockup beamline configuration, with concurrent loading"""
+    with open(os.path.join(MOCKUP_DIR, "test", "beamline_config.yml")) as fp0:
+        config = fp0.read()
+    config = config.replace(
+        "_objects:\n",
+        "_concurrent_loading: true\n_dependencies:\n    resolution: [detector]\n"
+        "_objects:\n",
+        1,
+    )
+    (tmp_path / "beamline_config.yml").write_text(config)
+    yield str(tmp_path)
+    HWR._instance = HWR.beamline = None
+
+
+def test_concurrent_loading(concurrent_config, capsys):
+    beamline = init_repository(
+        concurrent_config, MOCKUP_DIR, os.path.join(MOCKUP_DIR, "test")
+    )
+    for role in ("energy", "detector", "resolution", "diffractometer"):
+        assert getattr(beamline, role) is not None
+    assert beamline.diffractometer.motor_hwobj_dict["phi"] is not None
+
+    output = capsys.readouterr().out
+    assert "critical path" in output
+    assert "Loaded concurrently" in output
+
+
+def test_load_dependencies(concurrent_config):
+    init_repository(concurrent_config, MOCKUP_DIR, os.path.join(MOCKUP_DIR, "test"))
+    graph = HWR.get_load_dependencies(
+        {
+            "diffractometer": "diffractometer-mockup.xml",
+            "omega": "diff-omega-mockup.xml",
+            "energy": "energy-mockup.xml",
+            "resolution": "resolution-mockup.xml",
+        },
+        {"resolution": ["energy", "unknown"]},
+    )
+    assert graph == {
+        "diffractometer": {"omega"},
+        "omega": set(),
+        "energy": set(),
+        "resolution": {"energy"},
+    }
+
+
+def test_critical_path():
+    graph = {"a": set(), "b": set(), "c": {"a", "b"}, "d": {"a"}}
+    timing = {"a": (0, 1), "b": (0, 3), "c": (3, 4), "d": (1, 2)}
+    assert HWR.get_critical_path(graph, timing) == ["b", "c"]
+    assert HWR.get_critical_path(graph, {}) == []
+
+
+@pytest.fixture
+def cache_directory(tmp_path):
+    cache_directory = str(tmp_path / "cache")
+    config_cache.set_cache_directory(cache_directory)
+    yield cache_directory
+    config_cache.set_cache_directory(None)
+    HWR._instance = HWR.beamline = None
+
+
+def test_configuration_cache(cache_directory):
+    config_dirs = (MOCKUP_DIR, os.path.join(MOCKUP_DIR, "test"))
+    beamline = init_repository(*config_dirs)
+    entries = os.listdir(cache_directory)
+    assert len(entries) > 10
+
+    beamline = init_repository(*config_dirs)
+    assert sorted(os.listdir(cache_directory)) == sorted(entries)
+    assert beamline.energy.get_value() is not None
+    assert beamline.diffractometer.motor_hwobj_dict["phi"] is not None
+
+
+def test_configuration_cache_invalidation(cache_directory, tmp_path):
+    file_path = tmp_path / "config.yml"
+    file_path.write_text("value: 1\n")
+    assert config_cache.load(str(file_path), file_path.read_text(), HWR.yaml.load) == {
+        "value": 1
+    }
+
+    # the cached value is used
+    assert config_cache.load(str(file_path), file_path.read_text(), None) == {
+        "value": 1
+    }
+
+    file_path.write_text("value: 2\n")
+    assert config_cache.load(str(file_path), file_path.read_text(), HWR.yaml.load) == {
+        "value": 2
+    }
+
+
+def test_warm_configuration_cache(cache_directory):
+    count = config_cache.warm(MOCKUP_DIR)
+    assert count > 10
+    assert len(os.listdir(cache_directory)) == count
+
+
+def test_startup_profile(tmp_path):
+    output_prefix = str(tmp_path / "startup")
+    startup_profile.enable(output_prefix, slowest=3)
+    try:
+        init_repository(MOCKUP_DIR, os.path.join(MOCKUP_DIR, "test"))
+    finally:
+        startup_profile.disable()
+        HWR._instance = HWR.beamline = None
+
+    with open(output_prefix + ".json") as fp0:
+        profile = json.load(fp0)
+    assert profile["slowest"] and len(profile["slowest"]) == 3
+    diffractometer = profile["objects"]["/diffractometer-mockup"]
+    assert {"parse", "import", "instantiate", "_init", "init"} <= set(diffractometer)
+    assert diffractometer["total"] == pytest.approx(
+        sum(value for phase, value in diffractometer.items() if phase != "total")
+    )
+    assert "beamline_config.yml" in profile["objects"]
+    # phases of other objects are not counted in the referencing object time
+    assert profile["objects"]["/diff-omega-mockup"]["total"] > 0
+
+    with open(output_prefix + ".trace.json") as fp0:
+        events = json.load(fp0)["traceEvents"]
+    assert {"name", "ph", "ts", "dur", "pid", "tid"} <= set(events[0])
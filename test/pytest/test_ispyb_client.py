@@ -0,0 +1,229 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the ISPyBClient cache and sample reconciliation"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import random
+import time
+from datetime import datetime
+
+import gevent
+import pytest
+from suds.sudsobject import Factory
+
+from mxcubecore.HardwareObjects.ISPyBClient import (
+    ISPyBClient,
+    SampleReference,
+    SampleReferenceIndex,
+)
+from mxcubecore.utils.ttl_cache import TTLCache
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+
+def find_sample(sample_ref_list, code=None, location=None):
+    """Linear search, as the index replaces"""
+    for sample_ref in sample_ref_list:
+        if code and location:
+            if (
+                sample_ref.code == code
+                and sample_ref.container_reference == location[0]
+                and sample_ref.sample_reference == location[1]
+            ):
+                return sample_ref
+        elif code:
+            if sample_ref.code == code:
+                return sample_ref
+        elif location:
+            if (
+                sample_ref.container_reference == location[0]
+                and sample_ref.sample_reference == location[1]
+            ):
+                return sample_ref
+    return None
+
+
+def test_sample_reference_index():
+    rng = random.Random(0)
+    sample_refs = [
+        SampleReference(
+            rng.choice(["", "A", "B", "C"]), rng.randint(1, 3), rng.randint(1, 4), ""
+        )
+        for _ in range(60)
+    ]
+    index = SampleReferenceIndex(sample_refs)
+    remaining = list(sample_refs)
+
+    for _ in range(200):
+        code = rng.choice([None, "", "A", "B", "D"])
+        location = rng.choice([None, [rng.randint(1, 3), rng.randint(1, 4)]])
+        expected = find_sample(remaining, code, location)
+        assert index.find(code, location) == expected
+        if expected is not None and rng.random() < 0.5:
+            remaining.remove(expected)
+            index.remove(expected)
+        assert list(index) == remaining
+
+    with pytest.raises(ValueError):
+        index.remove(SampleReference("X", 9, 9, ""))
+
+
+def test_ttl_cache():
+    cache = TTLCache(ttl=0.05)
+    calls = []
+
+    def fetch():
+        calls.append(None)
+        return {"sessionId": 1}
+
+    value = cache.read_through(("session", 1), fetch)
+    value["sessionId"] = 2
+    assert cache.read_through(("session", 1), fetch) == {"sessionId": 1}
+    assert len(calls) == 1
+
+    cache.invalidate("session")
+    cache.read_through(("session", 1), fetch)
+    assert len(calls) == 2
+
+    time.sleep(0.06)
+    cache.read_through(("session", 1), fetch)
+    assert len(calls) == 3
+
+    # Invalid values are not cached
+    assert cache.read_through(("session", 2), lambda: {}, bool) == {}
+    assert cache.get(("session", 2)) is None
+
+    # Values fetched while invalidated are not cached
+    def fetch_invalidated():
+        cache.invalidate("proposal")
+        return {"sessionId": 3}
+
+    assert cache.read_through(("session", 3), fetch_invalidated) == {"sessionId": 3}
+    assert cache.get(("session", 3)) is None
+
+
+class FakeService:
+    def __init__(self, samples):
+        self.samples = samples
+        self.calls = 0
+        self.comments = "old"
+
+    def findSampleInfoLightForProposal(self, proposal_id, beamline_name):
+        self.calls += 1
+        return [Factory.object("SampleInfo", sample) for sample in self.samples]
+
+    def findSession(self, session_id):
+        return Factory.object(
+            "Session",
+            {
+                "sessionId": session_id,
+                "startDate": datetime(2020, 1, 1),
+                "endDate": datetime(2020, 1, 2),
+                "comments": self.comments,
+            },
+        )
+
+    def storeOrUpdateBLSample(self, bl_sample):
+        gevent.sleep(0.01)
+        self.samples[0]["code"] = bl_sample["code"]
+        return {}
+
+    def storeOrUpdateSession(self, session):
+        gevent.sleep(0.01)
+        self.comments = session["comments"]
+        return session["sessionId"]
+
+
+class FakeClient:
+    def __init__(self, service):
+        self.service = service
+
+
+def test_get_session_samples():
+    # Full dewar, the LIMS knows the code of every other sample
+    sample_refs = [
+        ("SC%d-%d" % (puck, vial), puck, vial, "")
+        for puck in range(1, 30)
+        for vial in range(1, 17)
+    ]
+    samples = [
+        {
+            "code": code if vial % 2 else "",
+            "sampleLocation": str(vial),
+            "containerSampleChangerLocation": str(puck),
+        }
+        for code, puck, vial, _ in sample_refs[:-16]
+    ]
+    service = FakeService(samples)
+    client = ISPyBClient("lims")
+    client._tools_ws = client._collection = FakeClient(service)
+
+    result = client.get_session_samples(1, 2, sample_refs)["loaded_sample"]
+    assert len(result) == len(sample_refs)
+    assert [sample["code"] for sample in result[: len(samples) : 2]] == [
+        sample["code"] for sample in samples[::2]
+    ]
+    # The codes of the sample changer are used when the LIMS has none
+    assert result[1]["sampleCode"] == "SC1-2"
+    # The last puck is unknown to the LIMS
+    assert result[-1] == {
+        "code": "SC29-16",
+        "location": 16,
+        "containerSampleChangerLocation": 29,
+    }
+
+    client.get_session_samples(1, 2, sample_refs)
+    assert service.calls == 1
+    client.update_bl_sample({"code": "XTAL1"})
+    client.get_session_samples(1, 2, sample_refs)
+    assert service.calls == 2
+
+
+def test_read_during_write():
+    sample_refs = [("", 1, 1, "")]
+    samples = [
+        {"code": "OLD", "sampleLocation": "1", "containerSampleChangerLocation": "1"}
+    ]
+    service = FakeService(samples)
+    client = ISPyBClient("lims")
+    client._tools_ws = client._collection = FakeClient(service)
+
+    # Reads from other greenlets during the writes return the old values,
+    # which are not kept in the cache after the writes
+    write = gevent.spawn(client.update_bl_sample, {"code": "XTAL1"})
+    gevent.sleep(0)
+    result = client.get_session_samples(1, 2, sample_refs)["loaded_sample"]
+    assert result[0]["code"] == "OLD"
+    write.join()
+    result = client.get_session_samples(1, 2, sample_refs)["loaded_sample"]
+    assert result[0]["code"] == "XTAL1"
+
+    session_dict = {
+        "sessionId": 3,
+        "startDate": "2020-01-01 00:00:00",
+        "endDate": "2020-01-02 00:00:00",
+        "comments": "new",
+    }
+    write = gevent.spawn(client.create_session, session_dict)
+    gevent.sleep(0)
+    assert client.get_session(3)["comments"] == "old"
+    write.join()
+    assert client.get_session(3)["comments"] == "new"
@@ -0,0 +1,128 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the JPEG encoding of video frames in a thread pool"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+from io import BytesIO
+
+import gevent
+import numpy as np
+from PIL import Image
+
+from mxcubecore.utils.jpeg_encoder import JpegEncoder
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+
+def create_image(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def test_encode():
+    encoder = JpegEncoder(threads=2)
+    jpeg_image = encoder.encode(create_image(64, 48), 64, 48)
+
+    image = Image.open(BytesIO(jpeg_image))
+    assert image.format == "JPEG"
+    assert image.size == (64, 48)
+    statistics = encoder.get_statistics()
+    assert statistics["encoded_frames"] == 1
+    assert statistics["dropped_frames"] == 0
+    assert statistics["frame_size"] == len(jpeg_image)
+    assert statistics["latency"] > 0
+
+
+def test_drop_when_busy():
+    encoder = JpegEncoder(threads=1)
+    rgb_image = create_image(640, 480)
+
+    tasks = [gevent.spawn(encoder.encode, rgb_image, 640, 480, False) for _ in range(3)]
+    gevent.joinall(tasks, raise_error=True)
+
+    assert tasks[0].value is not None
+    assert [task.value for task in tasks[1:]] == [None, None]
+    assert encoder.dropped_frames == 2
+
+    # blocking encodings wait for the thread
+    tasks = [gevent.spawn(encoder.encode, rgb_image, 640, 480) for _ in range(3)]
+    gevent.joinall(tasks, raise_error=True)
+    assert all(task.value is not None for task in tasks)
+    assert encoder.dropped_frames == 2
+
+
+def test_adapt_to_bandwidth():
+    encoder = JpegEncoder(quality=80, target_bandwidth=1, min_quality=60)
+    rgb_image = create_image(64, 48)
+
+    sizes = []
+    for _ in range(80):
+        sizes.append(len(encoder.encode(rgb_image, 64, 48)))
+
+    # quality first, then scale
+    assert encoder.quality == 60
+    assert encoder.scale < 1
+    assert sizes[-1] < sizes[0]
+    jpeg_image = encoder.encode(rgb_image, 64, 48)
+    assert Image.open(BytesIO(jpeg_image)).size == (
+        int(64 * encoder.scale),
+        int(48 * encoder.scale),
+    )
+
+
+def test_encode_full_quality():
+    encoder = JpegEncoder(quality=80)
+    encoder.quality = 50
+    encoder.scale = 0.5
+    rgb_image = create_image(64, 48)
+
+    assert encoder.is_adapted()
+    assert encoder.encode_with_size(rgb_image, 64, 48)[1:] == (32, 24)
+    jpeg_image, width, height = encoder.encode_with_size(
+        rgb_image, 64, 48, adapted=False
+    )
+    assert (width, height) == (64, 48)
+    assert Image.open(BytesIO(jpeg_image)).size == (64, 48)
+    assert len(encoder.encode(rgb_image, 64, 48, adapted=False)) == len(jpeg_image)
+
+
+def test_recover_quality():
+    encoder = JpegEncoder(quality=80, target_fps=1)
+    encoder.quality = 50
+    encoder.scale = 0.5
+    rgb_image = create_image(64, 48)
+
+    for _ in range(100):
+        encoder.encode(rgb_image, 64, 48)
+
+    # scale first, then quality
+    assert encoder.scale == 1
+    assert encoder.quality == 80
+
+
+def test_fixed_quality_without_target():
+    encoder = JpegEncoder(quality=80)
+    for _ in range(20):
+        encoder.encode(create_image(64, 48), 64, 48)
+
+    assert encoder.quality == 80
+    assert encoder.scale == 1
+    assert encoder.get_fps() > 0
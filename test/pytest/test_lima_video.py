@@ -0,0 +1,235 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the decoding of the Lima video images"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import pickle
+import struct
+
+import numpy as np
+import pytest
+
+from mxcubecore.utils.lima_video import VIDEO_MODES, LimaVideoDecoder
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+HEADER_FORMAT = ">IHHqiiHHHH"
+
+
+def create_image(video_mode, pixels, width, height, frame_number=1, header=">"):
+    """Image as read from the video_last_image attribute of Lima"""
+    pixels = np.asarray(pixels)
+    endianness = 0 if pixels.dtype.byteorder in ("<", "=", "|") else 1
+    return (
+        struct.pack(
+            header + HEADER_FORMAT[1:],
+            0x5644454F,
+            1,
+            VIDEO_MODES.index(video_mode),
+            frame_number,
+            width,
+            height,
+            endianness,
+            struct.calcsize(HEADER_FORMAT),
+            0,
+            0,
+        )
+        + pixels.tobytes()
+    )
+
+
+def random_pixels(shape, dtype=np.uint8):
+    return np.random.default_rng(0).integers(0, 256, shape).astype(dtype)
+
+
+def test_decode_header():
+    data = create_image("Y8", random_pixels((3, 4)), 4, 3, frame_number=42)
+
+    header = LimaVideoDecoder().decode_header(data)
+
+    assert header.video_mode == "Y8"
+    assert header.frame_number == 42
+    assert (header.width, header.height) == (4, 3)
+    assert header.header_size == 32
+
+    data = create_image("RGB24", random_pixels((3, 4, 3)), 4, 3, header="<")
+    header = LimaVideoDecoder(endian="<").decode_header(data)
+    assert header.video_mode == "RGB24"
+    assert (header.width, header.height) == (4, 3)
+
+
+def test_decode_y8():
+    pixels = random_pixels((3, 4))
+
+    image, header = LimaVideoDecoder().decode(create_image("Y8", pixels, 4, 3))
+
+    assert image.shape == (3, 4, 3)
+    assert image.dtype == np.uint8
+    for channel in range(3):
+        assert np.array_equal(image[:, :, channel], pixels)
+
+
+@pytest.mark.parametrize("dtype", ["<u2", ">u2"])
+def test_decode_y16(dtype):
+    pixels = np.array([[0, 16, 4095], [4096, 65535, 2048]], dtype)
+
+    image, _ = LimaVideoDecoder().decode(create_image("Y16", pixels, 3, 2))
+    assert np.array_equal(image[:, :, 0], [[0, 1, 255], [255, 255, 128]])
+
+    image, _ = LimaVideoDecoder(bit_depth=16).decode(create_image("Y16", pixels, 3, 2))
+    assert np.array_equal(image[:, :, 1], [[0, 0, 15], [16, 255, 8]])
+
+
+def test_decode_rgb():
+    pixels = random_pixels((3, 4, 3))
+
+    image, _ = LimaVideoDecoder().decode(create_image("RGB24", pixels, 4, 3))
+    assert np.array_equal(image, pixels)
+
+    image, _ = LimaVideoDecoder().decode(create_image("BGR24", pixels, 4, 3))
+    assert np.array_equal(image, pixels[:, :, ::-1])
+
+    pixels = random_pixels((3, 4, 4))
+    image, _ = LimaVideoDecoder().decode(create_image("RGB32", pixels, 4, 3))
+    assert np.array_equal(image, pixels[:, :, :3])
+    assert image.flags.c_contiguous
+
+
+@pytest.mark.parametrize("video_mode", ["BAYER_RG16", "BAYER_BG16", "BAYER_RG8"])
+def test_decode_bayer(video_mode):
+    # Uniform colour, red 10, green 20 and 30, blue 40 (<< 4 in 16 bit)
+    block = np.array([[10, 20], [30, 40]])
+    if video_mode.startswith("BAYER_BG"):
+        block = block[::-1, ::-1]
+    if video_mode.endswith("16"):
+        block = (block << 4).astype("<u2")
+    else:
+        block = block.astype(np.uint8)
+    pixels = np.tile(block, (3, 4))
+
+    image, _ = LimaVideoDecoder().decode(create_image(video_mode, pixels, 8, 6))
+
+    assert image.shape == (6, 8, 3)
+    assert np.array_equal(image[:, :, 0], np.full((6, 8), 10))
+    assert np.array_equal(image[:, :, 1], np.full((6, 8), 25))
+    assert np.array_equal(image[:, :, 2], np.full((6, 8), 40))
+
+
+def test_decode_bayer_odd_size():
+    pixels = random_pixels((5, 7))
+
+    image, _ = LimaVideoDecoder().decode(create_image("BAYER_RG8", pixels, 7, 5))
+
+    assert image.shape == (5, 7, 3)
+    assert image[4, 6, 0] == pixels[2, 4]
+
+
+def test_scale():
+    pixels = random_pixels((4, 6, 3))
+    data = create_image("RGB24", pixels, 6, 4)
+
+    image, _ = LimaVideoDecoder(scale=0.5).decode(data)
+    assert np.array_equal(image, pixels[::2, ::2])
+
+    image, _ = LimaVideoDecoder(scale=2).decode(data)
+    assert np.array_equal(image, pixels.repeat(2, axis=0).repeat(2, axis=1))
+
+    assert LimaVideoDecoder(scale=0.5).get_output_size(6, 4) == (3, 2)
+
+
+def test_rotation_and_mirror():
+    pixels = random_pixels((4, 6))
+    data = create_image("Y8", pixels, 6, 4)
+
+    decoder = LimaVideoDecoder(rotation=90, mirror=(True, False))
+    image, _ = decoder.decode(data)
+    assert np.array_equal(image[:, :, 0], np.rot90(pixels)[:, ::-1])
+    assert decoder.get_output_size(6, 4) == (4, 6)
+
+    image, _ = LimaVideoDecoder(rotation=-180, mirror=(False, True)).decode(data)
+    assert np.array_equal(image[:, :, 2], np.rot90(pixels, 2)[::-1])
+
+    with pytest.raises(ValueError):
+        LimaVideoDecoder(rotation=45)
+
+
+def test_decoders_cached():
+    decoder = LimaVideoDecoder()
+
+    assert decoder.get_decoder("Y16") is decoder.get_decoder("Y16")
+    assert decoder.get_decoder("Y8") is not decoder.get_decoder("Y16")
+    with pytest.raises(ValueError):
+        decoder.get_decoder("YUV422")
+
+    # The decoders are recreated after pickling, e.g. in another process
+    decoder = pickle.loads(pickle.dumps(decoder))
+    data = create_image("Y8", random_pixels((2, 2)), 2, 2)
+    assert decoder.decode(data)[0].shape == (2, 2, 3)
+
+
+if __name__ == "__main__":
+    # Decoding time per megapixel, compared with the previous struct and
+    # PIL decoding of RGB24 images
+    import timeit
+
+    from PIL import Image
+
+    width, height = 1360, 1024
+    megapixels = width * height / 1e6
+
+    def decode_pil(data):
+        header_size = struct.calcsize(HEADER_FORMAT)
+        _, _, _, _, width, height, _, _, _, _ = struct.unpack(
+            HEADER_FORMAT, data[:header_size]
+        )
+        image = Image.frombuffer(
+            "RGB", (width, height), data[header_size:], "raw", "RGB", 0, 1
+        )
+        return image.tobytes()
+
+    def print_time(name, function, data):
+        number = 20
+        duration = min(timeit.repeat(lambda: function(data), number=number, repeat=3))
+        print("%-28s %7.2f ms/Mpixel" % (name, duration / number / megapixels * 1e3))
+
+    rgb_data = create_image("RGB24", random_pixels((height, width, 3)), width, height)
+    print_time("RGB24 struct + PIL", decode_pil, rgb_data)
+
+    decoder = LimaVideoDecoder()
+    for video_mode, shape, dtype in (
+        ("Y8", (height, width), np.uint8),
+        ("Y16", (height, width), "<u2"),
+        ("RGB24", (height, width, 3), np.uint8),
+        ("BGR32", (height, width, 4), np.uint8),
+        ("BAYER_RG16", (height, width), "<u2"),
+    ):
+        data = create_image(video_mode, random_pixels(shape, dtype), width, height)
+        print_time(video_mode, lambda data: decoder.decode(data)[0].tobytes(), data)
+
+    data = create_image(
+        "BAYER_RG16", random_pixels((height, width), "<u2"), width, height
+    )
+    transformed = LimaVideoDecoder(scale=0.5, rotation=90, mirror=(True, False))
+    print_time(
+        "BAYER_RG16 scaled, rotated",
+        lambda data: transformed.decode(data)[0].tobytes(),
+        data,
+    )
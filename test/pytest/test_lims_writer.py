@@ -0,0 +1,113 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the background LIMS writer"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import time
+from urllib.error import URLError
+
+import gevent
+
+from mxcubecore.utils.lims_writer import LimsWriter
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+
+class SlowLims:
+    """Stores records one by one, after a delay, failing on demand"""
+
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.stored = []
+        self.batches = []
+
+    def store_images(self, records):
+        self.batches.append(len(records))
+        while records:
+            gevent.sleep(self.delay)
+            if self.failures:
+                self.failures -= 1
+                raise URLError("connection refused")
+            self.stored.append(records.pop(0))
+
+
+def test_put_does_not_wait_for_lims():
+    lims = SlowLims(delay=0.01)
+    writer = LimsWriter(lims.store_images, batch_size=10)
+
+    start_time = time.monotonic()
+    for frame in range(20):
+        writer.put({"imageNumber": frame})
+    assert time.monotonic() - start_time < 0.01
+
+    assert writer.flush(timeout=5)
+    assert [record["imageNumber"] for record in lims.stored] == list(range(20))
+    assert lims.batches == [10, 10]
+
+    statistics = writer.get_statistics()
+    assert statistics["written"] == 20
+    assert statistics["queue_depth"] == statistics["pending"] == 0
+    assert statistics["max_queue_depth"] == 20
+    assert statistics["mean_write_latency"] >= 10
+
+
+def test_retry():
+    lims = SlowLims(failures=2)
+    writer = LimsWriter(lims.store_images, retry_delay=0.001)
+    for frame in range(3):
+        writer.put(frame)
+    assert writer.flush(timeout=5)
+    assert lims.stored == [0, 1, 2]
+    assert writer.get_statistics()["retries"] == 2
+
+
+def test_failure_after_retries():
+    lims = SlowLims(failures=10)
+    writer = LimsWriter(lims.store_images, retries=1, retry_delay=0.001)
+    writer.put(0)
+    assert writer.flush(timeout=5)
+    statistics = writer.get_statistics()
+    assert (statistics["written"], statistics["failed"]) == (0, 1)
+
+    # Errors other than connection and web service errors are not retried
+    def store(records):
+        raise ValueError("bad record")
+
+    writer = LimsWriter(store)
+    writer.put(0)
+    assert writer.flush(timeout=5)
+    assert writer.get_statistics()["failed"] == 1
+    assert writer.get_statistics()["retries"] == 0
+
+
+def test_back_pressure():
+    lims = SlowLims(delay=0.05)
+    writer = LimsWriter(
+        lims.store_images, max_queue_size=2, batch_size=1, put_timeout=0.001
+    )
+    results = [writer.put(frame) for frame in range(5)]
+    # One record is being written, two are queued, the others are dropped
+    assert results == [True, True, True, False, False]
+    assert writer.get_statistics()["dropped"] == 2
+    assert not writer.flush(timeout=0.01)
+    assert writer.flush(timeout=5)
+    assert lims.stored == [0, 1, 2]
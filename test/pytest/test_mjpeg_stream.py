@@ -0,0 +1,180 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the MJPEG stream reader against a local stub mjpg-streamer"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import gevent
+import gevent.server
+import pytest
+
+from mxcubecore.utils.mjpeg_stream import MjpegStreamReader, MultipartParser
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+BOUNDARY = b"boundarydonotcross"
+
+
+def create_frame(number):
+    """Fake JPEG image, with the markers of the start and end of image"""
+    return b"\xff\xd8" + (b"frame %d " % number) * 50 + b"\xff\xd9"
+
+
+def create_part(frame, content_length=True):
+    headers = b"Content-Type: image/jpeg\r\n"
+    if content_length:
+        headers += b"Content-Length: %d\r\n" % len(frame)
+    return b"--" + BOUNDARY + b"\r\n" + headers + b"\r\n" + frame + b"\r\n"
+
+
+class StubStreamer:
+    """HTTP server sending synthetic frames as mjpg-streamer does"""
+
+    def __init__(self, frames_per_connection=None, interval=0.01, chunk_size=100):
+        self.frames_per_connection = frames_per_connection
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.connections = 0
+        self.frames_sent = 0
+        self.server = gevent.server.StreamServer(("127.0.0.1", 0), self.handle)
+        self.server.start()
+        self.port = self.server.server_port
+
+    def handle(self, sock, address):
+        self.connections += 1
+        request = sock.recv(4096)
+        assert request.startswith(b"GET /?action=stream")
+        sock.sendall(
+            b"HTTP/1.0 200 OK\r\n"
+            b"Content-Type: multipart/x-mixed-replace;boundary=" + BOUNDARY + b"\r\n"
+            b"\r\n"
+        )
+        sent = 0
+        while self.frames_per_connection is None or sent < self.frames_per_connection:
+            self.frames_sent += 1
+            data = create_part(create_frame(self.frames_sent))
+            # Split the parts over several reads
+            for index in range(0, len(data), self.chunk_size):
+                sock.sendall(data[index : index + self.chunk_size])
+                gevent.sleep(0)
+            sent += 1
+            gevent.sleep(self.interval)
+        sock.close()
+
+    def stop(self):
+        self.server.stop()
+
+
+@pytest.fixture
+def streamer():
+    server = StubStreamer()
+    yield server
+    server.stop()
+
+
+def test_parser_with_content_length():
+    data = b"".join(create_part(create_frame(number)) for number in range(3))
+
+    for chunk_size in (1, 7, 100, len(data)):
+        parser = MultipartParser(BOUNDARY)
+        parts = []
+        for index in range(0, len(data), chunk_size):
+            parts.extend(parser.feed(data[index : index + chunk_size]))
+        assert parts == [create_frame(number) for number in range(3)]
+
+
+def test_parser_without_content_length():
+    data = b"".join(create_part(create_frame(number), False) for number in range(3))
+
+    parser = MultipartParser(BOUNDARY)
+    parts = []
+    for index in range(0, len(data), 13):
+        parts.extend(parser.feed(data[index : index + 13]))
+    # the last part ends with the next delimiter
+    assert parts == [create_frame(0), create_frame(1)]
+    assert parser.feed(b"--" + BOUNDARY) == [create_frame(2)]
+
+
+def test_parser_skips_garbage():
+    parser = MultipartParser(BOUNDARY)
+    assert parser.feed(b"garbage\r\n" * 100) == []
+    assert parser.feed(create_part(create_frame(1))) == [create_frame(1)]
+
+
+def test_reader_keeps_last_frame(streamer):
+    reader = MjpegStreamReader("127.0.0.1", streamer.port)
+    reader.start()
+    try:
+        frame, number = reader.wait_frame(0, timeout=2)
+        assert frame.startswith(b"\xff\xd8") and frame.endswith(b"\xff\xd9")
+
+        frame, next_number = reader.wait_frame(number, timeout=2)
+        assert next_number > number
+        assert frame == create_frame(streamer.frames_sent)
+        assert reader.connections == 1
+    finally:
+        reader.stop()
+    assert not reader.is_running()
+
+
+def test_reader_reconnects():
+    streamer = StubStreamer(frames_per_connection=2)
+    reader = MjpegStreamReader("127.0.0.1", streamer.port, min_backoff=0.01)
+    reader.start()
+    try:
+        number = 0
+        while number < 6:
+            _, number = reader.wait_frame(number, timeout=2)
+        assert streamer.connections >= 3
+        assert reader.connections == streamer.connections
+    finally:
+        reader.stop()
+        streamer.stop()
+
+
+def test_reader_backoff_without_server():
+    streamer = StubStreamer()
+    port = streamer.port
+    streamer.stop()
+
+    reader = MjpegStreamReader(
+        "127.0.0.1", port, timeout=0.5, min_backoff=0.01, max_backoff=0.04
+    )
+    reader.start()
+    try:
+        assert reader.wait_frame(0, timeout=0.2) is None
+        assert reader.connections == 0
+    finally:
+        reader.stop()
+
+
+def test_reader_set_address(streamer):
+    other_streamer = StubStreamer()
+    reader = MjpegStreamReader("127.0.0.1", streamer.port)
+    reader.start()
+    try:
+        _, number = reader.wait_frame(0, timeout=2)
+        reader.set_address("127.0.0.1", other_streamer.port)
+        reader.wait_frame(number, timeout=2)
+        assert other_streamer.connections == 1
+        assert reader.connections == 2
+    finally:
+        reader.stop()
+        other_streamer.stop()
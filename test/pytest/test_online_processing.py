@@ -0,0 +1,285 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the online processing results realignment and result store
+
+Run as a script to time align_processing_results on a synthetic mesh:
+
+    python test/pytest/test_online_processing.py [STEPS_X [STEPS_Y]]
+"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from mxcubecore.HardwareObjects.abstract.AbstractOnlineProcessing import (
+    AbstractOnlineProcessing,
+)
+from mxcubecore.HardwareObjects.EMBL.EMBLOnlineProcessing import (
+    EMBLOnlineProcessing,
+)
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+SCORE_KEYS = ("spots_resolution", "score", "spots_num", "is")
+
+
+class MeshGrid:
+    """Grid scanned line by line along rows, reversing every other line"""
+
+    def __init__(self, steps_x, steps_y, first_image_num=1):
+        self.steps_x = steps_x
+        self.steps_y = steps_y
+        self.first_image_num = first_image_num
+        self.score = None
+        self.calls = 0
+
+    def get_col_row_from_image_serial(self, image_serial):
+        self.calls += 1
+        index = image_serial - self.first_image_num
+        row, col = divmod(index, self.steps_x)
+        if row % 2:
+            col = self.steps_x - 1 - col
+        return col, row
+
+    def get_col_row_from_image(self, image_num):
+        return self.get_col_row_from_image_serial(image_num + self.first_image_num)
+
+    def get_motor_pos_from_col_row(self, col, row):
+        return {"col": col, "row": row}
+
+    def set_score(self, score):
+        self.score = score
+
+
+def create_processing(
+    steps_x, steps_y, first_image_num=1, seed=0, cls=AbstractOnlineProcessing
+):
+    """Online processing with random raw results of a mesh"""
+    processing = cls("online_processing")
+    processing.interpolate_results = False
+    processing.grid = MeshGrid(steps_x, steps_y, first_image_num)
+    images_num = steps_x * steps_y
+    processing.params_dict = {
+        "images_num": images_num,
+        "first_image_num": first_image_num,
+        "steps_x": steps_x,
+        "steps_y": steps_y,
+        "template": "/data/mesh_%d_%05d.cbf",
+        "run_number": 1,
+    }
+    rng = np.random.default_rng(seed)
+    processing.results_raw = {}
+    processing.results_aligned = {}
+    for key in SCORE_KEYS:
+        values = rng.random(images_num)
+        # Most cells do not diffract
+        values[rng.random(images_num) < 0.8] = 0
+        processing.results_raw[key] = values
+        processing.results_aligned[key] = np.zeros((steps_x, steps_y))
+    return processing
+
+
+def align_reference(processing, start_index, end_index):
+    """Realign results cell by cell, as before the grid lookup was added"""
+    for score_key in processing.results_raw:
+        for cell_index in range(start_index, end_index + 1):
+            col, row = processing.grid.get_col_row_from_image_serial(
+                cell_index + processing.params_dict["first_image_num"]
+            )
+            if (
+                col < processing.results_aligned[score_key].shape[0]
+                and row < processing.results_aligned[score_key].shape[1]
+            ):
+                processing.results_aligned[score_key][col][row] = (
+                    processing.results_raw[score_key][cell_index]
+                )
+    scores = processing.results_raw["score"]
+    return [
+        index for index in (-scores).argsort(kind="stable")[:10] if scores[index] > 0
+    ]
+
+
+@pytest.mark.parametrize("first_image_num", (1, 101))
+def test_align_processing_results(first_image_num):
+    processing = create_processing(30, 20, first_image_num)
+    reference = create_processing(30, 20, first_image_num)
+
+    for start_index, end_index in ((0, 99), (100, 349), (350, 599)):
+        processing.align_processing_results(start_index, end_index)
+        best_indexes = align_reference(reference, start_index, end_index)
+        for key in SCORE_KEYS:
+            assert np.array_equal(
+                processing.results_aligned[key], reference.results_aligned[key]
+            )
+
+    best_positions = processing.results_aligned["best_positions"]
+    assert [position["index"] for position in best_positions] == best_indexes
+    for position in best_positions:
+        col, row = reference.grid.get_col_row_from_image_serial(
+            position["index_serial"]
+        )
+        assert position["col"] == col + 0.5
+        assert position["row"] == 20 - row - 0.5
+        assert position["filename"] == "mesh_1_%05d.cbf" % position["index_serial"]
+    assert processing.grid.score is processing.results_raw["spots_num"]
+
+
+def test_grid_lookup_computed_once():
+    processing = create_processing(30, 20)
+    processing.align_processing_results(0, 299)
+    processing.align_processing_results(300, 599)
+    assert processing.grid.calls == 600
+
+    # New grid
+    processing.grid = MeshGrid(30, 20)
+    processing.align_processing_results(0, 599)
+    assert processing.grid.calls == 600
+
+
+def test_cells_out_of_results_are_ignored():
+    processing = create_processing(10, 10)
+    processing.results_aligned = dict(
+        (key, np.zeros((10, 5))) for key in processing.results_raw
+    )
+    processing.align_processing_results(0, 99)
+    expected = processing.results_raw["score"][:50].reshape(5, 10)
+    expected[1::2] = expected[1::2, ::-1]
+    assert np.array_equal(processing.results_aligned["score"], expected.T)
+
+
+def test_best_positions():
+    processing = create_processing(10, 10)
+    scores = processing.results_raw["score"]
+    scores[:] = 0
+    scores[[5, 17, 42]] = (0.5, 0.9, 0.7)
+    processing.align_processing_results(0, 99)
+    best_positions = processing.results_aligned["best_positions"]
+    assert [position["index"] for position in best_positions] == [17, 42, 5]
+
+    scores[:] = np.arange(100)
+    assert [position["index"] for position in processing.get_best_positions()] == list(
+        range(99, 89, -1)
+    )
+    assert len(processing.get_best_positions(200)) == 99
+
+
+def create_embl_processing(steps_x, steps_y):
+    """Started EMBL online processing of a mesh, without results"""
+    processing = create_processing(steps_x, steps_y, cls=EMBLOnlineProcessing)
+    processing.params_dict["lines_num"] = steps_y
+    for key in SCORE_KEYS:
+        processing.results_raw[key][:] = 0
+        processing.results_aligned[key][:] = 0
+    processing.results_raw["average_intensity"] = np.zeros(0)
+    processing.results_aligned["average_intensity"] = np.zeros(0)
+    processing.prepare_result_store()
+    processing.started = True
+    return processing
+
+
+def test_embl_batch_processed():
+    processing = create_embl_processing(4, 3)
+    processing.batch_processed([[0, 5, 1.5, 0.5], [5, 2, 0.5, 0], [11, 3, 2.5, 0.25]])
+    processing.batch_processed((7, 1, 0.25, 1.0))
+
+    score = processing.results_raw["score"]
+    assert list(np.flatnonzero(score)) == [0, 5, 7, 11]
+    assert list(score[[0, 5, 7, 11]]) == [1.5, 0.5, 0.25, 2.5]
+    assert processing.results_raw["spots_resolution"][[0, 5, 11]].tolist() == [
+        2,
+        0,
+        4,
+    ]
+    # Line 1 is reversed: frame 5 is in col 2, frame 7 in col 0
+    assert processing.results_aligned["score"][2, 1] == 0.5
+    assert processing.results_aligned["score"][0, 1] == 0.25
+    assert processing.results_aligned["spots_num"][3, 2] == 3
+    assert list(np.flatnonzero(processing.results_filled["score"])) == [0, 5, 7, 11]
+    assert list(np.flatnonzero(processing.results_filled["spots_resolution"])) == [
+        0,
+        7,
+        11,
+    ]
+    assert not processing.results_filled["is"].any()
+
+
+def test_embl_results_changes():
+    processing = create_embl_processing(4, 3)
+    assert processing.get_results_changes() is None
+
+    processing.batch_processed([[3, 5, 1.5, 0.5], [4, 2, 0.5, 0]])
+    processing.dozor_is_changed([(4, 10.0), (6, 20.0)])
+    changes = processing.get_results_changes()
+    assert list(changes["frames"]) == [3, 4, 6]
+    assert list(changes["cols"]) == [3, 3, 1]
+    assert list(changes["rows"]) == [0, 1, 1]
+    assert list(changes["results"]["is"]) == [0, 10, 20]
+    assert list(changes["results"]["score"]) == [1.5, 0.5, 0]
+    assert processing.get_results_changes() is None
+
+    processing.dozor_is_changed((9, 5.0))
+    changes = processing.get_results_changes()
+    assert list(changes["frames"]) == [9]
+    assert processing.results_aligned["is"][1, 2] == 5
+
+
+def test_embl_average_intensity():
+    processing = create_embl_processing(2, 2)
+    values = []
+    for index in range(10):
+        processing.dozor_average_i_changed(float(index))
+        values.append(float(index))
+        assert processing.results_raw["average_intensity"].tolist() == values
+    processing.dozor_average_i_changed([10.0, 11.0])
+    assert processing.results_raw["average_intensity"].tolist() == values + [
+        10,
+        11,
+    ]
+    assert (
+        processing.results_aligned["average_intensity"]
+        is processing.results_raw["average_intensity"]
+    )
+    assert processing.average_i_buffer.size == 16
+
+
+if __name__ == "__main__":
+    STEPS_X = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    STEPS_Y = int(sys.argv[2]) if len(sys.argv) > 2 else STEPS_X
+    N_UPDATES = 10
+
+    for label, align in (
+        ("per cell", align_reference),
+        ("vectorized", AbstractOnlineProcessing.align_processing_results),
+    ):
+        PROCESSING = create_processing(STEPS_X, STEPS_Y)
+        IMAGES_NUM = STEPS_X * STEPS_Y
+        T0 = time.perf_counter()
+        for i in range(N_UPDATES):
+            # Each update realigns all the results received so far
+            align(PROCESSING, 0, (i + 1) * IMAGES_NUM // N_UPDATES - 1)
+        ELAPSED = time.perf_counter() - T0
+        print(
+            "%dx%d mesh, %-10s %8.2f ms/update"
+            % (STEPS_X, STEPS_Y, label, 1000 * ELAPSED / N_UPDATES)
+        )
@@ -0,0 +1,202 @@
+"""Test suite for the Poller module"""
+
+import gevent
+import numpy
+import pytest
+
+from mxcubecore import Poller
+
+
+class Counter:
+    """Polled object, returning an increasing value"""
+
+    def __init__(self, fail_after=None):
+        self.count = 0
+        self.fail_after = fail_after
+        self.values = []
+        self.errors = []
+
+    def read(self):
+        self.count += 1
+        if self.fail_after is not None and self.count > self.fail_after:
+            raise RuntimeError("read failed")
+        return self.count
+
+    def constant(self):
+        self.count += 1
+        return 42
+
+    def value_changed(self, value):
+        self.values.append(value)
+
+    def error(self, exc, poller_id):
+        self.errors.append((exc, poller_id))
+
+
+@pytest.fixture
+def counter():
+    counter = Counter()
+    yield counter
+    for poller in list(Poller.POLLERS.values()):
+        poller.stop()
+
+
+def test_values_delivered_to_callback(counter):
+    poller = Poller.poll(
+        counter.read,
+        polling_period=10,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    gevent.sleep(0.2)
+    assert poller.get_id() in Poller.POLLERS
+    assert len(counter.values) > 2
+    assert counter.values[:3] == [1, 2, 3]
+
+
+def test_compare_filters_identical_values(counter):
+    Poller.poll(
+        counter.constant,
+        polling_period=10,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    gevent.sleep(0.2)
+    assert counter.count > 2
+    assert counter.values == [42]
+
+
+def test_same_period_pollers_share_group(counter):
+    other = Counter()
+    poller1 = Poller.poll(
+        counter.read,
+        polling_period=20,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    poller2 = Poller.poll(
+        other.read,
+        polling_period=20,
+        value_changed_callback=other.value_changed,
+        error_callback=other.error,
+    )
+    gevent.sleep(0.1)
+    assert poller1.polling_group is poller2.polling_group
+    assert counter.values and other.values
+
+
+def test_poll_same_call_returns_existing_poller(counter):
+    poller1 = Poller.poll(
+        counter.read,
+        polling_period=500,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    poller2 = Poller.poll(counter.read, polling_period=20)
+    assert poller1 is poller2
+    assert poller1.get_polling_period() == 20
+    gevent.sleep(0.2)
+    assert counter.count > 2
+
+
+def test_stop(counter):
+    poller = Poller.poll(
+        counter.read,
+        polling_period=10,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    gevent.sleep(0.1)
+    poller.stop()
+    gevent.sleep(0.05)
+    count = counter.count
+    gevent.sleep(0.1)
+    assert counter.count == count
+    assert poller.get_id() not in Poller.POLLERS
+
+
+def test_error_stops_polling(counter):
+    counter.fail_after = 2
+    poller = Poller.poll(
+        counter.read,
+        polling_period=10,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    gevent.sleep(0.2)
+    assert counter.values == [1, 2]
+    assert len(counter.errors) == 1
+    assert counter.errors[0][1] == poller.get_id()
+    assert counter.count == 3
+
+
+def test_statistics(counter):
+    Poller.poll(
+        counter.read,
+        polling_period=10,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    gevent.sleep(0.1)
+    stats = Poller.get_statistics()
+    assert stats["polls"] > 0
+    assert 0 < stats["workers"] <= Poller.MAX_WORKERS
+    assert stats["max_jitter"] >= stats["mean_jitter"] >= 0
+
+
+def test_values_equal():
+    arr = numpy.arange(12, dtype=float).reshape(3, 4)
+    assert Poller.values_equal(arr, arr.copy())
+    assert not Poller.values_equal(arr, arr.reshape(4, 3))
+    assert not Poller.values_equal(arr, arr.astype(numpy.float32))
+    assert not Poller.values_equal(Poller.NotInitializedValue, arr)
+    assert not Poller.values_equal(arr, 1.0)
+    assert Poller.values_equal((1, "a"), (1, "a"))
+    assert not Poller.values_equal(Poller.NotInitializedValue, 0)
+
+
+def test_tolerance_comparator():
+    compare = Poller.ToleranceComparator(atol=0.01)
+    assert compare(1.0, 1.005)
+    assert not compare(1.0, 1.02)
+    assert compare(numpy.array([1.0, numpy.nan]), numpy.array([1.001, numpy.nan]))
+    assert not compare(numpy.zeros(3), numpy.zeros(4))
+    assert not compare(Poller.NotInitializedValue, 1.0)
+
+
+def test_digest_comparator():
+    compare = Poller.get_comparator("digest")
+    arr = numpy.arange(1000, dtype=numpy.uint16)
+    assert not compare(Poller.NotInitializedValue, arr)
+    assert compare(arr, arr.copy())
+    changed = arr.copy()
+    changed[500] = 0
+    assert not compare(arr, changed)
+    assert not compare(changed, changed.reshape(10, 100))
+
+
+def test_get_comparator():
+    assert Poller.get_comparator(True) is Poller.values_equal
+    assert Poller.get_comparator(False) is None
+    assert isinstance(Poller.get_comparator("digest"), Poller.DigestComparator)
+    with pytest.raises(ValueError):
+        Poller.get_comparator("unknown")
+
+
+def test_array_polling(counter):
+    frame = numpy.zeros((64, 64))
+
+    def read_frame():
+        counter.count += 1
+        return frame
+
+    Poller.poll(
+        read_frame,
+        polling_period=10,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+        compare="digest",
+    )
+    gevent.sleep(0.1)
+    assert counter.count > 2
+    assert len(counter.values) == 1
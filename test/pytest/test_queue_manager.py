@@ -0,0 +1,162 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the QueueManager sample prefetch"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import gevent
+
+from mxcubecore.HardwareObjects.QueueManager import QueueManager
+from mxcubecore.model import queue_model_objects
+from mxcubecore.queue_entry import base_queue_entry
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+
+class SampleEntry(base_queue_entry.SampleQueueEntry):
+    """Sample entry mounting in mount_time s, in prefetch_time s once picked"""
+
+    def __init__(self, name, log, mount_time=0.2, prefetch_time=0.1):
+        super().__init__(data_model=queue_model_objects.Sample())
+        self.name = name
+        self.log = log
+        self.mount_time = mount_time
+        self.prefetch_time = prefetch_time
+        self.prefetched = False
+        self.set_enabled(True)
+
+    def execute(self):
+        self.log.append(("mount", self.name))
+        gevent.sleep(self.mount_time / 2 if self.prefetched else self.mount_time)
+
+    def prefetch(self):
+        self.log.append(("prefetch", self.name))
+        gevent.sleep(self.prefetch_time)
+        self.prefetched = True
+        self.log.append(("prefetched", self.name))
+        return True
+
+    def post_execute(self):
+        base_queue_entry.BaseQueueEntry.post_execute(self)
+
+
+class CollectionEntry(base_queue_entry.BaseQueueEntry):
+    def __init__(self, name, log, duration=0.3):
+        super().__init__(data_model=queue_model_objects.DelayTask())
+        self.name = name
+        self.log = log
+        self.duration = duration
+        self.set_enabled(True)
+
+    def execute(self):
+        self.log.append(("collect", self.name))
+        gevent.sleep(self.duration)
+        self.log.append(("collected", self.name))
+
+
+def create_queue(samples_num, prefetch):
+    queue = QueueManager("queue")
+    queue.init()
+    queue.set_sample_prefetch(prefetch)
+    log = []
+    for index in range(samples_num):
+        sample = SampleEntry(index, log)
+        queue.enqueue(sample)
+        sample.enqueue(CollectionEntry(index, log))
+    return queue, log
+
+
+def run_queue(queue):
+    dead_times = []
+    queue.connect(
+        "sample_exchange_dead_time",
+        lambda entry, dead_time: dead_times.append(dead_time),
+    )
+    queue.execute()
+    queue._root_task.join()
+    assert queue._root_task.successful()
+    return dead_times
+
+
+def test_sample_prefetch_during_collection():
+    queue, log = create_queue(3, True)
+
+    dead_times = run_queue(queue)
+
+    for index in (1, 2):
+        prefetch = log.index(("prefetch", index))
+        assert log.index(("collect", index - 1)) < prefetch
+        assert prefetch < log.index(("collected", index - 1))
+        assert log.index(("mount", index)) > log.index(("prefetched", index))
+    assert ("prefetch", 0) not in log
+
+    assert dead_times == queue.sample_exchange_times
+    assert len(dead_times) == 2
+    assert all(0.09 < dead_time < 0.15 for dead_time in dead_times)
+
+
+def test_no_sample_prefetch():
+    queue, log = create_queue(2, False)
+
+    dead_times = run_queue(queue)
+
+    assert not [item for item in log if item[0] == "prefetch"]
+    assert len(dead_times) == 1
+    assert 0.19 < dead_times[0] < 0.25
+
+
+def test_sample_prefetch_skips_disabled_samples():
+    queue, log = create_queue(3, True)
+    queue.get_queue_entry_list()[1].set_enabled(False)
+
+    run_queue(queue)
+
+    assert [item for item in log if item[0] == "prefetch"] == [("prefetch", 2)]
+    assert len(queue.sample_exchange_times) == 1
+
+
+def test_sample_prefetch_safety_hook():
+    queue, log = create_queue(2, True)
+    queue.is_sample_prefetch_allowed = lambda entry: False
+
+    run_queue(queue)
+
+    assert ("prefetch", 1) not in log
+    assert ("mount", 1) in log
+
+
+def test_sample_prefetch(beamline):
+    sample_changer = beamline.sample_changer
+    sample_changer.load((1, 1))
+    sample = queue_model_objects.Sample()
+    sample.location = (1, 2)
+    sample._children.append(queue_model_objects.DelayTask())
+    entry = base_queue_entry.SampleQueueEntry(data_model=sample)
+
+    assert entry.prefetch()
+    assert sample_changer.get_prefetched_sample().get_address() == "1:02"
+    assert sample_changer.is_mounted_sample((1, 1))
+
+    sample_changer.load((1, 2))
+    assert sample_changer.get_prefetched_sample() is None
+    assert sample_changer.is_mounted_sample((1, 2))
+
+    # the sample is already mounted
+    assert not entry.prefetch()
@@ -0,0 +1,144 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the QueueModel node index
+
+Run as a script to time get_node on a large queue:
+
+    python test/pytest/test_queue_model.py [NUMBER_OF_NODES]
+"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import sys
+import time
+
+import pytest
+
+from mxcubecore.HardwareObjects.QueueModel import QueueModel
+from mxcubecore.model import queue_model_objects
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+
+def build_queue(queue_model, n_nodes, tasks_per_group=10, groups_per_sample=5):
+    """Add samples, task groups and tasks to the selected model
+
+    Returns:
+        list: The added nodes, in order of addition
+    """
+    nodes = []
+    root = queue_model.get_model_root()
+    while len(nodes) < n_nodes:
+        sample = queue_model_objects.Sample()
+        queue_model.add_child(root, sample)
+        nodes.append(sample)
+        for _ in range(groups_per_sample):
+            group = queue_model_objects.TaskGroup()
+            queue_model.add_child(sample, group)
+            nodes.append(group)
+            for _ in range(tasks_per_group):
+                task = queue_model_objects.DelayTask()
+                queue_model.add_child(group, task)
+                nodes.append(task)
+    return nodes
+
+
+def find_node(node, _id):
+    """Depth first search, as get_node without the index"""
+    for child in node._children:
+        if child._node_id == _id:
+            return child
+        result = find_node(child, _id)
+        if result:
+            return result
+
+
+@pytest.fixture
+def queue_model():
+    yield QueueModel("queue_model")
+
+
+def test_get_node(queue_model):
+    nodes = build_queue(queue_model, 200)
+    for node in nodes:
+        assert queue_model.get_node(node._node_id) is node
+        assert queue_model.get_node(node._node_id, node.get_parent()) is node
+    assert queue_model.get_node(len(nodes) + 1) is None
+
+    root = queue_model.get_model_root()
+    group = nodes[1]
+    task_id = group.get_children()[0]._node_id
+    assert queue_model.add_child_at_id(group._node_id, queue_model_objects.DelayTask())
+    assert queue_model.get_node(task_id) is find_node(root, task_id)
+
+
+def test_del_child(queue_model):
+    nodes = build_queue(queue_model, 100)
+    sample, group = nodes[0], nodes[1]
+    task_ids = [task._node_id for task in group.get_children()]
+
+    queue_model.del_child(sample, group)
+    assert queue_model.get_node(group._node_id) is None
+    assert all(queue_model.get_node(_id) is None for _id in task_ids)
+
+    # Re-added nodes get a new id, their children are indexed again
+    queue_model.add_child(sample, group)
+    assert queue_model.get_node(group._node_id) is group
+    assert all(queue_model.get_node(_id) is not None for _id in task_ids)
+
+
+def test_set_parent(queue_model):
+    nodes = build_queue(queue_model, 100)
+    group, other_group = nodes[1], nodes[12]
+    task = group.get_children()[0]
+
+    queue_model.set_parent(other_group, task)
+    assert task not in group.get_children()
+    assert task.get_parent() is other_group
+    assert queue_model.get_node(task._node_id) is task
+
+
+def test_select_model(queue_model):
+    nodes = build_queue(queue_model, 10)
+    queue_model._selected_model = queue_model._models["plate"]
+    assert queue_model.get_node(nodes[0]._node_id) is None
+    queue_model._selected_model = queue_model._models["ispyb"]
+    assert queue_model.get_node(nodes[0]._node_id) is nodes[0]
+
+
+if __name__ == "__main__":
+    N_NODES = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    N_LOOKUPS = 1000
+    QUEUE_MODEL = QueueModel("queue_model")
+
+    T0 = time.perf_counter()
+    NODES = build_queue(QUEUE_MODEL, N_NODES)
+    print("%d nodes added in %.3f s" % (len(NODES), time.perf_counter() - T0))
+
+    IDS = [NODES[i * len(NODES) // N_LOOKUPS]._node_id for i in range(N_LOOKUPS)]
+    for label, lookup in (
+        ("tree walk", lambda _id: find_node(QUEUE_MODEL.get_model_root(), _id)),
+        ("index", QUEUE_MODEL.get_node),
+    ):
+        T0 = time.perf_counter()
+        for _id in IDS:
+            lookup(_id)
+        ELAPSED = time.perf_counter() - T0
+        print("get_node %-10s %10.2f us/lookup" % (label, 1e6 * ELAPSED / N_LOOKUPS))
@@ -0,0 +1,258 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the automatic loop centring with a simulated camera"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import math
+import time
+
+import gevent
+import numpy as np
+import pytest
+from PIL import Image
+
+from mxcubecore.HardwareObjects import sample_centring
+from mxcubecore.HardwareObjects.abstract.AbstractVideoDevice import (
+    AbstractVideoDevice,
+)
+from mxcubecore.utils.frame_buffer import FrameBuffer
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+WIDTH, HEIGHT = 200, 120
+
+
+class Motor:
+    def __init__(self, position=0.0, move_time=0.0):
+        self.position = position
+        self.move_time = move_time
+
+    def get_value(self):
+        return self.position
+
+    def set_value(self, value, timeout=None):
+        gevent.sleep(self.move_time)
+        self.position = value
+
+    def set_value_relative(self, increment, timeout=None):
+        self.set_value(self.position + increment, timeout)
+
+    def is_ready(self):
+        return True
+
+
+class Camera:
+    """Camera showing a loop moving vertically with the rotation"""
+
+    def __init__(self, phi_motor):
+        self.phi_motor = phi_motor
+        self.frame_buffer = FrameBuffer()
+        self.grabbed_frames = 0
+
+    def get_loop_position(self):
+        angle = math.radians(self.phi_motor.get_value())
+        return 120, int(round(60 + 30 * math.sin(angle)))
+
+    def grab_frame(self):
+        self.grabbed_frames += 1
+        image = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+        x, y = self.get_loop_position()
+        image[y, x] = 255
+        return self.frame_buffer.put(image.ravel(), WIDTH, HEIGHT)
+
+    def get_display_image(self, frame):
+        return frame.data.reshape(frame.height, frame.width, -1)
+
+    def get_width(self):
+        return WIDTH
+
+    def get_height(self):
+        return HEIGHT
+
+
+class SampleView:
+    def __init__(self, camera):
+        self.camera = camera
+
+    def get_snapshot(self, overlay=True, bw=False, return_as_array=False):
+        return None
+
+    def save_snapshot(self, filename, overlay=True, bw=False):
+        image = self.camera.frame_buffer.get_last().data.reshape(HEIGHT, WIDTH, 3)
+        Image.fromarray(np.ascontiguousarray(image)).save(filename)
+
+
+class Lucid:
+    """Finds the brightest pixel"""
+
+    def __init__(self, detection_time=0.0):
+        self.detection_time = detection_time
+        self.images = []
+
+    def find_loop(self, image, rotation=None, debug=False, IterationClosing=6):
+        time.sleep(self.detection_time)
+        self.images.append(image)
+        if not image.any():
+            return "No loop detected", -1, -1
+        y, x = np.unravel_index(np.argmax(image[:, :, 0]), image.shape[:2])
+        return "Coord", x, y
+
+
+@pytest.fixture
+def lucid(monkeypatch):
+    lucid = Lucid()
+    monkeypatch.setattr(sample_centring, "lucid", lucid, raising=False)
+    return lucid
+
+
+def test_prepare_loop_image():
+    image = np.arange(6 * 8 * 3, dtype=np.uint8).reshape(6, 8, 3)
+
+    loop_image = sample_centring.prepare_loop_image(image, roi=(2, 1, 4, 4), binning=2)
+
+    assert loop_image.shape == (2, 2, 3)
+    assert loop_image.dtype == np.uint8
+    assert loop_image.flags.c_contiguous
+    gray = image[1:5, 2:6].astype(float) @ [0.299, 0.587, 0.114]
+    assert loop_image[0, 0, 0] == int(gray[:2, :2].mean())
+    assert np.array_equal(loop_image[:, :, 0], loop_image[:, :, 2])
+
+
+def test_find_loop_in_memory(lucid, monkeypatch):
+    phi = Motor(90)
+    camera = Camera(phi)
+    points = []
+
+    x, y = sample_centring.find_loop(SampleView(camera), 1.0, 0, None, points.append)
+
+    assert (x, y) == (120, 90)
+    assert points == [(120, 90)]
+    assert camera.grabbed_frames == 1
+    assert lucid.images[0].shape == (HEIGHT, WIDTH, 3)
+
+    # Detection in a region, binned, in the coordinates of the whole image
+    monkeypatch.setattr(sample_centring, "LOOP_DETECTION_ROI", (100, 40, 60, 60))
+    monkeypatch.setattr(sample_centring, "LOOP_DETECTION_BINNING", 2)
+    x, y = sample_centring.find_loop(SampleView(camera), 1.0, 0, None, None)
+
+    assert lucid.images[1].shape == (30, 30, 3)
+    assert abs(x - 120) <= 0.5 and abs(y - 90) <= 0.5
+
+
+class VideoDevice(AbstractVideoDevice):
+    """Video device showing a loop of 2 x 2 pixels"""
+
+    def get_image(self):
+        image = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+        image[90:92, 120:122] = 255
+        return image.ravel(), WIDTH, HEIGHT
+
+
+def test_find_loop_mirrored_scaled_camera(lucid):
+    camera = VideoDevice("camera")
+    camera.cam_mirror = (True, False)
+    camera.scale = 0.5
+
+    x, y = sample_centring.find_loop(SampleView(camera), 1.0, 0, None, None)
+
+    # In the coordinates of the displayed image
+    assert lucid.images[0].shape == (HEIGHT // 2, WIDTH // 2, 3)
+    assert (x, y) == ((WIDTH - 122) // 2, 45)
+
+
+def test_find_loop_through_file(lucid):
+    camera = Camera(Motor(0))
+    camera.grab_frame()
+
+    class FileSampleView(SampleView):
+        def __init__(self, camera):
+            self.camera = type("Camera", (), {"get_width": camera.get_width})()
+            self.frame_camera = camera
+
+        def save_snapshot(self, filename, overlay=True, bw=False):
+            SampleView(self.frame_camera).save_snapshot(filename, overlay, bw)
+
+    x, y = sample_centring.find_loop(FileSampleView(camera), 1.0, 0, None, None)
+
+    assert (x, y) == (120, 60)
+    assert lucid.images[0].shape == (HEIGHT, WIDTH, 3)
+
+
+def test_find_loop_not_found(lucid):
+    camera = Camera(Motor(0))
+    camera.get_loop_position = lambda: (0, 0)
+    camera.grab_frame = lambda: camera.frame_buffer.put(
+        np.zeros(HEIGHT * WIDTH * 3, np.uint8), WIDTH, HEIGHT
+    )
+
+    assert sample_centring.find_loop(SampleView(camera), 1.0, 0, None, None) == (
+        -1,
+        -1,
+    )
+
+
+def run_auto_centring(move_time):
+    phi = Motor(0, move_time)
+    motors = {
+        "phi": sample_centring.CentringMotor(phi, direction=-1),
+        "phiy": sample_centring.CentringMotor(Motor(), direction=-1),
+        "phiz": sample_centring.CentringMotor(Motor()),
+        "sampx": sample_centring.CentringMotor(Motor()),
+        "sampy": sample_centring.CentringMotor(Motor()),
+    }
+    start_time = time.perf_counter()
+    centring = sample_centring.start_auto(
+        SampleView(Camera(phi)), motors, 100.0, 100.0, WIDTH / 2, HEIGHT / 2
+    )
+    centred_pos = centring.get(timeout=10)
+    duration = time.perf_counter() - start_time
+    positions = dict((name, centred_pos[motor.motor]) for name, motor in motors.items())
+    return positions, duration
+
+
+@pytest.mark.parametrize("overlap", [False, True])
+def test_auto_center(lucid, monkeypatch, overlap):
+    monkeypatch.setattr(sample_centring, "OVERLAP_LOOP_DETECTION", overlap)
+
+    positions, _ = run_auto_centring(0)
+
+    # The loop rotates around 60 px from the top, 30 px from the axis
+    assert positions["phi"] == pytest.approx(0)
+    assert positions["phiz"] == pytest.approx(0)
+    assert positions["phiy"] == pytest.approx(-0.2)
+    assert math.hypot(positions["sampx"], positions["sampy"]) == pytest.approx(
+        0.3, abs=0.01
+    )
+    # 1 image to check the loop, then 1 per point
+    assert len(lucid.images) == 4
+
+
+def test_auto_center_overlap(lucid, monkeypatch):
+    lucid.detection_time = 0.1
+
+    positions, duration = run_auto_centring(0.1)
+
+    monkeypatch.setattr(sample_centring, "OVERLAP_LOOP_DETECTION", True)
+    overlap_positions, overlap_duration = run_auto_centring(0.1)
+
+    assert overlap_positions == pytest.approx(positions)
+    # The 2 rotations between the points during the detections
+    assert overlap_duration < duration - 0.15
@@ -15,14 +15,16 @@
 #
 # You should have received a copy of the GNU Lesser General Public License
 # along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
-"""
-"""
+""" """
 
 from __future__ import division, absolute_import
 from __future__ import print_function, unicode_literals
 
+import numpy as np
 import pytest
 
+from mxcubecore.HardwareObjects.GenericDiffractometer import GenericDiffractometer
+
 __copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
 __license__ = "LGPLv3+"
 
@@ -133,3 +135,121 @@ def test_sample_view_select_shape(sample_view):
 
     sample_view.de_select_all()
     assert len(sample_view.get_selected_shapes()) == 0
+
+
+class CentringMotor:
+    def __init__(self, value, direction=1):
+        self.value = value
+        self.direction = direction
+        self.reads = 0
+
+    def get_value(self):
+        self.reads += 1
+        return self.value
+
+
+@pytest.fixture
+def diffractometer():
+    diffractometer = GenericDiffractometer("diffractometer")
+    diffractometer.use_sample_centring = True
+    diffractometer.pixels_per_mm_x = 250.0
+    diffractometer.pixels_per_mm_y = 200.0
+    diffractometer.beam_position = (320, 240)
+    diffractometer.update_zoom_calibration = lambda: None
+    diffractometer.centring_phi = CentringMotor(37.0, -1)
+    diffractometer.centring_sampx = CentringMotor(0.1)
+    diffractometer.centring_sampy = CentringMotor(-0.2, -1)
+    diffractometer.centring_phiy = CentringMotor(0.3)
+    diffractometer.centring_phiz = CentringMotor(0.05)
+    return diffractometer
+
+
+def test_motor_positions_to_screen_batch(diffractometer):
+    rng = np.random.default_rng(0)
+    positions = [
+        dict(zip(("sampx", "sampy", "phiy", "phiz"), values))
+        for values in rng.uniform(-1, 1, (100, 4))
+    ]
+    expected = [diffractometer.motor_positions_to_screen(pos) for pos in positions]
+    motors = (
+        diffractometer.centring_phi,
+        diffractometer.centring_sampx,
+        diffractometer.centring_phiz,
+    )
+    reads = [motor.reads for motor in motors]
+
+    result = diffractometer.motor_positions_to_screen_batch(positions)
+    assert np.allclose(result, expected)
+    # Motor positions are read once for all the positions
+    assert [motor.reads for motor in motors] == [read + 1 for read in reads]
+    assert diffractometer.motor_positions_to_screen_batch([]) == []
+
+    diffractometer.pixels_per_mm_x = None
+    assert diffractometer.motor_positions_to_screen_batch(positions[:2]) == [
+        (0, 0),
+        (0, 0),
+    ]
+
+
+def test_sample_view_update_shape_positions(sample_view, monkeypatch):
+    calls = []
+    update_shape_positions = type(sample_view).update_shape_positions
+
+    def count_update(self):
+        # Sample views of previous tests may receive motor events too
+        if self is sample_view:
+            calls.append(self)
+        update_shape_positions(self)
+
+    monkeypatch.setattr(type(sample_view), "update_shape_positions", count_update)
+    # A burst of motor events results in a single update
+    tasks = set()
+    for _ in range(10):
+        sample_view._update_shape_positions()
+        tasks.add(sample_view._shape_update_task)
+    assert len(tasks) == 1
+    task = tasks.pop()
+    task.join()
+    assert len(calls) == 1
+
+    sample_view._update_shape_positions()
+    assert sample_view._shape_update_task is not task
+    sample_view._shape_update_task.join()
+    assert len(calls) == 2
+
+
+def test_sample_view_shape_screen_coord(sample_view, beamline, monkeypatch):
+    positions = iter(range(100))
+    monkeypatch.setattr(
+        beamline.diffractometer,
+        "motor_positions_to_screen",
+        lambda cpos: (next(positions), -1),
+    )
+    sample_view.update_shape_positions()
+
+    point = sample_view.get_points()[0]
+    line = sample_view.get_lines()[0]
+    assert len(point.screen_coord) == 2
+    assert len(line.screen_coord) == 4
+    assert sorted(point.screen_coord[::2] + line.screen_coord[::2]) == [0, 1, 2]
+
+
+def test_sample_view_shape_screen_coord_without_batch(
+    sample_view, beamline, monkeypatch
+):
+    # Diffractometers not derived from GenericDiffractometer, e.g. MiniDiff
+    diffractometer = beamline.diffractometer
+    for cls in type(diffractometer).__mro__:
+        if "motor_positions_to_screen_batch" in vars(cls):
+            monkeypatch.delattr(cls, "motor_positions_to_screen_batch")
+    monkeypatch.setattr(
+        diffractometer,
+        "motor_positions_to_screen",
+        lambda cpos: (cpos["phiy"] + 10, 20),
+    )
+    assert not hasattr(diffractometer, "motor_positions_to_screen_batch")
+
+    sample_view.update_shape_positions()
+
+    assert sample_view.get_points()[0].screen_coord == (10, 20)
+    assert sample_view.get_lines()[0].screen_coord == (10, 20, 11, 20)
@@ -0,0 +1,181 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the pooled SOAP clients, with a local web service"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import re
+import time
+from urllib.error import URLError
+
+import gevent
+import gevent.pywsgi
+import pytest
+
+from mxcubecore.utils.soap_client_pool import (
+    ClientPool,
+    SessionTransport,
+    create_session,
+    get_wsdl_cache,
+)
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+WSDL = """<?xml version="1.0" encoding="UTF-8"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"
+    xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:tns="urn:test" xmlns:xsd="http://www.w3.org/2001/XMLSchema"
+    targetNamespace="urn:test" name="TestService">
+  <types>
+    <xsd:schema targetNamespace="urn:test" elementFormDefault="qualified">
+      <xsd:element name="echo">
+        <xsd:complexType><xsd:sequence>
+          <xsd:element name="value" type="xsd:string"/>
+        </xsd:sequence></xsd:complexType>
+      </xsd:element>
+      <xsd:element name="echoResponse">
+        <xsd:complexType><xsd:sequence>
+          <xsd:element name="return" type="xsd:string"/>
+        </xsd:sequence></xsd:complexType>
+      </xsd:element>
+    </xsd:schema>
+  </types>
+  <message name="echoRequest"><part name="parameters" element="tns:echo"/></message>
+  <message name="echoResponse">
+    <part name="parameters" element="tns:echoResponse"/>
+  </message>
+  <portType name="TestPort">
+    <operation name="echo">
+      <input message="tns:echoRequest"/><output message="tns:echoResponse"/>
+    </operation>
+  </portType>
+  <binding name="TestBinding" type="tns:TestPort">
+    <soap:binding style="document" transport="http://schemas.xmlsoap.org/soap/http"/>
+    <operation name="echo">
+      <soap:operation soapAction=""/>
+      <input><soap:body use="literal"/></input>
+      <output><soap:body use="literal"/></output>
+    </operation>
+  </binding>
+  <service name="TestService">
+    <port name="TestPort" binding="tns:TestBinding">
+      <soap:address location="%s"/>
+    </port>
+  </service>
+</definitions>
+"""
+
+RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+  <soap:Body>
+    <tns:echoResponse xmlns:tns="urn:test"><tns:return>%s</tns:return></tns:echoResponse>
+  </soap:Body>
+</soap:Envelope>
+"""
+
+
+class EchoService:
+    """Local web service echoing values after a latency"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.wsdl_requests = 0
+        self.connections = set()
+        self.authorizations = set()
+        self.server = gevent.pywsgi.WSGIServer(("127.0.0.1", 0), self.handle, log=None)
+        self.server.start()
+        self.url = "http://127.0.0.1:%d/echo" % self.server.server_port
+
+    def handle(self, environ, start_response):
+        self.connections.add(environ["REMOTE_PORT"])
+        self.authorizations.add(environ.get("HTTP_AUTHORIZATION"))
+        if environ["REQUEST_METHOD"] == "GET":
+            self.wsdl_requests += 1
+            body = WSDL % self.url
+        else:
+            gevent.sleep(self.latency)
+            request = environ["wsgi.input"].read().decode()
+            value = re.search(r"<(?:\w+:)?value>(.*?)</", request).group(1)
+            body = RESPONSE % value
+        start_response("200 OK", [("Content-Type", "text/xml; charset=utf-8")])
+        return [body.encode()]
+
+
+@pytest.fixture
+def echo_service():
+    service = EchoService(latency=0.1)
+    yield service
+    service.server.stop()
+
+
+def create_pool(service, cache_directory, size=4, session=None):
+    transport = SessionTransport(
+        session or create_session(size), username="user", password="secret"
+    )
+    return ClientPool(
+        service.url + "?wsdl",
+        size=size,
+        transport=transport,
+        cache=get_wsdl_cache(cache_directory),
+        timeout=3,
+    )
+
+
+def test_concurrent_calls(echo_service, tmp_path):
+    pool = create_pool(echo_service, str(tmp_path))
+    assert pool.service.echo("first") == "first"
+
+    start_time = time.monotonic()
+    calls = [gevent.spawn(pool.service.echo, str(index)) for index in range(8)]
+    gevent.joinall(calls, raise_error=True)
+    elapsed = time.monotonic() - start_time
+
+    assert [call.value for call in calls] == [str(index) for index in range(8)]
+    # At most 4 calls at once, in 2 rounds
+    assert 0.2 <= elapsed < 0.4
+    # Connections are kept alive, at most one per pooled client
+    assert len(echo_service.connections) <= 4
+    assert echo_service.authorizations == {"Basic dXNlcjpzZWNyZXQ="}
+
+
+def test_wsdl_cache(echo_service, tmp_path):
+    create_pool(echo_service, str(tmp_path))
+    assert echo_service.wsdl_requests == 1
+    pool = create_pool(echo_service, str(tmp_path))
+    assert echo_service.wsdl_requests == 1
+    assert pool.factory.create("echo") is not None
+    assert pool.service.echo("cached") == "cached"
+
+
+def test_shared_session(echo_service, tmp_path):
+    session = create_session(2)
+    pools = [create_pool(echo_service, str(tmp_path), 1, session) for _ in range(2)]
+    for value in ("a", "b", "c"):
+        assert [pool.service.echo(value) for pool in pools] == [value, value]
+    # The pools reuse the connection of the session
+    assert len(echo_service.connections) == 1
+
+
+def test_connection_error(echo_service, tmp_path):
+    pool = create_pool(echo_service, str(tmp_path))
+    # Nothing listens on port 1
+    pool.set_options(location="http://127.0.0.1:1/echo")
+    with pytest.raises(URLError):
+        pool.service.echo("lost")
@@ -0,0 +1,125 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+"""Tests of the StepExecutor running the data collection preparation steps"""
+
+from __future__ import division, absolute_import
+from __future__ import print_function, unicode_literals
+
+import time
+
+import gevent
+import pytest
+
+from mxcubecore.utils.step_executor import StepExecutor
+
+__copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+
+def step(log, name, duration):
+    log.append(("start", name))
+    gevent.sleep(duration)
+    log.append(("end", name))
+
+
+def test_steps_run_concurrently():
+    executor = StepExecutor()
+    log = []
+    for name in ("transmission", "energy", "detector_distance"):
+        executor.add(name, step, log, name, 0.1)
+
+    start_time = time.perf_counter()
+    times = executor.run()
+    elapsed = time.perf_counter() - start_time
+
+    assert elapsed < 0.25
+    assert set(times) == {"transmission", "energy", "detector_distance"}
+    assert all(0.09 < duration < 0.2 for duration in times.values())
+    assert [entry[0] for entry in log[:3]] == ["start"] * 3
+    assert executor.times == times
+
+
+def test_dependent_step_waits():
+    executor = StepExecutor()
+    log = []
+    executor.add("resolution", step, log, "resolution", 0.01, depends_on=("energy",))
+    executor.add("energy", step, log, "energy", 0.1)
+    executor.add("transmission", step, log, "transmission", 0.05)
+
+    times = executor.run()
+
+    assert log.index(("start", "resolution")) > log.index(("end", "energy"))
+    assert log.index(("start", "transmission")) < log.index(("end", "energy"))
+    # times are ordered by completion
+    assert list(times) == ["transmission", "energy", "resolution"]
+
+
+def test_missing_dependency_is_ignored():
+    executor = StepExecutor()
+    log = []
+    executor.add("resolution", step, log, "resolution", 0, depends_on=("energy",))
+
+    assert list(executor.run()) == ["resolution"]
+    # steps are removed after a run
+    assert executor.run() == {}
+
+
+def test_circular_dependencies():
+    executor = StepExecutor()
+    executor.add("a", gevent.sleep, 0, depends_on=("b",))
+    executor.add("b", gevent.sleep, 0, depends_on=("a",))
+    executor.add("c", gevent.sleep, 0)
+
+    with pytest.raises(ValueError):
+        executor.run()
+
+
+def test_failing_step_kills_the_others():
+    def fail():
+        raise RuntimeError("Energy out of range")
+
+    executor = StepExecutor()
+    log = []
+    executor.add("energy", fail)
+    executor.add("transmission", step, log, "transmission", 0.2)
+
+    with pytest.raises(RuntimeError):
+        executor.run()
+    gevent.sleep(0.25)
+
+    assert ("end", "transmission") not in log
+    assert executor.times == {}
+
+
+def test_timeout():
+    executor = StepExecutor()
+    log = []
+    executor.add("energy", step, log, "energy", 1)
+
+    with pytest.raises(gevent.Timeout):
+        executor.run(timeout=0.05)
+    assert ("end", "energy") not in log
+
+
+def test_timed():
+    executor = StepExecutor()
+
+    with executor.timed("store_data_collection_in_lims"):
+        gevent.sleep(0.05)
+
+    assert 0.04 < executor.times["store_data_collection_in_lims"] < 0.15
@@ -0,0 +1,267 @@
+"""Test suite for the bulk reading of the polled Tango channels"""
+
+import types
+
+import pytest
+
+from mxcubecore import Poller
+from mxcubecore.Command import Tango
+
+
+class DevFailed(Exception):
+    pass
+
+
+class FakeAttribute:
+    def __init__(self, name, value=None, error=None):
+        self.name = name
+        self.value = value
+        self.has_failed = error is not None
+        self.error = error
+
+    def get_err_stack(self):
+        return (self.error,)
+
+
+class FakeDeviceProxy:
+    """DeviceProxy of a device whose attributes are set by the test"""
+
+    instances = []
+
+    def __init__(self, device_name):
+        self.device_name = device_name
+        self.timeout = None
+        self.values = {}
+        self.errors = {}
+        self.read_calls = []
+        FakeDeviceProxy.instances.append(self)
+
+    def ping(self):
+        return 0
+
+    def set_timeout_millis(self, timeout):
+        self.timeout = timeout
+
+    def attribute_list_query(self):
+        return [types.SimpleNamespace(name=name) for name in ATTRIBUTES]
+
+    def read_attribute(self, name, *args):
+        if name not in ATTRIBUTES:
+            raise DevFailed("no attribute %s" % name)
+        return FakeAttribute(name, self.values.get(name))
+
+    def read_attributes(self, names, *args):
+        self.read_calls.append((list(names), args))
+        # as Tango, the whole call fails for an unknown attribute
+        for name in names:
+            if name not in ATTRIBUTES:
+                raise DevFailed("no attribute %s" % name)
+        return [
+            FakeAttribute(name, self.values.get(name), self.errors.get(name))
+            for name in names
+        ]
+
+
+class FakePoller:
+    def __init__(self, polled_call, polling_period, **kwargs):
+        self.polled_call = polled_call
+        self.polling_period = polling_period
+        self.stopped = False
+
+    def get_id(self):
+        return id(self)
+
+    def stop(self):
+        self.stopped = True
+
+    def is_stopped(self):
+        return self.stopped
+
+
+ATTRIBUTES = ("Position", "State", "Velocity")
+
+
+@pytest.fixture
+def tango(monkeypatch):
+    pytango = types.SimpleNamespace(
+        DevFailed=DevFailed,
+        ConnectionFailed=DevFailed,
+        DeviceAttribute=types.SimpleNamespace(
+            ExtractAs=types.SimpleNamespace(String="String")
+        ),
+    )
+    pollers = []
+
+    def poll(polled_call, polling_period=1000, **kwargs):
+        pollers.append(FakePoller(polled_call, polling_period, **kwargs))
+        return pollers[-1]
+
+    monkeypatch.setattr(Tango, "PyTango", pytango, raising=False)
+    monkeypatch.setattr(Tango, "DeviceProxy", FakeDeviceProxy, raising=False)
+    monkeypatch.setattr(Poller, "poll", poll)
+    monkeypatch.setattr(FakeDeviceProxy, "instances", [])
+    monkeypatch.setattr(Tango.TangoBulkReader, "_readers", {})
+    yield pollers
+
+
+class Listener:
+    def __init__(self, channel):
+        self.values = []
+        channel.connect_signal("update", self.update)
+
+    def update(self, value):
+        self.values.append(value)
+
+
+def make_channel(attribute, device="id/motor/1", polling=100, **kwargs):
+    return Tango.TangoChannel(
+        attribute.lower(), attribute, tangoname=device, polling=polling, **kwargs
+    )
+
+
+def test_channels_grouped_per_device_polling_and_format(tango):
+    position = make_channel("Position")
+    state = make_channel("State", device="ID/MOTOR/1")
+    velocity = make_channel("Velocity", polling=500)
+    position_str = make_channel("Position", read_as_str=True)
+    other_device = make_channel("Position", device="id/motor/2")
+
+    readers = Tango.TangoBulkReader._readers
+    assert len(readers) == 4
+    assert len(tango) == 4
+
+    reader = readers[("id/motor/1", 100, False, 10000)]
+    assert [entry.channel_ref() for entry in reader.entries] == [position, state]
+    assert readers[("id/motor/1", 500, False, 10000)].entries[0].channel_ref() is (
+        velocity
+    )
+    assert readers[("id/motor/1", 100, True, 10000)].entries[0].channel_ref() is (
+        position_str
+    )
+    assert readers[("id/motor/2", 100, False, 10000)].entries[0].channel_ref() is (
+        other_device
+    )
+
+
+def test_channels_grouped_per_timeout(tango):
+    make_channel("Position", timeout=3000)
+    make_channel("State", timeout=3000)
+    make_channel("Velocity")
+
+    readers = Tango.TangoBulkReader._readers
+    assert len(readers) == 2
+    assert readers[("id/motor/1", 100, False, 3000)].raw_device.timeout == 3000
+    assert readers[("id/motor/1", 100, False, 10000)].raw_device.timeout == 10000
+
+
+def test_bulk_read_disabled(tango):
+    make_channel("Position", bulk_read=False)
+
+    assert not Tango.TangoBulkReader._readers
+    assert tango[0].polling_period == 100
+
+
+def test_values_dispatched_to_channels(tango):
+    position = make_channel("Position")
+    state = make_channel("State")
+    position_listener = Listener(position)
+    state_listener = Listener(state)
+
+    reader = Tango.TangoBulkReader._readers[("id/motor/1", 100, False, 10000)]
+    reader.raw_device.values = {"Position": 1.5, "State": "ON"}
+
+    changes = reader.poll()
+    assert reader.raw_device.read_calls == [(["Position", "State"], ())]
+    reader.update(changes)
+    assert position_listener.values == [1.5]
+    assert state_listener.values == ["ON"]
+
+    # Only the changed values are dispatched
+    reader.raw_device.values["Position"] = 2.5
+    changes = reader.poll()
+    assert [entry.attribute_name for entry, _, _ in changes] == ["Position"]
+    reader.update(changes)
+    assert position_listener.values == [1.5, 2.5]
+    assert state_listener.values == ["ON"]
+    assert position.value == 2.5
+
+
+def test_values_read_as_str(tango):
+    make_channel("Position", read_as_str=True)
+
+    reader = Tango.TangoBulkReader._readers[("id/motor/1", 100, True, 10000)]
+    reader.poll()
+    assert reader.raw_device.read_calls == [(["Position"], ("String",))]
+
+
+def test_failed_attribute_stops_its_channel(tango):
+    position = make_channel("Position")
+    state = make_channel("State")
+    position_listener = Listener(position)
+    state_listener = Listener(state)
+
+    reader = Tango.TangoBulkReader._readers[("id/motor/1", 100, False, 10000)]
+    reader.raw_device.values = {"Position": 1.5, "State": "ON"}
+    reader.raw_device.errors = {"Position": {"desc": "read failed"}}
+
+    reader.update(reader.poll())
+    assert position_listener.values == [None]
+    assert state_listener.values == ["ON"]
+
+    # The failed attribute is not read anymore, the others still are
+    assert [entry.attribute_name for entry in reader.entries] == ["State"]
+    reader.raw_device.values["State"] = "MOVING"
+    reader.update(reader.poll())
+    assert reader.raw_device.read_calls[-1] == (["State"], ())
+    assert state_listener.values == ["ON", "MOVING"]
+    assert not reader.poller.is_stopped()
+
+
+def test_unknown_attribute_polled_apart(tango):
+    position = make_channel("Position")
+    state = make_channel("State")
+    speed = make_channel("Speed")
+    speed_listener = Listener(speed)
+
+    reader = Tango.TangoBulkReader._readers[("id/motor/1", 100, False, 10000)]
+    assert [entry.channel_ref() for entry in reader.entries] == [position, state]
+    reader.raw_device.values = {"Position": 1.5, "State": "ON"}
+    assert len(reader.poll()) == 2
+
+    # Only the channel of the unknown attribute fails
+    poller = tango[-1]
+    assert poller.polled_call == speed.poll
+    with pytest.raises(DevFailed):
+        poller.polled_call()
+    speed.poll_failed(DevFailed("no attribute Speed"), poller.get_id())
+    assert speed_listener.values == [None]
+    assert not reader.poller.is_stopped()
+
+
+def test_failed_read_polls_channels_apart(tango, monkeypatch):
+    position = make_channel("Position")
+    state = make_channel("State")
+    position_listener = Listener(position)
+    state_listener = Listener(state)
+
+    # State removed from the device after the channels were created
+    reader = Tango.TangoBulkReader._readers[("id/motor/1", 100, False, 10000)]
+    monkeypatch.setitem(globals(), "ATTRIBUTES", ("Position",))
+    with pytest.raises(DevFailed) as failure:
+        reader.poll()
+    reader.poll_failed(failure.value, reader.poller.get_id())
+
+    assert reader.poller.is_stopped()
+    assert not Tango.TangoBulkReader._readers
+
+    # Each channel is polled on its own, only State stops
+    position_poller, state_poller = tango[-2:]
+    assert position_poller.polled_call == position.poll
+    assert state_poller.polled_call == state.poll
+    position.raw_device.values = {"Position": 1.5}
+    position.update(position_poller.polled_call())
+    with pytest.raises(DevFailed):
+        state_poller.polled_call()
+    state.poll_failed(DevFailed("no attribute State"), state_poller.get_id())
+    assert position_listener.values == [1.5]
+    assert state_listener.values == [None]